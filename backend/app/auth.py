@@ -33,6 +33,13 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security))
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+def is_valid_token(token: str) -> bool:
+    try:
+        jwt.decode(token, settings.AUTH_SECRET_KEY, algorithms=[settings.ALGORITHM])
+        return True
+    except jwt.PyJWTError:
+        return False
+
 def verify_admin_password(password: str) -> bool:
     return password == settings.ADMIN_PASSWORD
 
@@ -1,5 +1,5 @@
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, DateTime, Boolean, ForeignKey, Index, JSON
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -7,6 +7,8 @@ from datetime import datetime
 Base = declarative_base()
 
 DEFAULT_ELO = 1000  # Default ELO rating for new players
+LIFETIME_SEASON_ID = 0  # player_ratings.season_id used for the all-seasons rating
+ALL_PLAYERS_ID = 0  # daily_match_counts.player_id used for the count over all players
 
 class BaseModel(Base):
     __abstract__ = True
@@ -48,6 +50,21 @@ class Match(Base):
     loser1 = relationship("Player", foreign_keys=[loser1_id])
     loser2 = relationship("Player", foreign_keys=[loser2_id])
 
+class MatchParticipant(Base):
+    __tablename__ = "match_participants"
+    # One row per player per match, kept alongside matches for per-player lookups
+    match_id = Column(Integer, ForeignKey("matches.id", ondelete="CASCADE"), primary_key=True)
+    side = Column(String(6), primary_key=True)  # 'winner' or 'loser'
+    slot = Column(Integer, primary_key=True)  # 1 or 2
+    player_id = Column(Integer, ForeignKey("players.id"), nullable=False)
+    elo_change = Column(Integer, default=0)
+    timestamp = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("ix_match_participants_player_timestamp", "player_id", "timestamp"),
+        Index("ix_match_participants_timestamp", "timestamp"),
+    )
+
 class AuditLog(Base):
     __tablename__ = "audit_logs"
 
@@ -55,6 +72,11 @@ class AuditLog(Base):
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
     log = Column(String)
 
+    __table_args__ = (
+        # Newest-first keyset pages on /auditlog
+        Index("ix_audit_logs_timestamp_id", "timestamp", "id"),
+    )
+
 class EventType(Base):
     __tablename__ = "event_type"
     id = Column(Integer, primary_key=True, index=True)
@@ -74,4 +96,115 @@ class GameSeason(Base):
     id = Column(Integer, primary_key=True, index=True)
     start_date = Column(DateTime(timezone=True), unique=True, nullable=False)
     end_date = Column(DateTime(timezone=True), nullable=False)
-    season_name = Column(String)
\ No newline at end of file
+    season_name = Column(String)
+
+class PlayerRating(Base):
+    __tablename__ = "player_ratings"
+    # Materialised ELO per player per season, maintained by RatingService
+    player_id = Column(Integer, ForeignKey("players.id"), primary_key=True)
+    season_id = Column(Integer, primary_key=True)
+    elo = Column(Integer, nullable=False, default=DEFAULT_ELO)
+    matches_played = Column(Integer, nullable=False, default=0)
+
+class SeasonMatchCount(Base):
+    __tablename__ = "season_match_counts"
+    # Matches and player appearances per season (LIFETIME_SEASON_ID for all), maintained by RatingService
+    season_id = Column(Integer, primary_key=True)
+    match_count = Column(Integer, nullable=False, default=0)
+    appearance_count = Column(Integer, nullable=False, default=0)
+
+class PlayerRatingCheckpoint(Base):
+    __tablename__ = "player_rating_checkpoints"
+    # player_ratings as it stood after every CHECKPOINT_INTERVAL-th match of a player in a season
+    player_id = Column(Integer, ForeignKey("players.id"), primary_key=True)
+    season_id = Column(Integer, primary_key=True)
+    matches_played = Column(Integer, primary_key=True)
+    match_id = Column(Integer, nullable=False)
+    timestamp = Column(DateTime(timezone=True), nullable=False)
+    elo = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_player_rating_checkpoints_player_season_timestamp", "player_id", "season_id", "timestamp"),
+    )
+
+class HeadToHead(Base):
+    __tablename__ = "head_to_head"
+    # Running totals for every pair of players who have played on opposite sides, player_a_id < player_b_id
+    player_a_id = Column(Integer, ForeignKey("players.id"), primary_key=True)
+    player_b_id = Column(Integer, ForeignKey("players.id"), primary_key=True)
+    a_wins = Column(Integer, nullable=False, default=0)
+    b_wins = Column(Integer, nullable=False, default=0)
+    a_elo_gained = Column(Integer, nullable=False, default=0)  # sum of a's elo change in matches a won
+    b_elo_gained = Column(Integer, nullable=False, default=0)
+    monday = Column(Integer, nullable=False, default=0)  # matches played per weekday
+    tuesday = Column(Integer, nullable=False, default=0)
+    wednesday = Column(Integer, nullable=False, default=0)
+    thursday = Column(Integer, nullable=False, default=0)
+    friday = Column(Integer, nullable=False, default=0)
+    saturday = Column(Integer, nullable=False, default=0)
+    sunday = Column(Integer, nullable=False, default=0)
+    last_played = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index("ix_head_to_head_player_b", "player_b_id"),
+    )
+
+class DailyMatchCount(Base):
+    __tablename__ = "daily_match_counts"
+    # Matches played per day, per player and over all players (player_id = ALL_PLAYERS_ID)
+    match_date = Column(Date, primary_key=True)
+    player_id = Column(Integer, primary_key=True)
+    match_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_daily_match_counts_player_date", "player_id", "match_date"),
+    )
+
+class SchemaMigration(Base):
+    __tablename__ = "schema_migrations"
+    # SQL scripts in app/migrations that have already been applied
+    version = Column(String, primary_key=True)
+    applied_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class DataVersion(Base):
+    __tablename__ = "data_versions"
+    # Change counters for writes that max(id) of matches/audit_logs can't see
+    name = Column(String(20), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+class DerivedTableSource(Base):
+    __tablename__ = "derived_table_sources"
+    # Fingerprint of a source table as it was when the derived tables were last built from it
+    name = Column(String(40), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+
+class SnookerFrame(Base):
+    __tablename__ = "snooker_frames"
+    # One frame of snooker on a table; the newest frame per table is the live one
+    __table_args__ = (
+        # A frame replaces exactly one predecessor, so two workers can't both open the next frame
+        Index("ux_snooker_frames_table_previous", "table_id", "previous_frame_id", unique=True),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    table_id = Column(Integer, nullable=False, index=True)
+    previous_frame_id = Column(Integer, nullable=False, default=0)  # frame this one replaced, 0 = table's first
+    head_seq = Column(Integer, nullable=False, default=0)  # action the current score is at, 0 = fresh frame
+    last_seq = Column(Integer, nullable=False, default=0)  # highest seq written, including undone actions
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class SnookerAction(Base):
+    __tablename__ = "snooker_actions"
+    # Append-only log; undo moves the frame's head back to parent_seq
+    frame_id = Column(Integer, ForeignKey("snooker_frames.id", ondelete="CASCADE"), primary_key=True)
+    seq = Column(Integer, primary_key=True)
+    parent_seq = Column(Integer, nullable=False)
+    depth = Column(Integer, nullable=False)  # actions between the fresh frame and this one
+    action = Column(JSON, nullable=False)
+    timestamp = Column(DateTime(timezone=True), server_default=func.now())
+
+class SnookerSnapshot(Base):
+    __tablename__ = "snooker_snapshots"
+    # Projected frame state after action seq, written every SNAPSHOT_INTERVAL actions
+    frame_id = Column(Integer, ForeignKey("snooker_frames.id", ondelete="CASCADE"), primary_key=True)
+    seq = Column(Integer, primary_key=True)
+    state = Column(JSON, nullable=False)
@@ -1,6 +1,8 @@
 from pydantic_settings import BaseSettings
 from typing import List
 from functools import lru_cache
+import os
+import tempfile
 
 class Settings(BaseSettings):
     # Database
@@ -14,6 +16,17 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_DAYS: int = 365
     
     CUSTOM_HOSTNAME: str
+
+    # Queue audit log entries and insert them in batches from a background thread
+    AUDIT_LOG_WRITE_BEHIND: bool = False
+
+    # Log SQL statements slower than this many milliseconds; 0 turns it off
+    SLOW_QUERY_LOG_MS: int = 500
+
+    # Request profiles: where they are kept, how many, and profile every Nth request (0 = only on request)
+    PROFILE_DIR: str = os.path.join(tempfile.gettempdir(), "shed-profiles")
+    PROFILE_BUFFER_SIZE: int = 50
+    PROFILE_SAMPLE_EVERY: int = 0
     
     class Config:
         env_file = ".env"
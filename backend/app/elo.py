@@ -1,4 +1,13 @@
 import math
+import numpy as np
+
+def column_int(value: float) -> int:
+    """Round like Postgres does when storing a float in an integer column (half away from zero)."""
+    return int(math.copysign(math.floor(abs(value) + 0.5), value))
+
+def column_int_array(values: np.ndarray) -> np.ndarray:
+    """column_int elementwise, for replay's NumPy path; keep the two rounding rules in step."""
+    return np.sign(values) * np.floor(np.abs(values) + 0.5)
 
 def probability(rating1, rating2):
     return 1.0 / (1 + math.pow(10, (rating1 - rating2) / 400.0))
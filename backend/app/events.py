@@ -0,0 +1,59 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import Any, Optional, Set
+
+from fastapi.encoders import jsonable_encoder
+
+# Events a subscriber may fall behind by before its backlog is dropped
+SUBSCRIBER_QUEUE_SIZE = 100
+
+class EventBroker:
+    """In-process fan-out of typed events to Server-Sent Events subscribers.
+
+    Each subscriber gets a bounded asyncio queue. A subscriber that falls
+    SUBSCRIBER_QUEUE_SIZE events behind has its backlog replaced by a single
+    `resync` event, so a slow client costs bounded memory and reloads instead.
+    publish() is thread-safe so sync routes running in the threadpool can call it.
+    """
+
+    def __init__(self):
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+
+    @asynccontextmanager
+    async def subscribe(self):
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers.discard(queue)
+
+    def publish(self, event_type: str, data: Any) -> None:
+        if self._loop is None or not self._subscribers:
+            return
+        message = format_sse(event_type, data)
+        try:
+            self._loop.call_soon_threadsafe(self._fan_out, message)
+        except RuntimeError:
+            # Event loop already closed during shutdown
+            pass
+
+    def _fan_out(self, message: str) -> None:
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(format_sse("resync", {}))
+
+def format_sse(event_type: str, data: Any) -> str:
+    # Encoded as the REST responses are, so timestamps are ISO 8601 in both
+    return f"event: {event_type}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+broker = EventBroker()
@@ -1,24 +1,45 @@
-from fastapi import FastAPI, Depends, HTTPException, Request, status
+from fastapi import FastAPI, Depends, File, HTTPException, Request, Response, UploadFile, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from typing import List
+from datetime import date, datetime, timezone
+from typing import List, Optional
+import asyncio
+import io
 import logging
+import threading
+import time
 
 from . import database
 from .auth import (
-    verify_token, verify_app_password, verify_admin_password,
+    verify_token, verify_app_password, verify_admin_password, is_valid_token,
     create_access_token, LoginRequest, Token
 )
 from .schemas import (
-    PlayerCreate, PlayerUpdate, PlayerResponse,
+    PlayerCreate, PlayerUpdate, PlayerResponse, PlayerListEntry,
     MatchCreate, MatchResponse,
     AuditLogResponse, MatchesPerDay,
-    SnookerState, SnookerAction
+    PlayerStreak, LongestStreak, PlayerKD,
+    SnookerState, SnookerAction,
+    EloWhatIfRequest
 )
-from .services import PlayerService, MatchService, AuditLogService, StatsService
-from .services.snooker_service import SnookerService
+from .services import PlayerService, MatchService, AuditLogService, StatsService, DashboardService, MatchImportService, HeadToHeadService
+from .services.dashboard_service import DASHBOARD_FIELDS
+from .services.import_service import IMPORT_FORMATS
+from .services.rating_service import RatingService
+from .services.replay_service import ReplayService, get_replay_pool, shutdown_replay_pool
+from .replay import replay_scenarios
+from .services.data_version_service import DataVersionService
+from .services.audit_log_service import audit_log_writer
+from .services.snooker_service import SnookerService, DEFAULT_TABLE_ID
 from .config import get_settings
+from .events import broker
+from .metrics import sql_metrics, current_request, route_template, RequestStats
+from .profiling import request_profiler
 
 settings = get_settings()
 if not settings.AUTH_SECRET_KEY:
@@ -30,6 +51,9 @@ if not settings.APP_PASSWORD:
 if not settings.ADMIN_PASSWORD:
     raise ValueError("ADMIN_PASSWORD environment variable is not set")
 
+sql_metrics.slow_query_ms = settings.SLOW_QUERY_LOG_MS
+request_profiler.configure(settings.PROFILE_DIR, settings.PROFILE_BUFFER_SIZE, settings.PROFILE_SAMPLE_EVERY)
+
 CORS_ALLOWED_ORIGINS = ["http://localhost", "http://localhost:8000"]
 if settings.CUSTOM_HOSTNAME:
     CORS_ALLOWED_ORIGINS.extend([
@@ -37,8 +61,24 @@ if settings.CUSTOM_HOSTNAME:
         f"https://{settings.CUSTOM_HOSTNAME}"
     ])
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema work runs once per worker before it starts serving requests
+    await run_in_threadpool(database.init_db)
+    broker.bind(asyncio.get_running_loop())
+    if settings.AUDIT_LOG_WRITE_BEHIND:
+        audit_log_writer.start(database.SessionLocal)
+    yield
+    # Before the engines go: queued audit entries are written on stop
+    await run_in_threadpool(audit_log_writer.stop)
+    await database.async_engine.dispose()
+    shutdown_replay_pool()
+
+# orjson encodes responses several times faster than the standard json module
 app = FastAPI(
     title="Shed Tournament API",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Configure CORS
@@ -50,14 +90,156 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Create a sub-application for the /shedapi prefix
-api = FastAPI()
+# Create a sub-application for the /shedapi prefix.
+# Routes using the sync Session are plain `def` so FastAPI runs them in its
+# threadpool; hot read endpoints use the async session and stay on the loop.
+api = FastAPI(default_response_class=ORJSONResponse)
 app.mount("/shedapi", api)
 
+# Downsampling options for /players/{id}/elo-history
+ELO_HISTORY_INTERVALS = ("match", "day", "week")
+
+# Most entries one /auditlog page may return
+MAX_AUDIT_LOG_PAGE = 500
+
+# Most opponents one /players/{id}/rivals request may return
+MAX_RIVALS_LIMIT = 50
+
+# Most players one /stats/player-kds request may return
+MAX_PLAYER_KDS_LIMIT = 100
+
+# Scenarios one what-if request may replay at once
+MAX_WHAT_IF_SCENARIOS = 10
+
+# Comment line sent on idle /events streams so proxies keep them open
+EVENTS_KEEPALIVE_SECONDS = 15
+
+# GET paths that aren't versioned by data_versions
+ETAG_EXCLUDED_PATHS = ("/", "/snooker/state", "/events", "/metrics")
+# Nor is anything under these prefixes (stored profiles change without a data version bump)
+ETAG_EXCLUDED_PREFIXES = ("/admin/",)
+
+def get_data_version() -> str:
+    db = database.SessionLocal()
+    try:
+        return DataVersionService.get_version(db)
+    finally:
+        db.close()
+
+@api.middleware("http")
+async def data_version_etag(request: Request, call_next):
+    """Tag GET responses with the data version and answer 304 when it is unchanged."""
+    path = request.scope["path"]
+    if request.method != "GET" or path in ETAG_EXCLUDED_PATHS or path.startswith(ETAG_EXCLUDED_PREFIXES):
+        return await call_next(request)
+
+    version = await run_in_threadpool(get_data_version)
+    # Hourly component so time-based fields (season countdowns, pantsed window) refresh
+    etag = f'W/"{version}-{datetime.now(timezone.utc):%Y%m%d%H}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    authorization = request.headers.get("Authorization", "")
+    if (
+        etag in [tag.strip() for tag in request.headers.get("If-None-Match", "").split(",")]
+        and authorization.startswith("Bearer ")
+        and is_valid_token(authorization[len("Bearer "):])
+    ):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response = await call_next(request)
+    if response.status_code == status.HTTP_200_OK:
+        response.headers.update(headers)
+    return response
+
+@api.middleware("http")
+async def profile_request(request: Request, call_next):
+    """Profile a request sent with X-Profile by an admin, or every PROFILE_SAMPLE_EVERY-th request.
+
+    The profile, with the request's SQL timeline, is stored in the rolling
+    buffer under /admin/profiles and its id returned in X-Profile-Id.
+    """
+    requested = "X-Profile" in request.headers
+    if requested:
+        access_password = request.headers.get('X-Admin-Password')
+        if not access_password or not verify_admin_password(access_password):
+            return JSONResponse(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                content={"detail": "Please provide the correct admin password"}
+            )
+    elif not request_profiler.sample_due(request.scope["path"]):
+        return await call_next(request)
+
+    stats = current_request.get()
+    sampler = request_profiler.start(stats)
+    status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        profile_id = await run_in_threadpool(
+            request_profiler.finish,
+            sampler, stats, threading.get_ident(), request.method, request.scope["path"], status_code, not requested
+        )
+    response.headers["X-Profile-Id"] = profile_id
+    return response
+
+# Registered after data_version_etag and profile_request so it wraps them: the
+# version lookup is counted, and the profiler finds the request's stats set
+@api.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Wall time, SQL statement count and database time per route, for /metrics."""
+    stats = RequestStats(route_template(api, request.scope))
+    context_token = current_request.set(stats)
+    status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        current_request.reset(context_token)
+        sql_metrics.record_request(request.method, stats.route, status_code, time.perf_counter() - stats.started, stats)
+
 @api.get("/")
 async def root():
     return {"message": "Shed Tournament API"}
 
+@api.get("/admin/profiles")
+def list_profiles(
+    request: Request,
+    token: dict = Depends(verify_token)
+):
+    """Stored request profiles, newest first."""
+    access_password = request.headers.get('X-Admin-Password')
+    if not access_password or not verify_admin_password(access_password):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Please provide the correct admin password"
+        )
+    return request_profiler.list_profiles()
+
+@api.get("/admin/profiles/{profile_id}")
+def get_profile(
+    profile_id: str,
+    request: Request,
+    token: dict = Depends(verify_token)
+):
+    """A stored profile: sampled call stacks (collapsed and top functions) and the SQL timeline."""
+    access_password = request.headers.get('X-Admin-Password')
+    if not access_password or not verify_admin_password(access_password):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Please provide the correct admin password"
+        )
+    profile = request_profiler.get_profile(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found")
+    return profile
+
+@api.get("/metrics")
+def get_metrics(token: dict = Depends(verify_token)):
+    """Request, SQL and connection pool metrics in the Prometheus text format."""
+    return Response(content=sql_metrics.render(), media_type="text/plain; version=0.0.4")
+
 @api.post("/login", response_model=Token)
 async def login(login_request: LoginRequest):
     if not verify_app_password(login_request.password):
@@ -70,59 +252,107 @@ async def login(login_request: LoginRequest):
     return {"access_token": access_token, "token_type": "bearer"}
 
 @api.post("/addplayer", response_model=PlayerResponse)
-async def addplayer(
+def addplayer(
     player: PlayerCreate,
     db: Session = Depends(database.get_db),
     token: dict = Depends(verify_token)
 ):
     db_player = PlayerService.create_player(db, player)
-    AuditLogService.create_log(db, f"Player {player.player_name} added")
+    audit_log = AuditLogService.create_log(db, f"Player {player.player_name} added")
+    broker.publish("player_added", {**db_player, "auditlog": AuditLogService.entry(audit_log)})
     return db_player
 
-@api.get("/players", response_model=list[dict])
+@api.get("/players", response_model=list[PlayerListEntry])
 async def get_players(
     season_id: int = -1,
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_async_db),
     token: dict = Depends(verify_token)
 ):
-    players = PlayerService.get_players(db,season_id)
+    players = await db.run_sync(PlayerService.get_players, season_id)
     return players
 
-@api.get("/stats/streaks", response_model=list[dict])
-async def get_player_streaks(
+@api.get("/dashboard", response_model=dict)
+def get_dashboard(
+    season_id: int = -1,
+    fields: Optional[str] = None,
+    db: Session = Depends(database.get_db),
+    token: dict = Depends(verify_token)
+):
+    """Home-screen datasets in one response; fields is a comma-separated subset."""
+    selected = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+    unknown = set(selected or []) - set(DASHBOARD_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown dashboard fields: {', '.join(sorted(unknown))}"
+        )
+    return DashboardService.get_dashboard(db, season_id, selected)
+
+@api.get("/stats/streaks", response_model=list[PlayerStreak])
+def get_player_streaks(
     db: Session = Depends(database.get_db),
     token: dict = Depends(verify_token)
 ):
     return StatsService.get_player_streaks(db)
 
-@api.get("/stats/streaks/longest", response_model=list[dict])
-async def get_best_streak(
+@api.get("/stats/streaks/longest", response_model=list[LongestStreak])
+def get_best_streak(
     db: Session = Depends(database.get_db),
     token: dict = Depends(verify_token)
 ):
     return StatsService.get_longest_streaks(db)
 
-@api.get("/stats/player-kds", response_model=list[dict])
-async def get_player_kds(
+@api.get("/stats/player-kds", response_model=list[PlayerKD])
+def get_player_kds(
+    season_id: int = -999,
+    limit: int = 20,
     db: Session = Depends(database.get_db),
     token: dict = Depends(verify_token)
 ):
-    return StatsService.get_player_kds(db)
+    return StatsService.get_player_kds(db, season_id, max(1, min(limit, MAX_PLAYER_KDS_LIMIT)))
 
 @api.get("/players/{player_id}", response_model=PlayerResponse)
 async def get_player(
     player_id: int,
     season_id: int = -1,
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_async_db),
     token: dict = Depends(verify_token)
 ):
-    player = PlayerService.get_player(db, player_id, season_id)
+    player = await db.run_sync(PlayerService.get_player, player_id, season_id)
     if not player:
         raise HTTPException(status_code=404, detail="Player not found")
     return player
 
+@api.get("/players/{player_id}/elo-history")
+def get_player_elo_history(
+    player_id: int,
+    season_id: int = -999,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    interval: str = "match",
+    db: Session = Depends(database.get_db),
+    token: dict = Depends(verify_token)
+):
+    if interval not in ELO_HISTORY_INTERVALS:
+        raise HTTPException(status_code=400, detail=f"Unknown interval {interval}, expected one of: {', '.join(ELO_HISTORY_INTERVALS)}")
+    history = PlayerService.get_elo_history(db, player_id, season_id, start, end, interval)
+    if not history:
+        raise HTTPException(status_code=404, detail=f"Player #{player_id} not found")
+    return history
+
+@api.get("/players/{player_id}/rivals")
+def get_player_rivals(
+    player_id: int,
+    limit: int = 5,
+    db: Session = Depends(database.get_db),
+    token: dict = Depends(verify_token)
+):
+    if not PlayerService.get_player(db, player_id):
+        raise HTTPException(status_code=404, detail=f"Player #{player_id} not found")
+    return HeadToHeadService.get_rivals(db, player_id, max(1, min(limit, MAX_RIVALS_LIMIT)))
+
 @api.put("/players/{player_id}")
-async def update_player(
+def update_player(
     player: PlayerUpdate,
     player_id: int,
     request: Request,
@@ -145,14 +375,15 @@ async def update_player(
     if not PlayerService.update_player(db, player_id, player):
         raise HTTPException(status_code=500, detail=f"Failed to update player #{player_id} {original_name}")
     
-    AuditLogService.create_log(
+    audit_log = AuditLogService.create_log(
         db,
         f"Player #{player_id} updated: Name changed from {original_name} to {player.player_name}."
     )
+    broker.publish("player_updated", {"id": player_id, "player_name": player.player_name, "auditlog": AuditLogService.entry(audit_log)})
     return {"message": f"Player {player_id} updated successfully"}
 
 @api.delete("/players/{player_id}")
-async def delete_player(
+def delete_player(
     player_id: int,
     request: Request,
     db: Session = Depends(database.get_db),
@@ -171,148 +402,206 @@ async def delete_player(
         raise HTTPException(status_code=500, detail=f"Failed to delete #{player_id} {player['player_name']}")
         
     
-    AuditLogService.create_log(db, f"Player #{player_id} {player['player_name']} deleted")
+    audit_log = AuditLogService.create_log(db, f"Player #{player_id} {player['player_name']} deleted")
+    broker.publish("player_deleted", {"id": player_id, "auditlog": AuditLogService.entry(audit_log)})
     return {"message": f"Player #{player_id} {player['player_name']} deleted successfully"}
 
 @api.get("/auditlog", response_model=list[AuditLogResponse])
-async def get_audit_log(
+def get_audit_log(
+    limit: int = 100,
+    before_timestamp: Optional[datetime] = None,
+    before_id: Optional[int] = None,
     db: Session = Depends(database.get_db),
     token: dict = Depends(verify_token)
 ):
-    return AuditLogService.get_logs(db)
+    """Newest entries first; for older ones pass the last entry's timestamp and id as before_timestamp and before_id."""
+    if (before_timestamp is None) != (before_id is None):
+        raise HTTPException(status_code=400, detail="Pass both before_timestamp and before_id, or neither")
+    return AuditLogService.get_logs(db, max(1, min(limit, MAX_AUDIT_LOG_PAGE)), before_timestamp, before_id)
 
 @api.post("/record-match")
-async def record_match(
+def record_match(
     match: MatchCreate,
     db: Session = Depends(database.get_db),
     token: dict = Depends(verify_token)
 ):
-    match_record, error = MatchService.create_match(db, match)
+    result, error = MatchService.create_match(db, match)
     if error:
         raise HTTPException(status_code=400, detail=error)
-    season_id = PlayerService.get_current_season(-998, db).id
-    winner1 = PlayerService.get_player(db,match.winner1_id, season_id)
-    loser1 = PlayerService.get_player(db,match.loser1_id, season_id)
-    winner2 = None
-    loser2 = None
-
-    lossMessage = "defeated"
-    if match.is_pantsed:
-        lossMessage = "pantsed"
-    # Create audit log
-    if match.is_doubles:
-        winner2 = PlayerService.get_player(db,match.winner2_id, season_id)
-        loser2 = PlayerService.get_player(db,match.loser2_id, season_id)
-        
-        AuditLogService.create_log(
-            db,
-            f"Doubles match recorded: Players {winner1['player_name']} ({winner1['elo']}) & {winner2['player_name']} ({winner2['elo']}) {lossMessage} {loser1['player_name']} ({loser1['elo']}) & {loser2['player_name']} ({loser2['elo']})"
+    response = {"message": "Match recorded successfully", **result}
+    # Clients patch their player list from the players' ledger rows as they now stand
+    player_ids = [player["id"] for player in result["winners"] + result["losers"]]
+    broker.publish("match_recorded", {**result, "ratings": RatingService.get_ledger_rows(db, player_ids)})
+    return response
+
+@api.post("/admin/import-matches")
+def import_matches(
+    request: Request,
+    file: UploadFile = File(...),
+    format: Optional[str] = None,
+    dry_run: bool = False,
+    db: Session = Depends(database.get_db),
+    token: dict = Depends(verify_token)
+):
+    """Bulk import historical matches from a CSV or NDJSON upload.
+
+    format defaults from the file extension. With dry_run the matches are
+    validated and rated but not saved, and the resulting standings returned.
+    """
+    access_password = request.headers.get('X-Admin-Password')
+    if not access_password or not verify_admin_password(access_password):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Please provide the correct admin password"
         )
-    else:
-        AuditLogService.create_log(
-            db,
-            f"Match recorded: {winner1['player_name']} ({winner1['elo']}) {lossMessage} {loser1['player_name']} ({loser1['elo']})"
+    if format is None:
+        format = "ndjson" if (file.filename or "").endswith((".ndjson", ".jsonl")) else "csv"
+    if format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format {format}, expected one of: {', '.join(IMPORT_FORMATS)}")
+
+    lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    result = MatchImportService.import_matches(db, lines, format, dry_run)
+    if result["error_count"]:
+        raise HTTPException(status_code=400, detail=result)
+    if not dry_run:
+        logging.info(f"Imported {result['imported']} matches from {file.filename}")
+        broker.publish("matches_imported", {"imported": result["imported"]})
+    return result
+
+@api.post("/admin/elo-replay/what-if")
+async def elo_what_if(
+    what_if: EloWhatIfRequest,
+    request: Request,
+    db: Session = Depends(database.get_db),
+    token: dict = Depends(verify_token)
+):
+    """Leaderboards from replaying the whole match history under other rating rules.
+
+    The replay runs in a worker process so it doesn't hold up other requests.
+    """
+    access_password = request.headers.get('X-Admin-Password')
+    if not access_password or not verify_admin_password(access_password):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Please provide the correct admin password"
         )
+    if not 0 < len(what_if.scenarios) <= MAX_WHAT_IF_SCENARIOS:
+        raise HTTPException(status_code=400, detail=f"Provide between 1 and {MAX_WHAT_IF_SCENARIOS} scenarios")
 
-    # Prepare response
-    response = {
-        "message": "Match recorded successfully",
-        "id": match_record.id,
-        "is_doubles": match.is_doubles,
-        "winners": [{
-            "id": winner1["id"],
-            "name": winner1["player_name"],
-            "new_elo": winner1["elo"],
-            "elo_change": match_record.winner1_elo_change
-        }],
-        "losers": [{
-            "id": loser1["id"],
-            "name": loser1["player_name"],
-            "new_elo": loser1["elo"],
-            "elo_change": match_record.loser1_elo_change
-        }]
-    }
-    if match.is_doubles:
-        response["winners"].append({
-            "id": winner2["id"],
-            "name": winner2["player_name"],
-            "new_elo": winner2["elo"],
-            "elo_change": match_record.winner2_elo_change
-        })
-        response["losers"].append({
-            "id": loser2["id"],
-            "name": loser2["player_name"],
-            "new_elo": loser2["elo"],
-            "elo_change": match_record.loser2_elo_change
-        })
-    return response
+    log, players, ledger_season_id = await run_in_threadpool(ReplayService.what_if_inputs, db, what_if.season_id)
+    scenarios = [scenario.model_dump() for scenario in what_if.scenarios]
+    ratings, matches_played = await asyncio.get_running_loop().run_in_executor(
+        get_replay_pool(), replay_scenarios, log, scenarios
+    )
+    return ReplayService.leaderboards(log, ratings, matches_played, scenarios, players, ledger_season_id, what_if.limit)
 
 @api.get("/stats/most-matches", response_model=dict)
-async def get_most_matches_in_day(
+def get_most_matches_in_day(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    season_id: int = -999,
     db: Session = Depends(database.get_db),
     token: dict = Depends(verify_token)
 ):
-    return StatsService.get_most_matches_in_day(db)
+    return StatsService.get_most_matches_in_day(db, start, end, season_id)
 
 @api.get("/stats/total-matches", response_model=dict)
-async def get_total_matches(
+def get_total_matches(
+    season_id: int = -999,
     db: Session = Depends(database.get_db),
     token: dict = Depends(verify_token)
 ):
-    return StatsService.get_total_matches(db)
+    return StatsService.get_total_matches(db, season_id)
 
 @api.get("/seasons", response_model=list[dict])
-async def get_seasons(
+def get_seasons(
     db: Session = Depends(database.get_db),
     token: dict = Depends(verify_token)
 ):
     return PlayerService.get_seasons(db)
 
+def match_event(result: dict) -> dict:
+    """Event payload for an undone or edited match: the match, its audit entry and the ledger rows that moved."""
+    ratings = [
+        {"player_id": change["player_id"], "season_id": change["season_id"], "elo": change["elo_after"], "matches_played": change["matches_played_after"]}
+        for change in result["rating_changes"]
+    ]
+    return {**result["match"], "auditlog": result["auditlog"], "ratings": ratings}
+
 @api.delete("/matches/{match_id}")
-async def delete_match(
+def delete_match(
     match_id: int,
     request: Request,
     db: Session = Depends(database.get_db),
     token: dict = Depends(verify_token)
 ):
-    match_info, error = MatchService.delete_match(db, match_id)
+    """Undo a match; later matches whose ratings depended on it are recomputed.
+
+    Undoing the latest match is open to everyone, anything older needs the admin password.
+    """
+    if MatchService.has_later_matches(db, match_id):
+        access_password = request.headers.get('X-Admin-Password')
+        if not access_password or not verify_admin_password(access_password):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Only the latest match can be undone without the admin password")
+    result, error = MatchService.delete_match(db, match_id)
     if error:
-        raise HTTPException(status_code=500, detail=error)
-    AuditLogService.create_log(
-        db,
-        f"Match #{match_id} between "
-        f"{match_info.get('winner1_name', '')}"
-        f"{(' & ' + match_info['winner2_name']) if match_info.get('is_doubles') and match_info.get('winner2_name') else ''} "
-        f"and {match_info.get('loser1_name', '')}"
-        f"{(' & ' + match_info['loser2_name']) if match_info.get('is_doubles') and match_info.get('loser2_name') else ''} undone"
-    )
-    return {"message": f"Match #{match_id} deleted successfully", "match": match_info}
+        raise HTTPException(status_code=404, detail=error)
+    broker.publish("match_undone", match_event(result))
+    return {"message": f"Match #{match_id} deleted successfully", **result}
+
+@api.put("/matches/{match_id}")
+def update_match(
+    match_id: int,
+    match: MatchCreate,
+    request: Request,
+    db: Session = Depends(database.get_db),
+    token: dict = Depends(verify_token)
+):
+    """Correct the players or events of a recorded match; later matches are recomputed."""
+    access_password = request.headers.get('X-Admin-Password')
+    if not access_password or not verify_admin_password(access_password):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Please provide the correct admin password"
+        )
+    result, error = MatchService.update_match(db, match_id, match)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    broker.publish("match_updated", match_event(result))
+    return {"message": f"Match #{match_id} updated successfully", **result}
 
 @api.get("/stats/matches-per-day", response_model=list[MatchesPerDay])
-async def get_matches_per_day(
+def get_matches_per_day(
     player_id: int = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    season_id: int = -999,
     db: Session = Depends(database.get_db),
     token: dict = Depends(verify_token)
 ):
-    return StatsService.get_matches_per_day(db, player_id)
+    return StatsService.get_matches_per_day(db, player_id, start, end, season_id)
 
 @api.get("/snooker/state", response_model=SnookerState)
-async def get_snooker_state(
+def get_snooker_state(
+    table_id: int = DEFAULT_TABLE_ID,
     db: Session = Depends(database.get_db),
     token: dict = Depends(verify_token)
 ):
-    return SnookerService.get_state(db)
+    return SnookerService.get_state(db, table_id)
 
 @api.post("/snooker/action", response_model=SnookerState)
-async def post_snooker_action(
+def post_snooker_action(
     action: SnookerAction,
+    table_id: int = DEFAULT_TABLE_ID,
     db: Session = Depends(database.get_db),
     token: dict = Depends(verify_token)
 ):
-    return SnookerService.apply_action(db, action.model_dump())
+    state = SnookerService.apply_action(db, action.model_dump(), table_id)
+    broker.publish("snooker_state", state)
+    return state
 
 @api.get("/stats/head-to-head")
-async def get_head_to_head_stats(
+def get_head_to_head_stats(
     player1_id: int,
     player2_id: int,
     db: Session = Depends(database.get_db),
@@ -320,3 +609,40 @@ async def get_head_to_head_stats(
 ):
     return StatsService.get_head_to_head_stats(db, player1_id, player2_id)
 
+@api.get("/stats/head-to-head/matrix")
+def get_head_to_head_matrix(
+    db: Session = Depends(database.get_db),
+    token: dict = Depends(verify_token)
+):
+    """Wins of every active player against every other, wins[row][column]."""
+    return HeadToHeadService.get_matrix(db)
+
+@api.get("/events")
+async def stream_events(request: Request, token: str):
+    """Server-Sent Events stream of data changes.
+
+    EventSource can't send headers, so the bearer token is passed as ?token=.
+    Events: player_added, player_updated, player_deleted, match_recorded,
+    match_undone, match_updated, matches_imported, snooker_state, and
+    resync when the client fell behind.
+    """
+    if not is_valid_token(token):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials"
+        )
+
+    async def event_stream():
+        async with broker.subscribe() as queue:
+            yield ": connected\n\n"
+            while not await request.is_disconnected():
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,77 @@
+"""Maintenance commands, run from the backend directory:
+
+    python -m app.manage migrate
+    python -m app.manage rebuild-ratings
+    python -m app.manage verify-elo
+    python -m app.manage recompute-elo
+"""
+import argparse
+import logging
+
+from .database import SessionLocal, init_db
+from .services import RatingService
+from .services.replay_service import ReplayService
+
+def migrate(args):
+    init_db()
+
+def rebuild_ratings(args):
+    db = SessionLocal()
+    try:
+        rows = RatingService.rebuild(db)
+        logging.info(f"Rebuilt player_ratings: {rows} rows")
+    finally:
+        db.close()
+
+def verify_elo(args):
+    db = SessionLocal()
+    try:
+        report = ReplayService.verify(db)
+        logging.info(f"Checked {report['matches']} matches: {report['mismatch_count']} stored elo changes differ")
+        for mismatch in report["mismatches"]:
+            logging.info(f"Match #{mismatch['match_id']}: stored {mismatch['stored']}, expected {mismatch['expected']}")
+    finally:
+        db.close()
+
+def recompute_elo(args):
+    db = SessionLocal()
+    try:
+        changed = ReplayService.rebuild(db)
+        logging.info(f"Recomputed elo for all matches: {changed} matches changed")
+    finally:
+        db.close()
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Shed Tournament maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate_command = commands.add_parser(
+        "migrate",
+        help="Create tables, apply pending SQL migrations and backfill derived tables"
+    )
+    migrate_command.set_defaults(func=migrate)
+
+    rebuild_command = commands.add_parser(
+        "rebuild-ratings",
+        help="Regenerate player_ratings from matches (run after changing game_seasons)"
+    )
+    rebuild_command.set_defaults(func=rebuild_ratings)
+
+    verify_command = commands.add_parser(
+        "verify-elo",
+        help="Replay every match and report stored elo changes that don't match the rating rules"
+    )
+    verify_command.set_defaults(func=verify_elo)
+
+    recompute_command = commands.add_parser(
+        "recompute-elo",
+        help="Replay every match and overwrite the stored starting elos and elo changes"
+    )
+    recompute_command.set_defaults(func=recompute_elo)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
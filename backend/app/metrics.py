@@ -0,0 +1,198 @@
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import Match
+
+# Histogram upper bounds; +Inf is implied
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+# Longest statement text written to the slow-query log and profile timelines
+SLOW_QUERY_LOG_CHARS = 500
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(str(value))}"' for name, value in pairs) + "}"
+
+def format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, rendered in the Prometheus text format."""
+
+    def __init__(self, name: str, help_text: str, buckets: Iterable[float]):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self._series: Dict[Labels, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Labels, value: float) -> None:
+        with self._lock:
+            # Bucket counts, then sum and count
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[position] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, list(values)) for labels, values in self._series.items())
+        for labels, values in series:
+            for bound, count in zip(self.buckets, values):
+                lines.append(f"{self.name}_bucket{format_labels(labels, ('le', format_value(bound)))} {format_value(count)}")
+            lines.append(f"{self.name}_bucket{format_labels(labels, ('le', '+Inf'))} {format_value(values[-1])}")
+            lines.append(f"{self.name}_sum{format_labels(labels)} {format_value(values[-2])}")
+            lines.append(f"{self.name}_count{format_labels(labels)} {format_value(values[-1])}")
+        return lines
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._series: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            series = sorted(self._series.items())
+        lines.extend(f"{self.name}{format_labels(labels)} {format_value(value)}" for labels, value in series)
+        return lines
+
+class RequestStats:
+    """SQL issued while serving one request.
+
+    timeline is None unless the request is being profiled, in which case each
+    statement is appended as a dict with its offset, duration, text and thread.
+    """
+
+    __slots__ = ("route", "queries", "db_seconds", "started", "timeline")
+
+    def __init__(self, route: str):
+        self.route = route
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.started = time.perf_counter()
+        self.timeline: Optional[List[dict]] = None
+
+# Set by the metrics middleware. Context is copied into the threadpool for sync
+# routes and into the greenlet for async sessions, so statements land on the
+# request that issued them; statements outside a request find None.
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+class SqlMetrics:
+    """Per-route request, query and database-time histograms, plus connection pool gauges.
+
+    instrument() hooks an engine's cursor events; statements slower than
+    slow_query_ms (0 disables) are logged with the route that issued them.
+    """
+
+    def __init__(self):
+        self.slow_query_ms = 0
+        self.engines: Dict[str, Engine] = {}
+        self.request_duration = Histogram(
+            "shed_http_request_duration_seconds", "Wall time to serve a request.", DURATION_BUCKETS
+        )
+        self.request_queries = Histogram(
+            "shed_http_request_queries", "SQL statements issued per request.", QUERY_COUNT_BUCKETS
+        )
+        self.request_db_duration = Histogram(
+            "shed_http_request_db_seconds", "Time per request spent waiting on SQL statements.", DURATION_BUCKETS
+        )
+        self.requests = Counter("shed_http_requests_total", "Requests served, by response status.")
+        self.slow_queries = Counter("shed_db_slow_queries_total", "Statements slower than the slow-query threshold.")
+
+    def instrument(self, name: str, engine: Engine) -> None:
+        self.engines[name] = engine
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine, "handle_error", self._handle_error)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        query_started = conn.info["query_started"].pop()
+        elapsed = time.perf_counter() - query_started
+        stats = current_request.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+            if stats.timeline is not None:
+                stats.timeline.append({
+                    "offset_ms": round((query_started - stats.started) * 1000, 3),
+                    "duration_ms": round(elapsed * 1000, 3),
+                    "statement": " ".join(statement.split())[:SLOW_QUERY_LOG_CHARS],
+                    "executemany": executemany,
+                    "thread": threading.get_ident()
+                })
+        if self.slow_query_ms and elapsed * 1000 >= self.slow_query_ms:
+            route = stats.route if stats else "-"
+            self.slow_queries.inc((("route", route),))
+            logging.warning(f"Slow query ({elapsed * 1000:.0f} ms, {route}): {' '.join(statement.split())[:SLOW_QUERY_LOG_CHARS]}")
+
+    def _handle_error(self, exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_started"):
+            connection.info["query_started"].pop()
+
+    def record_request(self, method: str, route: str, status_code: int, seconds: float, stats: RequestStats) -> None:
+        labels = (("method", method), ("route", route))
+        self.request_duration.observe(labels, seconds)
+        self.request_queries.observe(labels, stats.queries)
+        self.request_db_duration.observe(labels, stats.db_seconds)
+        self.requests.inc(labels + (("status", str(status_code)),))
+
+    def pool_lines(self) -> List[str]:
+        gauges = (
+            ("shed_db_pool_size", "Connections the pool keeps open.", "size"),
+            ("shed_db_pool_checked_out", "Connections currently in use.", "checkedout"),
+            ("shed_db_pool_checked_in", "Idle connections in the pool.", "checkedin"),
+            ("shed_db_pool_overflow", "Connections open beyond the pool size.", "overflow"),
+        )
+        lines = []
+        for name, help_text, method in gauges:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            for engine_name, engine in sorted(self.engines.items()):
+                # Only queue pools report these; SQLite in-memory pools don't
+                if hasattr(engine.pool, method):
+                    lines.append(f"{name}{format_labels((('engine', engine_name),))} {format_value(getattr(engine.pool, method)())}")
+        return lines
+
+    def render(self) -> str:
+        lines = []
+        for metric in (self.request_duration, self.request_queries, self.request_db_duration, self.requests, self.slow_queries):
+            lines += metric.render()
+        lines += self.pool_lines()
+        return "\n".join(lines) + "\n"
+
+sql_metrics = SqlMetrics()
+
+def route_template(app, scope) -> str:
+    """The path template of the route a request will hit, so ids don't each get their own series."""
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", scope["path"])
+    return "unmatched"
@@ -0,0 +1,13 @@
+-- Backfill match_participants with one row per player per existing match
+INSERT INTO match_participants (match_id, side, slot, player_id, elo_change, timestamp)
+SELECT * FROM (
+    SELECT id, 'winner', 1, winner1_id, winner1_elo_change, timestamp FROM matches WHERE winner1_id IS NOT NULL
+    UNION ALL
+    SELECT id, 'winner', 2, winner2_id, winner2_elo_change, timestamp FROM matches WHERE winner2_id IS NOT NULL
+    UNION ALL
+    SELECT id, 'loser', 1, loser1_id, loser1_elo_change, timestamp FROM matches WHERE loser1_id IS NOT NULL
+    UNION ALL
+    SELECT id, 'loser', 2, loser2_id, loser2_elo_change, timestamp FROM matches WHERE loser2_id IS NOT NULL
+) AS participants
+WHERE true
+ON CONFLICT (match_id, side, slot) DO NOTHING;
@@ -0,0 +1,6 @@
+-- Initialize change counters used to build the API data version (ETag)
+INSERT INTO data_versions (name, version)
+VALUES ('matches', 0),
+    ('players', 0),
+    ('seasons', 0)
+ON CONFLICT (name) DO NOTHING;
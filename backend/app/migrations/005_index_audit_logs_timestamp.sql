@@ -0,0 +1,2 @@
+-- Index for newest-first keyset pagination of the audit log
+CREATE INDEX IF NOT EXISTS ix_audit_logs_timestamp_id ON audit_logs (timestamp, id);
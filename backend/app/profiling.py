@@ -0,0 +1,191 @@
+import itertools
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+from .metrics import RequestStats
+
+# How often the sampler reads every thread's stack
+SAMPLE_INTERVAL_SECONDS = 0.002
+# Functions listed in a profile's top self/total tables
+PROFILE_TOP_FUNCTIONS = 30
+# Innermost frames that mean a thread is waiting rather than working
+IDLE_FRAMES = {("selectors.py", "select"), ("threading.py", "wait"), ("queue.py", "get")}
+# Paths never picked by the every-Nth-request sampling
+SAMPLING_EXCLUDED_PATHS = ("/events", "/metrics")
+PROFILE_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+Frame = Tuple[str, str]
+
+def frame_name(frame: Frame) -> str:
+    return f"{frame[1]} ({frame[0]})"
+
+class StackSampler:
+    """Statistical profiler: a background thread records every thread's Python stack at a fixed interval.
+
+    Sync routes run in threadpool workers and async ones on the event loop, so
+    a cProfile enabled in the middleware would only see one of them; sampling
+    every thread and keeping the ones that served the request sees both.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL_SECONDS):
+        self.interval = interval
+        self.stacks: Dict[int, Counter] = {}
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own_ident = threading.get_ident()
+        while not self._stopping.is_set():
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append((os.path.basename(frame.f_code.co_filename), frame.f_code.co_name))
+                    frame = frame.f_back
+                if stack and stack[0] not in IDLE_FRAMES:
+                    self.stacks.setdefault(ident, Counter())[tuple(reversed(stack))] += 1
+            time.sleep(self.interval)
+
+    def summary(self, threads: Set[int]) -> dict:
+        """Samples from the given threads as collapsed stacks and top functions by self and total samples."""
+        stacks = Counter()
+        for ident in threads:
+            stacks.update(self.stacks.get(ident, {}))
+        self_samples = Counter()
+        total_samples = Counter()
+        for stack, count in stacks.items():
+            self_samples[stack[-1]] += count
+            for frame in set(stack):
+                total_samples[frame] += count
+        return {
+            "samples": sum(stacks.values()),
+            "sample_interval_ms": self.interval * 1000,
+            "top_self": [{"function": frame_name(frame), "samples": count} for frame, count in self_samples.most_common(PROFILE_TOP_FUNCTIONS)],
+            "top_total": [{"function": frame_name(frame), "samples": count} for frame, count in total_samples.most_common(PROFILE_TOP_FUNCTIONS)],
+            # flamegraph.pl / speedscope "collapsed" format, outermost frame first
+            "collapsed": [
+                f"{';'.join(frame_name(frame) for frame in stack)} {count}"
+                for stack, count in stacks.most_common()
+            ]
+        }
+
+class RequestProfiler:
+    """Profiles single requests and keeps the results as JSON files in a rolling on-disk buffer.
+
+    A request is profiled when an admin asks for it, or as every sample_every-th
+    request when sampling is on (0 turns it off). Only the newest buffer_size
+    profiles are kept.
+    """
+
+    def __init__(self):
+        self.directory = ""
+        self.buffer_size = 50
+        self.sample_every = 0
+        self._requests = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def configure(self, directory: str, buffer_size: int, sample_every: int) -> None:
+        self.directory = directory
+        self.buffer_size = buffer_size
+        self.sample_every = sample_every
+
+    def sample_due(self, path: str) -> bool:
+        if self.sample_every <= 0 or path in SAMPLING_EXCLUDED_PATHS:
+            return False
+        return next(self._requests) % self.sample_every == 0
+
+    def start(self, stats: RequestStats) -> StackSampler:
+        stats.timeline = []
+        sampler = StackSampler()
+        sampler.start()
+        return sampler
+
+    def finish(
+        self,
+        sampler: StackSampler,
+        stats: RequestStats,
+        request_thread: int,
+        method: str,
+        path: str,
+        status_code: int,
+        sampled: bool
+    ) -> str:
+        """Stop sampling, store the profile and return its id."""
+        sampler.stop()
+        duration_ms = (time.perf_counter() - stats.started) * 1000
+        threads = {request_thread} | {query["thread"] for query in stats.timeline}
+        profile_id = uuid.uuid4().hex
+        profile = {
+            "id": profile_id,
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "method": method,
+            "path": path,
+            "route": stats.route,
+            "status": status_code,
+            "sampled": sampled,
+            "duration_ms": round(duration_ms, 3),
+            "queries": stats.queries,
+            "db_ms": round(stats.db_seconds * 1000, 3),
+            **sampler.summary(threads),
+            "sql": stats.timeline
+        }
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            # Timestamped names sort oldest first
+            file_name = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}-{profile_id}.json"
+            with open(os.path.join(self.directory, file_name), "w") as profile_file:
+                json.dump(profile, profile_file)
+            stored = sorted(name for name in os.listdir(self.directory) if name.endswith(".json"))
+            for old_name in stored[:max(0, len(stored) - self.buffer_size)]:
+                os.remove(os.path.join(self.directory, old_name))
+        logging.info(f"Profiled {method} {path} ({duration_ms:.0f} ms, {stats.queries} queries): {profile_id}")
+        return profile_id
+
+    def _files(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted((name for name in os.listdir(self.directory) if name.endswith(".json")), reverse=True)
+
+    def list_profiles(self) -> List[dict]:
+        """Summaries of the stored profiles, newest first."""
+        summaries = []
+        for name in self._files():
+            try:
+                with open(os.path.join(self.directory, name)) as profile_file:
+                    profile = json.load(profile_file)
+            except (OSError, ValueError):
+                # Rotated out while listing
+                continue
+            summaries.append({
+                field: profile[field]
+                for field in ("id", "started_at", "method", "path", "route", "status", "sampled", "duration_ms", "queries", "db_ms", "samples")
+            })
+        return summaries
+
+    def get_profile(self, profile_id: str) -> Optional[dict]:
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        for name in self._files():
+            if name.endswith(f"-{profile_id}.json"):
+                with open(os.path.join(self.directory, name)) as profile_file:
+                    return json.load(profile_file)
+        return None
+
+request_profiler = RequestProfiler()
@@ -0,0 +1,188 @@
+"""Full-history ELO replay over the match log.
+
+Ratings depend on every earlier match, so matches are always walked in
+order. Each scenario is normally walked over plain Python lists with the
+same elo functions /record-match uses, since per-match NumPy calls on a
+handful of ratings cost more than the arithmetic they replace. Only for
+many scenarios at once (large what-if runs) is the history walked a single
+time with the rating state as a (scenario, player, season) array, each step
+updating every scenario together. Kept free of database imports so it can
+run in a worker process.
+"""
+from dataclasses import dataclass
+from typing import List, Sequence, Tuple
+import numpy as np
+from . import elo
+
+DEFAULT_K_FACTOR = 30  # elo.calculate_new_ratings default
+# Scenario count from which one NumPy pass beats a Python pass per scenario
+# (about 8 on 20k matches; see bench/replay.py)
+BROADCAST_MIN_SCENARIOS = 8
+
+@dataclass
+class MatchLog:
+    """Match history in replay order (timestamp, then id).
+
+    players holds dense player indexes for winner1, winner2, loser1, loser2
+    (-1 for an empty slot) and stored_changes the stored elo changes in the
+    same slots. rating_season is the dense season whose rating a match is
+    played at (the innermost season containing it, 0 = lifetime) and
+    counts_towards marks every season the match's changes apply to.
+    """
+    match_ids: np.ndarray         # (matches,) int64
+    player_ids: np.ndarray        # (players,) int64, dense index -> players.id
+    season_ids: np.ndarray        # (seasons,) int64, dense index -> season id, [0] = lifetime
+    players: np.ndarray           # (matches, 4) int64
+    stored_changes: np.ndarray    # (matches, 4) float64, nan for empty slots
+    rating_season: np.ndarray     # (matches,) int64
+    counts_towards: np.ndarray    # (matches, seasons) bool
+
+@dataclass
+class Scenario:
+    k_factor: float = DEFAULT_K_FACTOR
+    initial_elo: float = 1000
+    season_resets: bool = True  # False rates every match at the player's lifetime elo
+
+@dataclass
+class ReplayResult:
+    changes: np.ndarray         # (scenarios, matches, 2) winner and loser elo change, as stored
+    starting_elos: np.ndarray   # (scenarios, matches, 4) rating each player started the match at
+    ratings: np.ndarray         # (scenarios, players, seasons) final elo
+    matches_played: np.ndarray  # (players, seasons)
+
+def replay(log: MatchLog, scenarios: Sequence[Scenario], use_stored_changes: bool = False) -> ReplayResult:
+    """Recompute every match's elo changes in order for each scenario.
+
+    With use_stored_changes, ratings advance by the stored changes instead of
+    the recomputed ones, so each recomputed change is what /record-match
+    should have produced given the ratings actually in effect at the time.
+    """
+    if len(scenarios) >= BROADCAST_MIN_SCENARIOS:
+        return replay_many(log, scenarios, use_stored_changes)
+    results = [replay_single(log, scenario, use_stored_changes) for scenario in scenarios]
+    return ReplayResult(
+        changes=np.concatenate([result.changes for result in results]),
+        starting_elos=np.concatenate([result.starting_elos for result in results]),
+        ratings=np.concatenate([result.ratings for result in results]),
+        matches_played=results[0].matches_played
+    )
+
+def match_seasons(log: MatchLog) -> List[List[int]]:
+    """Dense season indexes each match counts towards, per match."""
+    seasons = [[] for _ in range(len(log.match_ids))]
+    for match, season in zip(*(positions.tolist() for positions in np.nonzero(log.counts_towards))):
+        seasons[match].append(season)
+    return seasons
+
+def replay_single(log: MatchLog, scenario: Scenario, use_stored_changes: bool = False) -> ReplayResult:
+    """replay() for one scenario, over Python lists."""
+    match_count = len(log.match_ids)
+    player_count = len(log.player_ids)
+    season_count = len(log.season_ids)
+    ratings = [[float(scenario.initial_elo)] * season_count for _ in range(player_count)]
+    matches_played = [[0] * season_count for _ in range(player_count)]
+    rating_seasons = log.rating_season.tolist() if scenario.season_resets else [0] * match_count
+    stored_changes = np.nan_to_num(log.stored_changes).tolist()
+    changes = []
+    starting_elos = []
+
+    for slots, seasons, rating_season, stored in zip(log.players.tolist(), match_seasons(log), rating_seasons, stored_changes):
+        winners = [player for player in slots[:2] if player >= 0]
+        losers = [player for player in slots[2:] if player >= 0]
+        winner_elos = [ratings[player][rating_season] for player in winners]
+        loser_elos = [ratings[player][rating_season] for player in losers]
+        starting_elos.append(
+            winner_elos + [np.nan] * (2 - len(winners)) + loser_elos + [np.nan] * (2 - len(losers))
+        )
+
+        winner_team = sum(winner_elos) / len(winner_elos)
+        loser_team = sum(loser_elos) / len(loser_elos)
+        new_winner, new_loser = elo.calculate_new_ratings(winner_team, loser_team, scenario.k_factor)
+        winner_change = elo.column_int(new_winner - winner_team)
+        loser_change = elo.column_int(new_loser - loser_team)
+        changes.append((winner_change, loser_change))
+
+        if use_stored_changes:
+            winner_change, loser_change = stored[0], stored[2]
+        for players, change in ((winners, winner_change), (losers, loser_change)):
+            for player in players:
+                player_ratings = ratings[player]
+                player_matches = matches_played[player]
+                for season in seasons:
+                    player_ratings[season] += change
+                    player_matches[season] += 1
+
+    return ReplayResult(
+        changes=np.array(changes, dtype=np.float64).reshape(1, match_count, 2),
+        starting_elos=np.array(starting_elos, dtype=np.float64).reshape(1, match_count, 4),
+        ratings=np.array(ratings, dtype=np.float64).reshape(1, player_count, season_count),
+        matches_played=np.array(matches_played, dtype=np.int64).reshape(player_count, season_count)
+    )
+
+def replay_many(log: MatchLog, scenarios: Sequence[Scenario], use_stored_changes: bool = False) -> ReplayResult:
+    """replay() broadcasting each match across every scenario at once."""
+    scenario_count = len(scenarios)
+    match_count = len(log.match_ids)
+    k_factors = np.array([scenario.k_factor for scenario in scenarios], dtype=np.float64)
+    season_resets = np.array([scenario.season_resets for scenario in scenarios])
+    ratings = np.empty((scenario_count, len(log.player_ids), len(log.season_ids)), dtype=np.float64)
+    ratings[:] = np.array([scenario.initial_elo for scenario in scenarios])[:, None, None]
+    matches_played = np.zeros(ratings.shape[1:], dtype=np.int64)
+    changes = np.zeros((scenario_count, match_count, 2), dtype=np.float64)
+    starting_elos = np.full((scenario_count, match_count, 4), np.nan)
+
+    # Index arrays for every match are built up front, leaving the loop only the rating updates
+    scenario_index = np.arange(scenario_count)[:, None]
+    rating_seasons = np.where(season_resets[:, None], log.rating_season[None, :], 0)[:, :, None]
+    stored_changes = np.nan_to_num(log.stored_changes).tolist()
+    match_players = []
+    for slots in log.players.tolist():
+        winners = [player for player in slots[:2] if player >= 0]
+        losers = [player for player in slots[2:] if player >= 0]
+        match_players.append((np.array(winners), np.array(losers), np.array(winners + losers)[:, None]))
+    seasons_by_match = [np.array(seasons)[None, :] for seasons in match_seasons(log)]
+
+    for i, ((winners, losers, participants), seasons, stored) in enumerate(zip(match_players, seasons_by_match, stored_changes)):
+        rating_season = rating_seasons[:, i]
+        winner_elos = ratings[scenario_index, winners, rating_season]
+        loser_elos = ratings[scenario_index, losers, rating_season]
+        starting_elos[:, i, :len(winners)] = winner_elos
+        starting_elos[:, i, 2:2 + len(losers)] = loser_elos
+
+        # Same arithmetic as elo.calculate_new_ratings on the team averages
+        winner_team = winner_elos.mean(axis=1)
+        loser_team = loser_elos.mean(axis=1)
+        winner_prob = 1.0 / (1 + np.power(10, (loser_team - winner_team) / 400.0))
+        loser_prob = 1.0 / (1 + np.power(10, (winner_team - loser_team) / 400.0))
+        winner_change = elo.column_int_array(np.round(winner_team + k_factors * (1 - winner_prob)) - winner_team)
+        loser_change = elo.column_int_array(np.round(loser_team + k_factors * (0 - loser_prob)) - loser_team)
+        changes[:, i, 0] = winner_change
+        changes[:, i, 1] = loser_change
+
+        if use_stored_changes:
+            ratings[:, winners[:, None], seasons] += stored[0]
+            ratings[:, losers[:, None], seasons] += stored[2]
+        else:
+            ratings[:, winners[:, None], seasons] += winner_change[:, None, None]
+            ratings[:, losers[:, None], seasons] += loser_change[:, None, None]
+        matches_played[participants, seasons] += 1
+
+    return ReplayResult(
+        changes=changes,
+        starting_elos=starting_elos,
+        ratings=ratings,
+        matches_played=matches_played
+    )
+
+def stored_mismatches(log: MatchLog, result: ReplayResult, scenario: int = 0) -> np.ndarray:
+    """Indexes of matches whose stored winner1/loser1 change differs from the replay."""
+    stored = log.stored_changes[:, [0, 2]]
+    return np.flatnonzero(np.any(stored != result.changes[scenario], axis=1))
+
+def replay_scenarios(log: MatchLog, scenarios: List[dict]) -> Tuple[np.ndarray, np.ndarray]:
+    """Process pool entry point for what-if runs: final (ratings, matches_played).
+
+    Scenarios arrive as plain dicts; the per-match arrays stay in the worker.
+    """
+    result = replay(log, [Scenario(**scenario) for scenario in scenarios])
+    return result.ratings, result.matches_played
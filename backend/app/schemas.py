@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from typing import List, Optional, Literal
+from typing_extensions import TypedDict
 from datetime import datetime
 
 # Player schemas
@@ -19,6 +20,16 @@ class PlayerResponse(PlayerBase):
     class Config:
         from_attributes = True
 
+# Rows of the list endpoints are TypedDicts: the services already build dicts,
+# and validating a dict costs a fraction of constructing a model per row
+class PlayerListEntry(TypedDict):
+    id: int
+    player_name: str
+    elo: int
+    total_matches: int
+    recently_pantsed: bool
+    matches_in_season: int
+
 # Match schemas
 class MatchBase(BaseModel):
     is_doubles: bool = False
@@ -73,6 +84,27 @@ class Stats(BaseModel):
     longest_streak: int
     elo: int
 
+class PlayerStreak(TypedDict):
+    player_id: int
+    player_name: str
+    current_streak: int
+    elo: int
+    elo_change: int
+
+class LongestStreak(TypedDict):
+    player_id: int
+    player_name: str
+    longest_streak: int
+    longest_streak_elo_change: int
+    streak_type: Literal['win', 'loss']
+
+class PlayerKD(TypedDict):
+    player_id: int
+    player_name: str
+    wins: int
+    losses: int
+    kd: float
+
 # Snooker schemas
 class SnookerState(BaseModel):
     top: int
@@ -80,12 +112,26 @@ class SnookerState(BaseModel):
     colours_enabled: dict[str, bool]
     red_enabled: bool
     red_count: int
+    table_id: int
+    frame_id: Optional[int] = None
+    can_undo: bool = False
 
 class SnookerAction(BaseModel):
-    type: Literal['red', 'colour', 'miss', 'foul', 'foul_colour', 'foul_red', 'reset']
+    type: Literal['red', 'colour', 'miss', 'foul', 'foul_colour', 'foul_red', 'reset', 'undo']
     slot: Optional[Literal['top', 'bottom']] = None
     colour: Optional[str] = None
 
+# ELO replay schemas
+class EloScenario(BaseModel):
+    k_factor: float = 30
+    initial_elo: float = 1000
+    season_resets: bool = True
+
+class EloWhatIfRequest(BaseModel):
+    scenarios: List[EloScenario]
+    season_id: int = -999
+    limit: int = 20
+
 class EventTypeBase(BaseModel):
     name: str
 
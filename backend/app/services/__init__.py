@@ -2,5 +2,10 @@ from .player_service import PlayerService
 from .match_service import MatchService
 from .audit_log_service import AuditLogService
 from .stats_service import StatsService
+from .rating_service import RatingService
+from .dashboard_service import DashboardService
+from .import_service import MatchImportService
+from .head_to_head_service import HeadToHeadService
+from .daily_match_service import DailyMatchService
 
-__all__ = ['PlayerService', 'MatchService', 'AuditLogService', 'StatsService'] 
\ No newline at end of file
+__all__ = ['PlayerService', 'MatchService', 'AuditLogService', 'StatsService', 'RatingService', 'DashboardService', 'MatchImportService', 'HeadToHeadService', 'DailyMatchService'] 
\ No newline at end of file
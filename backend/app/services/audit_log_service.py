@@ -1,19 +1,144 @@
+import logging
+import threading
+from datetime import datetime, timezone
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy import insert, tuple_
+from typing import Any, Callable, Dict, List, Optional
 from .. import base
 
+# Longest a queued entry waits before the write-behind thread inserts it
+AUDIT_LOG_FLUSH_SECONDS = 1.0
+# Entries inserted per statement; reaching it wakes the thread early
+AUDIT_LOG_BATCH_SIZE = 500
+
+class AuditLogWriter:
+    """Write-behind queue for audit entries, inserted in batches by a background thread.
+
+    Entries keep the time they were queued. A failed batch goes back on the
+    queue to be retried, and stop() flushes whatever is left before returning.
+    """
+
+    def __init__(self):
+        self._pending: List[dict] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._session_factory: Optional[Callable[[], Session]] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, session_factory: Callable[[], Session]) -> None:
+        if self._thread is not None:
+            return
+        self._session_factory = session_factory
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the thread once every queued entry has been written."""
+        if self._thread is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+        with self._lock:
+            if self._pending:
+                logging.error(f"Audit log writer stopped with {len(self._pending)} unwritten entries: {self._pending}")
+
+    def enqueue(self, log: str) -> None:
+        with self._lock:
+            self._pending.append({"log": log, "timestamp": datetime.now(timezone.utc)})
+            if len(self._pending) >= AUDIT_LOG_BATCH_SIZE:
+                self._wake.set()
+
+    def flush(self) -> int:
+        """Insert one batch of queued entries. Returns how many were written."""
+        with self._lock:
+            batch = self._pending[:AUDIT_LOG_BATCH_SIZE]
+            del self._pending[:AUDIT_LOG_BATCH_SIZE]
+        if not batch:
+            return 0
+        db = self._session_factory()
+        try:
+            db.execute(insert(base.AuditLog), batch)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logging.error(f"Failed to write {len(batch)} audit log entries, will retry: {e}")
+            with self._lock:
+                self._pending[:0] = batch
+            return 0
+        finally:
+            db.close()
+        return len(batch)
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self._wake.wait(AUDIT_LOG_FLUSH_SECONDS)
+            self._wake.clear()
+            while self.flush() == AUDIT_LOG_BATCH_SIZE:
+                pass
+        # Drain on shutdown; give up only if the database keeps refusing the batch
+        for _ in range(3):
+            while self.flush():
+                pass
+            with self._lock:
+                if not self._pending:
+                    return
+
+audit_log_writer = AuditLogWriter()
+
 class AuditLogService:
     @staticmethod
-    def create_log(db: Session, log: str) -> base.AuditLog:
+    def create_log(db: Session, log: str) -> Optional[base.AuditLog]:
+        """Record an audit entry on its own: queued when write-behind is running, else committed now.
+
+        Returns the committed entry, or None when it was queued.
+        """
+        if audit_log_writer.running:
+            audit_log_writer.enqueue(log)
+            return None
+        audit_log = AuditLogService.add_log(db, log)
+        db.commit()
+        return audit_log
+
+    @staticmethod
+    def add_log(db: Session, log: str) -> base.AuditLog:
+        """Stage an audit entry in the caller's transaction without committing."""
         audit_log = base.AuditLog(log=log)
         db.add(audit_log)
-        db.commit()
-        db.refresh(audit_log)
         return audit_log
 
     @staticmethod
-    def get_logs(db: Session, limit: int = 100) -> List[base.AuditLog]:
-        return db.query(base.AuditLog)\
-            .order_by(base.AuditLog.timestamp.desc())\
+    def entry(audit_log: Optional[base.AuditLog]) -> Optional[Dict[str, Any]]:
+        """A committed entry as /auditlog lists it, for event payloads."""
+        if audit_log is None:
+            return None
+        return {"id": audit_log.id, "log": audit_log.log, "timestamp": audit_log.timestamp}
+
+    @staticmethod
+    def get_logs(
+        db: Session,
+        limit: int = 100,
+        before_timestamp: Optional[datetime] = None,
+        before_id: Optional[int] = None
+    ) -> List[base.AuditLog]:
+        """Newest entries first. Pass the timestamp and id of the last entry seen to get the page after it.
+
+        Pages are keyed on (timestamp, id), which ix_audit_logs_timestamp_id
+        serves directly, so deep pages cost the same as the first.
+        """
+        query = db.query(base.AuditLog)
+        if before_timestamp is not None and before_id is not None:
+            query = query.filter(
+                tuple_(base.AuditLog.timestamp, base.AuditLog.id) < tuple_(before_timestamp, before_id)
+            )
+        return query\
+            .order_by(base.AuditLog.timestamp.desc(), base.AuditLog.id.desc())\
             .limit(limit)\
-            .all() 
\ No newline at end of file
+            .all()
@@ -0,0 +1,146 @@
+from datetime import date
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional, Tuple
+from .. import base
+from .player_service import PlayerService
+from .rating_service import MATCH_SLOTS
+from .season_index import get_season_index
+
+class DailyMatchService:
+    """Keeps the daily_match_counts rollup in step with the matches table.
+
+    A match counts once towards its day's ALL_PLAYERS_ID row and once towards
+    the row of each player in it. Days are taken from the match timestamp as
+    the database returns it, like cast(timestamp, Date) did.
+    """
+
+    @staticmethod
+    def apply_match(db: Session, match: base.Match, direction: int = 1) -> None:
+        """Add (direction=1) or remove (direction=-1) a match from the rollup. Does not commit."""
+        match_date = match.timestamp.date()
+        player_ids = [base.ALL_PLAYERS_ID] + [
+            getattr(match, player_attr)
+            for player_attr, _ in MATCH_SLOTS
+            if getattr(match, player_attr) is not None
+        ]
+        counts = {
+            count.player_id: count
+            for count in db.query(base.DailyMatchCount).filter(
+                base.DailyMatchCount.match_date == match_date,
+                base.DailyMatchCount.player_id.in_(player_ids)
+            )
+        }
+        missing = [
+            base.DailyMatchCount(match_date=match_date, player_id=player_id, match_count=0)
+            for player_id in player_ids if player_id not in counts
+        ]
+        if missing:
+            db.add_all(missing)
+            db.flush()
+            counts.update({count.player_id: count for count in missing})
+
+        for count in counts.values():
+            count.match_count = base.DailyMatchCount.match_count + direction
+        db.flush()
+
+        if direction < 0:
+            # Keep the rollup free of empty days
+            for count in counts.values():
+                db.refresh(count)
+                if count.match_count <= 0:
+                    db.delete(count)
+            db.flush()
+
+    @staticmethod
+    def rebuild(db: Session) -> int:
+        """Regenerate daily_match_counts from the match history. Does not commit. Returns the row count."""
+        counts: Dict[Tuple[date, int], int] = {}
+        for match in db.query(base.Match.timestamp).yield_per(1000):
+            key = (match.timestamp.date(), base.ALL_PLAYERS_ID)
+            counts[key] = counts.get(key, 0) + 1
+        participants = db.query(
+            base.MatchParticipant.player_id,
+            base.MatchParticipant.timestamp
+        ).yield_per(1000)
+        for participant in participants:
+            key = (participant.timestamp.date(), participant.player_id)
+            counts[key] = counts.get(key, 0) + 1
+
+        db.query(base.DailyMatchCount).delete()
+        db.bulk_insert_mappings(base.DailyMatchCount, [
+            {"match_date": match_date, "player_id": player_id, "match_count": match_count}
+            for (match_date, player_id), match_count in counts.items()
+        ])
+        return len(counts)
+
+    @staticmethod
+    def ensure_populated(db: Session) -> None:
+        """Build daily_match_counts on first start against an existing match history."""
+        has_matches = db.query(base.Match.id).first() is not None
+        if has_matches and db.query(base.DailyMatchCount.player_id).first() is None:
+            DailyMatchService.rebuild(db)
+            db.commit()
+
+    @staticmethod
+    def date_filters(db: Session, start: Optional[date], end: Optional[date], season_id: int = -999) -> List[Any]:
+        """Criteria on daily_match_counts.match_date for a date range and season.
+
+        season_id follows the /players convention (-999 lifetime, -998 current).
+        Seasons are applied by whole days: days inside a nested special season
+        are left out of the season that contains it.
+        """
+        column = base.DailyMatchCount.match_date
+        filters = []
+        if start:
+            filters.append(column >= start)
+        if end:
+            filters.append(column <= end)
+        if season_id != -999:
+            season = PlayerService.get_current_season(season_id, db)
+            if not season:
+                # Unknown season, or no season running right now
+                return [column == None]
+            filters.append(column.between(season.start_date.date(), season.end_date.date()))
+            for special in get_season_index(db).special_seasons(season):
+                filters.append(~column.between(special.start_date.date(), special.end_date.date()))
+        return filters
+
+    @staticmethod
+    def get_matches_per_day(
+        db: Session,
+        player_id: Optional[int] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        season_id: int = -999
+    ) -> List[Tuple[date, int]]:
+        """(date, matches) for each day with matches, oldest first."""
+        return db.query(
+            base.DailyMatchCount.match_date,
+            base.DailyMatchCount.match_count
+        ).filter(
+            base.DailyMatchCount.player_id == (player_id or base.ALL_PLAYERS_ID),
+            *DailyMatchService.date_filters(db, start, end, season_id)
+        ).order_by(base.DailyMatchCount.match_date.asc()).all()
+
+    @staticmethod
+    def get_busiest_player_day(
+        db: Session,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        season_id: int = -999
+    ):
+        """The player and day with the most matches, or None."""
+        return db.query(
+            base.Player.id,
+            base.Player.player_name,
+            base.DailyMatchCount.match_date,
+            base.DailyMatchCount.match_count
+        ).join(
+            base.Player,
+            base.Player.id == base.DailyMatchCount.player_id
+        ).filter(
+            *DailyMatchService.date_filters(db, start, end, season_id)
+        ).order_by(
+            base.DailyMatchCount.match_count.desc(),
+            base.Player.player_name.asc()
+        ).first()
@@ -0,0 +1,56 @@
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterable, Optional
+from .player_service import PlayerService
+from .audit_log_service import AuditLogService
+from .stats_service import StatsService
+
+# Datasets the home screen loads, in the order they are built
+DASHBOARD_FIELDS = (
+    "seasons",
+    "players",
+    "auditlog",
+    "streaks",
+    "longest_streaks",
+    "player_kds",
+    "most_matches",
+    "total_matches",
+    "matches_per_day",
+)
+
+class DashboardService:
+    @staticmethod
+    def get_dashboard(db: Session, season_id: int = -1, fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Build the requested home-screen datasets with one session.
+
+        Each value matches the response of the standalone endpoint. The streak
+        pass over match_participants is shared by streaks and longest_streaks,
+        and by player_kds when either of those is requested. The remaining
+        datasets read derived tables (daily_match_counts, season_match_counts,
+        player_ratings) that already hold their aggregates.
+        """
+        fields = set(fields or DASHBOARD_FIELDS)
+        dashboard = {}
+
+        streaks = None
+        if "streaks" in fields or "longest_streaks" in fields:
+            streaks = StatsService.compute_streaks(db)
+
+        if "seasons" in fields:
+            dashboard["seasons"] = PlayerService.get_seasons(db)
+        if "players" in fields:
+            dashboard["players"] = PlayerService.get_players(db, season_id)
+        if "auditlog" in fields:
+            dashboard["auditlog"] = [AuditLogService.entry(log) for log in AuditLogService.get_logs(db)]
+        if "streaks" in fields:
+            dashboard["streaks"] = StatsService.get_player_streaks(db, streaks)
+        if "longest_streaks" in fields:
+            dashboard["longest_streaks"] = StatsService.get_longest_streaks(db, streaks)
+        if "player_kds" in fields:
+            dashboard["player_kds"] = StatsService.get_player_kds(db, streaks=streaks)
+        if "most_matches" in fields:
+            dashboard["most_matches"] = StatsService.get_most_matches_in_day(db)
+        if "total_matches" in fields:
+            dashboard["total_matches"] = StatsService.get_total_matches(db)
+        if "matches_per_day" in fields:
+            dashboard["matches_per_day"] = StatsService.get_matches_per_day(db)
+        return dashboard
@@ -0,0 +1,37 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from .. import base
+
+class DataVersionService:
+    """Global version of the data served by read endpoints.
+
+    Built from the newest match and audit log ids plus the data_versions
+    counters, so any write changes it. Used as the ETag of GET responses.
+    """
+
+    @staticmethod
+    def bump(db: Session, name: str) -> None:
+        """Increment a counter in the caller's transaction (no commit)."""
+        updated = db.query(base.DataVersion).filter(
+            base.DataVersion.name == name
+        ).update({base.DataVersion.version: base.DataVersion.version + 1})
+        if not updated:
+            db.add(base.DataVersion(name=name, version=1))
+        db.flush()
+
+    @staticmethod
+    def get_version(db: Session) -> str:
+        def counter(name):
+            return select(base.DataVersion.version).where(
+                base.DataVersion.name == name
+            ).scalar_subquery()
+
+        row = db.execute(select(
+            select(func.coalesce(func.max(base.Match.id), 0)).scalar_subquery(),
+            select(func.coalesce(func.max(base.AuditLog.id), 0)).scalar_subquery(),
+            func.coalesce(counter("matches"), 0),
+            func.coalesce(counter("players"), 0),
+            func.coalesce(counter("seasons"), 0),
+        )).one()
+        match_id, audit_log_id, matches, players, seasons = row
+        return f"m{match_id}.{matches}-a{audit_log_id}-p{players}-s{seasons}"
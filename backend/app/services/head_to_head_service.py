@@ -0,0 +1,308 @@
+from datetime import datetime
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import and_, case, func, or_
+from typing import Any, Dict, List, Optional, Tuple
+from .. import base
+from .rating_service import RatingService, MATCH_SLOTS
+from .season_index import as_utc
+
+# head_to_head weekday columns, Monday first as datetime.weekday() counts
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+DEFAULT_RIVALS_LIMIT = 5
+
+def match_pairs(match: base.Match) -> List[Tuple[int, int, int]]:
+    """(winner id, loser id, winner elo change) for every pair of opponents in a match."""
+    winners = []
+    losers = []
+    for player_attr, change_attr in MATCH_SLOTS:
+        player_id = getattr(match, player_attr)
+        if player_id is None:
+            continue
+        if player_attr.startswith("winner"):
+            winners.append((player_id, getattr(match, change_attr) or 0))
+        else:
+            losers.append(player_id)
+    return [(winner_id, loser_id, elo_change) for winner_id, elo_change in winners for loser_id in losers]
+
+def total_matches(row: base.HeadToHead) -> int:
+    return row.a_wins + row.b_wins
+
+class HeadToHeadService:
+    """Keeps the head_to_head table of pairwise results in step with the matches table.
+
+    Rows are keyed by the ordered pair (player_a_id < player_b_id); every
+    winner/loser pairing in a match counts, so a doubles match adds to four rows.
+    """
+
+    @staticmethod
+    def apply_match(db: Session, match: base.Match, direction: int = 1) -> None:
+        """Add (direction=1) or remove (direction=-1) a match from the pairwise totals.
+
+        On removal the match's participants must already be deleted, so
+        last_played can be recomputed from the matches that remain. Does not commit.
+        """
+        pairs = match_pairs(match)
+        keys = [(min(winner_id, loser_id), max(winner_id, loser_id)) for winner_id, loser_id, _ in pairs]
+        rows = {
+            (row.player_a_id, row.player_b_id): row
+            for row in db.query(base.HeadToHead).filter(
+                or_(*[
+                    and_(base.HeadToHead.player_a_id == a, base.HeadToHead.player_b_id == b)
+                    for a, b in keys
+                ])
+            )
+        }
+        missing = [
+            base.HeadToHead(
+                player_a_id=a,
+                player_b_id=b,
+                a_wins=0,
+                b_wins=0,
+                a_elo_gained=0,
+                b_elo_gained=0,
+                **{weekday: 0 for weekday in WEEKDAYS}
+            )
+            for a, b in keys if (a, b) not in rows
+        ]
+        if missing:
+            db.add_all(missing)
+            db.flush()
+            rows.update({(row.player_a_id, row.player_b_id): row for row in missing})
+
+        weekday = WEEKDAYS[match.timestamp.weekday()]
+        for (winner_id, loser_id, elo_change), key in zip(pairs, keys):
+            row = rows[key]
+            winner_is_a = winner_id == key[0]
+            wins_column = "a_wins" if winner_is_a else "b_wins"
+            elo_column = "a_elo_gained" if winner_is_a else "b_elo_gained"
+            setattr(row, wins_column, getattr(base.HeadToHead, wins_column) + direction)
+            setattr(row, elo_column, getattr(base.HeadToHead, elo_column) + direction * elo_change)
+            setattr(row, weekday, getattr(base.HeadToHead, weekday) + direction)
+            if direction > 0 and (row.last_played is None or as_utc(row.last_played) <= as_utc(match.timestamp)):
+                row.last_played = match.timestamp
+        db.flush()
+
+        if direction < 0:
+            for key in keys:
+                row = rows[key]
+                db.refresh(row)
+                if total_matches(row) <= 0:
+                    db.delete(row)
+                else:
+                    row.last_played = HeadToHeadService._last_played(db, *key)
+            db.flush()
+
+    @staticmethod
+    def adjust_elo_gained(db: Session, elo_gained: Dict[Tuple[int, int], int]) -> None:
+        """Add {(winner_id, loser_id): change in the winner's elo gained} to existing rows. Does not commit."""
+        for (winner_id, loser_id), elo_change in elo_gained.items():
+            if not elo_change:
+                continue
+            column = base.HeadToHead.a_elo_gained if winner_id < loser_id else base.HeadToHead.b_elo_gained
+            db.query(base.HeadToHead).filter(
+                base.HeadToHead.player_a_id == min(winner_id, loser_id),
+                base.HeadToHead.player_b_id == max(winner_id, loser_id)
+            ).update({column: column + elo_change}, synchronize_session=False)
+
+    @staticmethod
+    def _last_played(db: Session, player_a_id: int, player_b_id: int) -> Optional[datetime]:
+        player_a_entry = aliased(base.MatchParticipant)
+        player_b_entry = aliased(base.MatchParticipant)
+        return db.query(func.max(player_a_entry.timestamp)).join(
+            player_b_entry,
+            and_(
+                player_b_entry.match_id == player_a_entry.match_id,
+                player_b_entry.side != player_a_entry.side
+            )
+        ).filter(
+            player_a_entry.player_id == player_a_id,
+            player_b_entry.player_id == player_b_id
+        ).scalar()
+
+    @staticmethod
+    def rebuild(db: Session) -> int:
+        """Regenerate head_to_head from match_participants. Does not commit. Returns the row count."""
+        winner_entry = aliased(base.MatchParticipant)
+        loser_entry = aliased(base.MatchParticipant)
+        pairs = db.query(
+            winner_entry.player_id.label("winner_id"),
+            loser_entry.player_id.label("loser_id"),
+            winner_entry.elo_change,
+            winner_entry.timestamp
+        ).join(
+            loser_entry,
+            and_(
+                loser_entry.match_id == winner_entry.match_id,
+                loser_entry.side == "loser"
+            )
+        ).filter(
+            winner_entry.side == "winner"
+        ).yield_per(1000)
+
+        totals: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        for pair in pairs:
+            key = (min(pair.winner_id, pair.loser_id), max(pair.winner_id, pair.loser_id))
+            row = totals.get(key)
+            if row is None:
+                row = totals[key] = {
+                    "player_a_id": key[0],
+                    "player_b_id": key[1],
+                    "a_wins": 0,
+                    "b_wins": 0,
+                    "a_elo_gained": 0,
+                    "b_elo_gained": 0,
+                    **{weekday: 0 for weekday in WEEKDAYS},
+                    "last_played": pair.timestamp
+                }
+            side = "a" if pair.winner_id == key[0] else "b"
+            row[f"{side}_wins"] += 1
+            row[f"{side}_elo_gained"] += pair.elo_change or 0
+            row[WEEKDAYS[pair.timestamp.weekday()]] += 1
+            row["last_played"] = max(row["last_played"], pair.timestamp)
+
+        db.query(base.HeadToHead).delete()
+        db.bulk_insert_mappings(base.HeadToHead, list(totals.values()))
+        return len(totals)
+
+    @staticmethod
+    def ensure_populated(db: Session) -> None:
+        """Build head_to_head on first start against an existing match history."""
+        has_matches = db.query(base.Match.id).first() is not None
+        if has_matches and db.query(base.HeadToHead.player_a_id).first() is None:
+            HeadToHeadService.rebuild(db)
+            db.commit()
+
+    @staticmethod
+    def _pair(db: Session, player_id: int, opponent_id: int) -> Optional[base.HeadToHead]:
+        return db.query(base.HeadToHead).filter(
+            base.HeadToHead.player_a_id == min(player_id, opponent_id),
+            base.HeadToHead.player_b_id == max(player_id, opponent_id)
+        ).first()
+
+    @staticmethod
+    def _record(row: Optional[base.HeadToHead], player_id: int) -> Dict[str, Any]:
+        """A pair row seen from player_id's side."""
+        if row is None:
+            return {"wins": 0, "losses": 0, "elo_gained": 0, "opponent_elo_gained": 0, "last_played": None}
+        is_a = row.player_a_id == player_id
+        return {
+            "wins": row.a_wins if is_a else row.b_wins,
+            "losses": row.b_wins if is_a else row.a_wins,
+            "elo_gained": row.a_elo_gained if is_a else row.b_elo_gained,
+            "opponent_elo_gained": row.b_elo_gained if is_a else row.a_elo_gained,
+            "last_played": row.last_played
+        }
+
+    @staticmethod
+    def get_head_to_head(db: Session, player1_id: int, player2_id: int) -> dict:
+        """Head-to-head record between two players, read from their head_to_head row."""
+        players = {
+            player.id: player.player_name
+            for player in db.query(base.Player.id, base.Player.player_name).filter(
+                base.Player.id.in_([player1_id, player2_id])
+            )
+        }
+        if player1_id not in players or player2_id not in players:
+            return {
+                "error": "One or both players not found"
+            }
+
+        row = HeadToHeadService._pair(db, player1_id, player2_id)
+        record = HeadToHeadService._record(row, player1_id)
+        total = record["wins"] + record["losses"]
+        ratings = RatingService.get_ratings(db, [player1_id, player2_id], None)
+
+        day_counts = {
+            weekday.capitalize(): getattr(row, weekday)
+            for weekday in WEEKDAYS if row is not None and getattr(row, weekday)
+        }
+        most_frequent_day = max(day_counts.items(), key=lambda x: x[1]) if day_counts else None
+
+        player1_win_percentage = round((record["wins"] / total) * 100, 1) if total > 0 else 0
+        player2_win_percentage = round((record["losses"] / total) * 100, 1) if total > 0 else 0
+
+        return {
+            "player1": {
+                "id": player1_id,
+                "name": players[player1_id],
+                "wins": record["wins"],
+                "losses": record["losses"],
+                "win_percentage": player1_win_percentage,
+                "elo_gained": record["elo_gained"],
+                "current_elo": ratings[player1_id][0]
+            },
+            "player2": {
+                "id": player2_id,
+                "name": players[player2_id],
+                "wins": record["losses"],
+                "losses": record["wins"],
+                "win_percentage": player2_win_percentage,
+                "elo_gained": record["opponent_elo_gained"],
+                "current_elo": ratings[player2_id][0]
+            },
+            "total_matches": total,
+            "most_frequent_day": most_frequent_day[0] if most_frequent_day else None,
+            "most_frequent_day_count": most_frequent_day[1] if most_frequent_day else 0,
+            "day_breakdown": day_counts
+        }
+
+    @staticmethod
+    def get_rivals(db: Session, player_id: int, limit: int = DEFAULT_RIVALS_LIMIT) -> List[dict]:
+        """A player's most played opponents, most matches first."""
+        total = base.HeadToHead.a_wins + base.HeadToHead.b_wins
+        opponent_id = case(
+            (base.HeadToHead.player_a_id == player_id, base.HeadToHead.player_b_id),
+            else_=base.HeadToHead.player_a_id
+        )
+        rows = db.query(
+            base.HeadToHead,
+            base.Player.id.label("opponent_id"),
+            base.Player.player_name.label("opponent_name")
+        ).join(
+            base.Player, base.Player.id == opponent_id
+        ).filter(
+            or_(base.HeadToHead.player_a_id == player_id, base.HeadToHead.player_b_id == player_id),
+            base.Player.deleted == False
+        ).order_by(total.desc(), base.HeadToHead.last_played.desc()).limit(limit).all()
+
+        rivals = []
+        for row, opponent_id, opponent_name in rows:
+            record = HeadToHeadService._record(row, player_id)
+            matches = record["wins"] + record["losses"]
+            rivals.append({
+                "opponent_id": opponent_id,
+                "opponent_name": opponent_name,
+                "matches": matches,
+                "wins": record["wins"],
+                "losses": record["losses"],
+                "win_percentage": round((record["wins"] / matches) * 100, 1) if matches > 0 else 0,
+                "elo_gained": record["elo_gained"],
+                "elo_lost": record["opponent_elo_gained"],
+                "last_played": record["last_played"]
+            })
+        return rivals
+
+    @staticmethod
+    def get_matrix(db: Session) -> dict:
+        """Wins of each active player (row) against every other (column), in player name order."""
+        players = db.query(base.Player.id, base.Player.player_name).filter(
+            base.Player.deleted == False
+        ).order_by(base.Player.player_name.asc()).all()
+        positions = {player.id: position for position, player in enumerate(players)}
+        wins = [[0] * len(players) for _ in players]
+        for row in db.query(
+            base.HeadToHead.player_a_id,
+            base.HeadToHead.player_b_id,
+            base.HeadToHead.a_wins,
+            base.HeadToHead.b_wins
+        ):
+            a = positions.get(row.player_a_id)
+            b = positions.get(row.player_b_id)
+            if a is None or b is None:
+                continue
+            wins[a][b] = row.a_wins
+            wins[b][a] = row.b_wins
+        return {
+            "players": [{"id": player.id, "player_name": player.player_name} for player in players],
+            "wins": wins
+        }
@@ -0,0 +1,338 @@
+import csv
+import json
+from datetime import datetime
+from sqlalchemy.orm import Session
+from sqlalchemy import insert, update
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from .. import base
+from ..elo import column_int
+from .audit_log_service import AuditLogService
+from .data_version_service import DataVersionService
+from .head_to_head_service import HeadToHeadService
+from .daily_match_service import DailyMatchService
+from .match_service import MatchService, starting_elo_attr
+from .rating_service import RatingService, MATCH_SLOTS, PARTICIPANT_SLOTS
+from .season_index import as_utc, get_season_index, invalidate_season_index
+
+IMPORT_FORMATS = ("csv", "ndjson")
+# Rows per executemany when inserting matches, participants and events
+IMPORT_BATCH_SIZE = 1000
+# Validation errors reported before the rest are only counted
+MAX_IMPORT_ERRORS = 50
+
+EVENT_FLAGS = (
+    ("is_pantsed", "pantsed"),
+    ("is_away_game", "away_game"),
+    ("is_lost_by_foul", "lost_by_foul"),
+)
+PLAYER_FIELDS = ("winner1", "winner2", "loser1", "loser2")
+
+def parse_flag(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value or "").strip().lower() in ("1", "true", "yes", "y")
+
+class MatchImportService:
+    """Bulk import of historical match results.
+
+    Each row has a timestamp, winner1/loser1 (and winner2/loser2 for doubles)
+    given as player ids or names, and optional is_pantsed, is_away_game and
+    is_lost_by_foul flags. Rows are validated up front, then replayed in
+    timestamp order together with the matches already recorded, so each
+    imported match is rated against the season ratings its players had at
+    the time. Existing matches after the earliest import are re-rated in the
+    same pass, as MatchService._recompute_later_matches does after an edit.
+    """
+
+    @staticmethod
+    def read_rows(lines: Iterable[str], fmt: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Yield (line number, row) pairs from a CSV (with header) or NDJSON stream."""
+        if fmt == "csv":
+            reader = csv.DictReader(lines)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(lines, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_number, {"_error": f"Invalid JSON: {e.msg}"}
+                    continue
+                yield line_number, row if isinstance(row, dict) else {"_error": "Expected a JSON object"}
+
+    @staticmethod
+    def import_matches(db: Session, lines: Iterable[str], fmt: str = "csv", dry_run: bool = False) -> Dict[str, Any]:
+        """Validate and import matches; with dry_run, only report the standings they would produce.
+
+        Nothing is written unless every row is valid.
+        """
+        players = db.query(base.Player.id, base.Player.player_name).filter(
+            base.Player.deleted == False
+        ).all()
+        player_names = {player.id: player.player_name for player in players}
+        player_ids_by_name = {player.player_name: player.id for player in players}
+
+        imports = []
+        errors = []
+        error_count = 0
+        for line_number, row in MatchImportService.read_rows(lines, fmt):
+            parsed, error = MatchImportService._parse_row(row, player_names, player_ids_by_name)
+            if error:
+                error_count += 1
+                if len(errors) < MAX_IMPORT_ERRORS:
+                    errors.append({"line": line_number, "error": error})
+                continue
+            imports.append(parsed)
+
+        if error_count:
+            return {"dry_run": dry_run, "imported": 0, "error_count": error_count, "errors": errors}
+
+        # Stable sort keeps file order for matches in the same second
+        imports.sort(key=lambda match: match["timestamp"])
+        event_ids = {}
+        if any(match["events"] for match in imports):
+            event_ids = {event.name: event.id for event in db.query(base.EventType)}
+            missing = {name for match in imports for name in match["events"]} - event_ids.keys()
+            if missing:
+                return {
+                    "dry_run": dry_run,
+                    "imported": 0,
+                    "error_count": 1,
+                    "errors": [{"line": None, "error": f"DB Error: {', '.join(sorted(missing))} event type not found in EventType table"}]
+                }
+
+        totals, rerated = MatchImportService._replay(db, imports)
+        standings = MatchImportService._standings(totals, player_names)
+        if dry_run:
+            db.rollback()
+            return {
+                "dry_run": True,
+                "imported": len(imports),
+                "rerated": len(rerated),
+                "error_count": 0,
+                "errors": [],
+                "standings": standings
+            }
+
+        for batch_start in range(0, len(imports), IMPORT_BATCH_SIZE):
+            MatchImportService._insert_batch(db, imports[batch_start:batch_start + IMPORT_BATCH_SIZE], event_ids)
+        for batch_start in range(0, len(rerated), IMPORT_BATCH_SIZE):
+            MatchImportService._update_batch(db, rerated[batch_start:batch_start + IMPORT_BATCH_SIZE])
+        # Checkpoints are rebuilt from match_participants, so after the re-rated changes are written
+        RatingService.replace_ledger(db, totals)
+        HeadToHeadService.rebuild(db)
+        DailyMatchService.rebuild(db)
+        DataVersionService.bump(db, "matches")
+        AuditLogService.add_log(db, f"Imported {len(imports)} matches")
+        db.commit()
+        return {
+            "dry_run": False,
+            "imported": len(imports),
+            "rerated": len(rerated),
+            "error_count": 0,
+            "errors": [],
+            "standings": standings
+        }
+
+    @staticmethod
+    def _parse_row(
+        row: Dict[str, Any],
+        player_names: Dict[int, str],
+        player_ids_by_name: Dict[str, int]
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        if "_error" in row:
+            return None, row["_error"]
+
+        try:
+            timestamp = as_utc(datetime.fromisoformat(str(row.get("timestamp") or "").strip()))
+        except ValueError:
+            return None, f"Invalid timestamp {row.get('timestamp')!r}"
+
+        match = {"timestamp": timestamp}
+        for field in PLAYER_FIELDS:
+            value = row.get(field)
+            if value is None or str(value).strip() == "":
+                match[f"{field}_id"] = None
+                continue
+            value = str(value).strip()
+            player_id = int(value) if value.isdigit() else player_ids_by_name.get(value)
+            if player_id not in player_names:
+                return None, f"{field}: player {value!r} not found or has been deleted"
+            match[f"{field}_id"] = player_id
+
+        if match["winner1_id"] is None or match["loser1_id"] is None:
+            return None, "winner1 and loser1 are required"
+        is_doubles = match["winner2_id"] is not None or match["loser2_id"] is not None
+        if is_doubles and (match["winner2_id"] is None or match["loser2_id"] is None):
+            return None, "Doubles matches need both winner2 and loser2"
+        player_ids = [match[f"{field}_id"] for field in PLAYER_FIELDS if match[f"{field}_id"] is not None]
+        if len(set(player_ids)) != len(player_ids):
+            return None, "Duplicate players not allowed in a match"
+
+        match["is_doubles"] = is_doubles
+        match["events"] = [event_name for flag, event_name in EVENT_FLAGS if parse_flag(row.get(flag))]
+        return match, None
+
+    @staticmethod
+    def _replay(
+        db: Session,
+        imports: List[Dict[str, Any]]
+    ) -> Tuple[Dict[Tuple[int, int], Tuple[int, int]], List[Dict[str, Any]]]:
+        """Rate the imported matches in timestamp order, merged with the existing matches.
+
+        Fills in each import's starting elos and elo changes and returns the
+        full ledger totals, as RatingService.rebuild would compute them, and
+        the existing matches whose starting elos or changes moved.
+        """
+        invalidate_season_index()
+        season_index = get_season_index(db)
+        totals = {}
+        rerated = []
+
+        def apply(timestamp: datetime, deltas: List[Tuple[int, int]]) -> None:
+            for season_id in season_index.season_ids_for(timestamp):
+                for player_id, elo_change in deltas:
+                    elo, matches_played = totals.get((player_id, season_id), (base.DEFAULT_ELO, 0))
+                    totals[(player_id, season_id)] = (elo + elo_change, matches_played + 1)
+
+        def rate(timestamp: datetime, player_ids: Dict[str, Optional[int]]) -> Dict[str, Optional[int]]:
+            """Starting elos and elo changes by slot for a match at timestamp, from the running totals."""
+            # Starting elo is the rating in the season the match was played in, as for /record-match
+            containing = season_index.containing(timestamp)
+            season_id = containing[0].id if containing else base.LIFETIME_SEASON_ID
+            elos = {
+                slot: totals.get((player_ids[slot], season_id), (base.DEFAULT_ELO, 0))[0]
+                for slot in PLAYER_FIELDS if player_ids[slot] is not None
+            }
+            winner_slots = [slot for slot in ("winner1", "winner2") if slot in elos]
+            loser_slots = [slot for slot in ("loser1", "loser2") if slot in elos]
+            winner_change, loser_change = MatchService.elo_changes(
+                [elos[slot] for slot in winner_slots],
+                [elos[slot] for slot in loser_slots]
+            )
+            rating = {}
+            for slot in PLAYER_FIELDS:
+                rating[f"{slot}_starting_elo"] = elos.get(slot)
+                rating[f"{slot}_elo_change"] = None
+            for slot in winner_slots:
+                rating[f"{slot}_elo_change"] = column_int(winner_change)
+            for slot in loser_slots:
+                rating[f"{slot}_elo_change"] = column_int(loser_change)
+            return rating
+
+        existing = iter(db.query(
+            base.Match.id,
+            base.Match.timestamp,
+            *[getattr(base.Match, attr) for slot in MATCH_SLOTS for attr in (slot[0], starting_elo_attr(slot[0]), slot[1])]
+        ).order_by(base.Match.timestamp.asc(), base.Match.id.asc()).yield_per(IMPORT_BATCH_SIZE))
+        pending = next(existing, None)
+        imported = False
+
+        def apply_existing_until(timestamp: Optional[datetime]) -> None:
+            # Existing matches at the same time as an import go first. Once an
+            # import has been applied the totals differ from what later matches
+            # were stored against, so those are re-rated from the totals.
+            nonlocal pending
+            while pending is not None and (timestamp is None or as_utc(pending.timestamp) <= timestamp):
+                if imported:
+                    player_ids = {slot: getattr(pending, f"{slot}_id") for slot in PLAYER_FIELDS}
+                    rating = rate(pending.timestamp, player_ids)
+                    if any(rating[column] != getattr(pending, column) for column in rating):
+                        rerated.append({"id": pending.id, **{f"{slot}_id": player_ids[slot] for slot in PLAYER_FIELDS}, **rating})
+                    deltas = [
+                        (player_ids[slot], rating[f"{slot}_elo_change"])
+                        for slot in PLAYER_FIELDS if player_ids[slot] is not None
+                    ]
+                else:
+                    deltas = [
+                        (getattr(pending, player_attr), getattr(pending, change_attr) or 0)
+                        for player_attr, change_attr in MATCH_SLOTS
+                        if getattr(pending, player_attr) is not None
+                    ]
+                apply(pending.timestamp, deltas)
+                pending = next(existing, None)
+
+        for match in imports:
+            apply_existing_until(match["timestamp"])
+            match.update(rate(match["timestamp"], {slot: match[f"{slot}_id"] for slot in PLAYER_FIELDS}))
+            apply(match["timestamp"], [
+                (match[f"{slot}_id"], match[f"{slot}_elo_change"])
+                for slot in PLAYER_FIELDS if match[f"{slot}_id"] is not None
+            ])
+            imported = True
+
+        apply_existing_until(None)
+        return totals, rerated
+
+    @staticmethod
+    def _insert_batch(db: Session, matches: List[Dict[str, Any]], event_ids: Dict[str, int]) -> None:
+        match_columns = ["timestamp", "is_doubles"] + [
+            f"{slot}_{suffix}" for slot in PLAYER_FIELDS for suffix in ("id", "starting_elo", "elo_change")
+        ]
+        match_ids = db.scalars(
+            insert(base.Match).returning(base.Match.id, sort_by_parameter_order=True),
+            [{column: match[column] for column in match_columns} for match in matches]
+        ).all()
+
+        participants = []
+        events = []
+        for match_id, match in zip(match_ids, matches):
+            for (player_attr, change_attr), (side, slot) in zip(MATCH_SLOTS, PARTICIPANT_SLOTS):
+                if match[player_attr] is not None:
+                    participants.append({
+                        "match_id": match_id,
+                        "side": side,
+                        "slot": slot,
+                        "player_id": match[player_attr],
+                        "elo_change": match[change_attr],
+                        "timestamp": match["timestamp"]
+                    })
+            # Events go to the losers, as for /record-match
+            for event_name in match["events"]:
+                for loser_attr in ("loser1_id", "loser2_id"):
+                    if match[loser_attr] is not None:
+                        events.append({
+                            "player_id": match[loser_attr],
+                            "event_id": event_ids[event_name],
+                            "timestamp": match["timestamp"]
+                        })
+
+        db.execute(insert(base.MatchParticipant), participants)
+        if events:
+            db.execute(insert(base.PlayerEvent), events)
+
+    @staticmethod
+    def _update_batch(db: Session, matches: List[Dict[str, Any]]) -> None:
+        """Write re-rated starting elos and elo changes to matches and match_participants."""
+        match_rows = [
+            {"id": match["id"], **{
+                column: match[column] for slot in PLAYER_FIELDS for column in (f"{slot}_starting_elo", f"{slot}_elo_change")
+            }}
+            for match in matches
+        ]
+        participant_rows = [
+            {"match_id": match["id"], "side": side, "slot": side_slot, "elo_change": match[change_attr]}
+            for match in matches
+            for (player_attr, change_attr), (side, side_slot) in zip(MATCH_SLOTS, PARTICIPANT_SLOTS)
+            if match[player_attr] is not None
+        ]
+        # ORM bulk UPDATE by primary key, sent as executemany
+        db.execute(update(base.Match), match_rows)
+        db.execute(update(base.MatchParticipant), participant_rows)
+
+    @staticmethod
+    def _standings(totals: Dict[Tuple[int, int], Tuple[int, int]], player_names: Dict[int, str]) -> List[Dict[str, Any]]:
+        """Lifetime elo and matches per active player after the import, best first."""
+        standings = [
+            {
+                "player_id": player_id,
+                "player_name": player_name,
+                "elo": totals.get((player_id, base.LIFETIME_SEASON_ID), (base.DEFAULT_ELO, 0))[0],
+                "matches_played": totals.get((player_id, base.LIFETIME_SEASON_ID), (base.DEFAULT_ELO, 0))[1]
+            }
+            for player_id, player_name in player_names.items()
+        ]
+        standings.sort(key=lambda x: (-x["elo"], x["player_name"]))
+        return standings
@@ -1,86 +1,48 @@
+from datetime import datetime
 from sqlalchemy.orm import Session
-from typing import Tuple, Optional
+from sqlalchemy import and_, or_, tuple_, update
+from typing import Any, Dict, List, Tuple, Optional
 from .. import base, elo
+from ..elo import column_int
 from ..schemas import MatchCreate
 from .player_service import PlayerService
+from .audit_log_service import AuditLogService
+from .rating_service import RatingService, MATCH_SLOTS, PARTICIPANT_SLOTS
+from .data_version_service import DataVersionService
+from .head_to_head_service import HeadToHeadService
+from .daily_match_service import DailyMatchService
+from .season_index import get_season_index
+
+def starting_elo_attr(player_attr: str) -> str:
+    """matches column holding the starting elo for a player id column, e.g. winner1_id -> winner1_starting_elo."""
+    return player_attr.replace("_id", "_starting_elo")
 
 class MatchService:
     @staticmethod
-    def create_match(db: Session, match: MatchCreate) -> Tuple[Optional[base.Match], Optional[str]]:
-        # Validate players exist and are not deleted
-        players = {
-            match.winner1_id: db.query(base.Player).filter(
-                base.Player.id == match.winner1_id,
-                base.Player.deleted == False
-            ).first(),
-            match.loser1_id: db.query(base.Player).filter(
-                base.Player.id == match.loser1_id,
-                base.Player.deleted == False
-            ).first()
-        }
-        
-        if match.is_doubles:
-            players.update({
-                match.winner2_id: db.query(base.Player).filter(
-                    base.Player.id == match.winner2_id,
-                    base.Player.deleted == False
-                ).first(),
-                match.loser2_id: db.query(base.Player).filter(
-                    base.Player.id == match.loser2_id,
-                    base.Player.deleted == False
-                ).first()
-            })
-        
-        if not all(players.values()):
-            return None, "One or more players not found or have been deleted"
-        
-        # Validate no duplicate players in doubles
-        if match.is_doubles and len(set(players.keys())) != 4:
-            return None, "Duplicate players not allowed in doubles match"
-        
-        # Handle events
-        event_types = {
-            "pantsed": match.is_pantsed,
-            "away_game": match.is_away_game,
-            "lost_by_foul": match.is_lost_by_foul
-        }
+    def create_match(db: Session, match: MatchCreate) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Record a match with its player events, ratings and audit entry in one transaction.
 
-        for event_name, is_active in event_types.items():
-            if is_active:
-                # Get ID for event type
-                event = db.query(base.EventType).filter(base.EventType.name == event_name).first()
-                if not event:
-                    return None, f"DB Error: {event_name} event type not found in EventType table"
-
-                # Create player events for losers
-                loser1_event = base.PlayerEvent(
-                    player_id=match.loser1_id,
-                    event_id=event.id
-                )
-                db.add(loser1_event)
-
-                if match.is_doubles:
-                    loser2_event = base.PlayerEvent(
-                        player_id=match.loser2_id,
-                        event_id=event.id
-                    )
-                    db.add(loser2_event)
-        current_season = PlayerService.get_current_season(-998, db)
+        Returns the match id and each player's elo change and new season elo.
+        """
+        winner_ids, loser_ids = MatchService._sides(match)
+        players, error = MatchService._load_players(db, match)
+        if error:
+            return None, error
+        event_types, error = MatchService._load_event_types(db, match)
+        if error:
+            return None, error
 
-        winner1_elo, _ = PlayerService.calculate_player_season_data(players[match.winner1_id], current_season, db)
-        loser1_elo, _ = PlayerService.calculate_player_season_data(players[match.loser1_id], current_season, db)
+        current_season = PlayerService.get_current_season(-998, db)
+        ratings = RatingService.get_ratings(db, winner_ids + loser_ids, current_season)
+        winner1_elo, _ = ratings[match.winner1_id]
+        loser1_elo, _ = ratings[match.loser1_id]
         if match.is_doubles:
+            winner2_elo, _ = ratings[match.winner2_id]
+            loser2_elo, _ = ratings[match.loser2_id]
+            elo_diff1, elo_diff2 = MatchService.elo_changes([winner1_elo, winner2_elo], [loser1_elo, loser2_elo])
+            # Stored as the integer column holds them, on every database
+            elo_diff1, elo_diff2 = column_int(elo_diff1), column_int(elo_diff2)
 
-            winner2_elo, _ = PlayerService.calculate_player_season_data(players[match.winner2_id], current_season, db)
-            loser2_elo, _ = PlayerService.calculate_player_season_data(players[match.loser2_id], current_season, db)
-
-            team1_elo = (winner1_elo + winner2_elo) / 2
-            team2_elo = (loser1_elo + loser2_elo) / 2
-            new_team1_elo, new_team2_elo = elo.calculate_new_ratings(team1_elo, team2_elo)
-            
-            elo_diff1 = new_team1_elo - team1_elo
-            elo_diff2 = new_team2_elo - team2_elo
-            
             match_record = base.Match(
                 is_doubles=True,
                 winner1_id=match.winner1_id,
@@ -97,14 +59,9 @@ class MatchService:
                 loser2_elo_change=elo_diff2
             )
         else:
-            new_winner_elo, new_loser_elo = elo.calculate_new_ratings(
-                winner1_elo,
-                loser1_elo
-            )
-            
-            winner_elo_change = new_winner_elo - winner1_elo
-            loser_elo_change = new_loser_elo - loser1_elo
-            
+            winner_elo_change, loser_elo_change = MatchService.elo_changes([winner1_elo], [loser1_elo])
+            winner_elo_change, loser_elo_change = column_int(winner_elo_change), column_int(loser_elo_change)
+
             match_record = base.Match(
                 is_doubles=False,
                 winner1_id=match.winner1_id,
@@ -116,19 +73,369 @@ class MatchService:
             )
         
         db.add(match_record)
-        db.commit()
+        db.flush()
+        # Reload the stored (integer) elo changes and server-side timestamp
         db.refresh(match_record)
-        
-        return match_record, None 
+        # Create player events for losers at the match time, which is how undo and edit find them
+        for event in event_types:
+            for loser_id in loser_ids:
+                db.add(base.PlayerEvent(
+                    player_id=loser_id,
+                    event_id=event.id,
+                    timestamp=match_record.timestamp
+                ))
+        MatchService._add_to_derived_tables(db, match_record)
+
+        # New season elo is the starting elo plus the stored change, as applied to the ledger
+        def player_result(slot: str) -> Dict[str, Any]:
+            player = players[getattr(match_record, f"{slot}_id")]
+            elo_change = getattr(match_record, f"{slot}_elo_change")
+            return {
+                "id": player.id,
+                "name": player.player_name,
+                "new_elo": ratings[player.id][0] + elo_change,
+                "elo_change": elo_change
+            }
+
+        winners = [player_result("winner1")] + ([player_result("winner2")] if match.is_doubles else [])
+        losers = [player_result("loser1")] + ([player_result("loser2")] if match.is_doubles else [])
+
+        loss_message = "pantsed" if match.is_pantsed else "defeated"
+        if match.is_doubles:
+            audit_log = AuditLogService.add_log(
+                db,
+                f"Doubles match recorded: Players {winners[0]['name']} ({winners[0]['new_elo']}) & {winners[1]['name']} ({winners[1]['new_elo']}) {loss_message} {losers[0]['name']} ({losers[0]['new_elo']}) & {losers[1]['name']} ({losers[1]['new_elo']})"
+            )
+        else:
+            audit_log = AuditLogService.add_log(
+                db,
+                f"Match recorded: {winners[0]['name']} ({winners[0]['new_elo']}) {loss_message} {losers[0]['name']} ({losers[0]['new_elo']})"
+            )
+        result = {
+            "id": match_record.id,
+            "is_doubles": match.is_doubles,
+            "winners": winners,
+            "losers": losers
+        }
+        db.commit()
+        result["auditlog"] = AuditLogService.entry(audit_log)
+        return result, None
+
+    @staticmethod
+    def elo_changes(winner_elos: List[int], loser_elos: List[int]) -> Tuple[float, float]:
+        """Elo change for each winner and each loser; doubles teams play at their average rating."""
+        winner_team_elo = sum(winner_elos) / len(winner_elos)
+        loser_team_elo = sum(loser_elos) / len(loser_elos)
+        new_winner_elo, new_loser_elo = elo.calculate_new_ratings(winner_team_elo, loser_team_elo)
+        return new_winner_elo - winner_team_elo, new_loser_elo - loser_team_elo
+
+    @staticmethod
+    def has_later_matches(db: Session, match_id: int) -> bool:
+        """Whether any match is ordered after this one; False for a match that doesn't exist."""
+        timestamp = db.query(base.Match.timestamp).filter(base.Match.id == match_id).scalar_subquery()
+        return db.query(base.Match.id).filter(
+            or_(
+                base.Match.timestamp > timestamp,
+                and_(base.Match.timestamp == timestamp, base.Match.id > match_id)
+            )
+        ).first() is not None
+
+    @staticmethod
+    def delete_match(db: Session, match_id: int) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Undo any match in one transaction, recomputing the later matches it fed into.
+
+        Returns the undone match, how many later matches were recomputed and
+        every rating that changed.
+        """
+        match = db.query(base.Match).filter(base.Match.id == match_id).with_for_update().first()
+        if not match:
+            return None, f"Match #{match_id} not found"
+        match_info = MatchService._match_info(match)
+        old_slots = MatchService._slots(match)
+        timestamp = match.timestamp
+
+        # Events were recorded against the losers at the match time
+        db.query(base.PlayerEvent).filter(
+            base.PlayerEvent.player_id.in_([match_info['loser1_id'], match_info['loser2_id']]),
+            base.PlayerEvent.timestamp == timestamp
+        ).delete(synchronize_session=False)
+        MatchService._remove_from_derived_tables(db, match)
+        db.delete(match)
+        db.flush()
+        result = MatchService._recompute_later_matches(db, timestamp, match_id, old_slots, [])
+
+        audit_log = AuditLogService.add_log(db, f"Match #{match_id} between {MatchService._describe(match_info)} undone")
+        # max(matches.id) can go backwards on undo, so count it separately
+        DataVersionService.bump(db, "matches")
+        db.commit()
+        return {"match": match_info, **result, "auditlog": AuditLogService.entry(audit_log)}, None
+
+    @staticmethod
+    def update_match(db: Session, match_id: int, match: MatchCreate) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Replace the players and events of a recorded match, keeping its time, in one transaction.
+
+        The match is re-rated at the elos its new players had going into it,
+        then later matches are recomputed as for delete_match.
+        """
+        record = db.query(base.Match).filter(base.Match.id == match_id).with_for_update().first()
+        if not record:
+            return None, f"Match #{match_id} not found"
+        winner_ids, loser_ids = MatchService._sides(match)
+        players, error = MatchService._load_players(db, match)
+        if error:
+            return None, error
+        event_types, error = MatchService._load_event_types(db, match)
+        if error:
+            return None, error
+
+        previous_info = MatchService._match_info(record)
+        old_slots = MatchService._slots(record)
+        MatchService._remove_from_derived_tables(db, record)
+
+        # Events were recorded against the losers at the match time
+        db.query(base.PlayerEvent).filter(
+            base.PlayerEvent.player_id.in_([previous_info['loser1_id'], previous_info['loser2_id']]),
+            base.PlayerEvent.timestamp == record.timestamp
+        ).delete(synchronize_session=False)
+        for event in event_types:
+            for loser_id in loser_ids:
+                db.add(base.PlayerEvent(player_id=loser_id, event_id=event.id, timestamp=record.timestamp))
+
+        containing = get_season_index(db).containing(record.timestamp)
+        elos = RatingService.get_ratings_before(db, winner_ids + loser_ids, containing[0] if containing else None, record)
+        winner_change, loser_change = MatchService.elo_changes(
+            [elos[player_id] for player_id in winner_ids],
+            [elos[player_id] for player_id in loser_ids]
+        )
+        record.is_doubles = match.is_doubles
+        for slot, player_id, elo_change in (
+            ("winner1", match.winner1_id, winner_change),
+            ("winner2", match.winner2_id if match.is_doubles else None, winner_change),
+            ("loser1", match.loser1_id, loser_change),
+            ("loser2", match.loser2_id if match.is_doubles else None, loser_change),
+        ):
+            setattr(record, f"{slot}_id", player_id)
+            setattr(record, f"{slot}_starting_elo", elos[player_id] if player_id is not None else None)
+            setattr(record, f"{slot}_elo_change", column_int(elo_change) if player_id is not None else None)
+        db.flush()
+        # Reload the player relationships for the new ids
+        db.refresh(record)
+        # Checkpoints for the edited players are rebuilt once later matches are recomputed
+        MatchService._add_to_derived_tables(db, record, checkpoints=False)
+        result = MatchService._recompute_later_matches(
+            db, record.timestamp, record.id, old_slots, MatchService._slots(record)
+        )
+
+        match_info = MatchService._match_info(record)
+        audit_log = AuditLogService.add_log(
+            db,
+            f"Match #{match_id} edited: {MatchService._describe(previous_info)} changed to {MatchService._describe(match_info)}"
+        )
+        DataVersionService.bump(db, "matches")
+        db.commit()
+        return {"match": match_info, "previous": previous_info, **result, "auditlog": AuditLogService.entry(audit_log)}, None
+
+    @staticmethod
+    def _recompute_later_matches(
+        db: Session,
+        timestamp: datetime,
+        match_id: int,
+        old_slots: List[Tuple[Optional[int], Optional[int], Optional[int]]],
+        new_slots: List[Tuple[Optional[int], Optional[int], Optional[int]]]
+    ) -> Dict[str, Any]:
+        """Carry a changed match's new elo changes through the matches ordered after it.
+
+        The match itself must already be updated in the ledger. Each player's
+        rating in each season is tracked as an offset from what later matches
+        were stored against; a later match is only re-rated when one of its
+        players has an offset in the season it was rated in, and its own
+        changed deltas then offset its players in turn. Does not commit.
+        """
+        season_index = get_season_index(db)
+        # Rating now minus rating as stored, per (player_id, season_id)
+        offsets: Dict[Tuple[int, int], int] = {}
+        played_changes: Dict[Tuple[int, int], int] = {}
+        for slots, sign in ((old_slots, -1), (new_slots, 1)):
+            for player_id, _, elo_change in slots:
+                if player_id is None:
+                    continue
+                for season_id in season_index.season_ids_for(timestamp):
+                    offsets[(player_id, season_id)] = offsets.get((player_id, season_id), 0) + sign * (elo_change or 0)
+                    played_changes[(player_id, season_id)] = played_changes.get((player_id, season_id), 0) + sign
+        own_changes = dict(offsets)
+
+        later_matches = db.query(
+            base.Match.id,
+            base.Match.timestamp,
+            *[getattr(base.Match, attr) for slot in MATCH_SLOTS for attr in (slot[0], starting_elo_attr(slot[0]), slot[1])]
+        ).filter(
+            or_(
+                base.Match.timestamp > timestamp,
+                and_(base.Match.timestamp == timestamp, base.Match.id > match_id)
+            )
+        ).order_by(base.Match.timestamp.asc(), base.Match.id.asc()).yield_per(1000)
+
+        ledger_changes: Dict[Tuple[int, int], int] = {}
+        elo_gained: Dict[Tuple[int, int], int] = {}
+        match_rows = []
+        participant_rows = []
+        for row in later_matches:
+            containing = season_index.containing(row.timestamp)
+            rating_season_id = containing[0].id if containing else base.LIFETIME_SEASON_ID
+            slots = [
+                (getattr(row, player_attr), getattr(row, starting_elo_attr(player_attr)), getattr(row, change_attr))
+                for player_attr, change_attr in MATCH_SLOTS
+            ]
+            if not any(offsets.get((player_id, rating_season_id)) for player_id, _, _ in slots if player_id is not None):
+                continue
+
+            starting_elos = [
+                (starting_elo or 0) + offsets.get((player_id, rating_season_id), 0) if player_id is not None else None
+                for player_id, starting_elo, _ in slots
+            ]
+            winner_change, loser_change = MatchService.elo_changes(
+                [elo for elo in starting_elos[:2] if elo is not None],
+                [elo for elo in starting_elos[2:] if elo is not None]
+            )
+            match_row = {"id": row.id}
+            winner_diffs = []
+            loser_ids = []
+            for (player_attr, change_attr), (side, side_slot), (player_id, _, old_change), starting_elo in zip(
+                MATCH_SLOTS, PARTICIPANT_SLOTS, slots, starting_elos
+            ):
+                if player_id is None:
+                    continue
+                new_change = column_int(winner_change if side == "winner" else loser_change)
+                match_row[starting_elo_attr(player_attr)] = starting_elo
+                match_row[change_attr] = new_change
+                participant_rows.append({"match_id": row.id, "side": side, "slot": side_slot, "elo_change": new_change})
+                diff = new_change - (old_change or 0)
+                if side == "winner":
+                    winner_diffs.append((player_id, diff))
+                else:
+                    loser_ids.append(player_id)
+                if diff:
+                    for season_id in season_index.season_ids_for(row.timestamp):
+                        offsets[(player_id, season_id)] = offsets.get((player_id, season_id), 0) + diff
+                        ledger_changes[(player_id, season_id)] = ledger_changes.get((player_id, season_id), 0) + diff
+            for winner_id, diff in winner_diffs:
+                for loser_id in loser_ids:
+                    elo_gained[(winner_id, loser_id)] = elo_gained.get((winner_id, loser_id), 0) + diff
+            match_rows.append(match_row)
+
+        if match_rows:
+            # ORM bulk UPDATE by primary key, sent as executemany
+            db.execute(update(base.Match), match_rows)
+            db.execute(update(base.MatchParticipant), participant_rows)
+        RatingService.adjust_elos(db, ledger_changes)
+        HeadToHeadService.adjust_elo_gained(db, elo_gained)
+
+        elo_changes = dict(own_changes)
+        for key, elo_change in ledger_changes.items():
+            elo_changes[key] = elo_changes.get(key, 0) + elo_change
+        RatingService.rebuild_checkpoints(db, {player_id for player_id, _ in list(elo_changes) + list(played_changes)})
+        return {
+            "recomputed_matches": len(match_rows),
+            "rating_changes": MatchService._rating_changes(db, elo_changes, played_changes)
+        }
+
+    @staticmethod
+    def _rating_changes(
+        db: Session,
+        elo_changes: Dict[Tuple[int, int], int],
+        played_changes: Dict[Tuple[int, int], int]
+    ) -> List[Dict[str, Any]]:
+        """Before and after of every ledger row that moved, by season then player name."""
+        keys = [key for key in set(elo_changes) | set(played_changes) if elo_changes.get(key) or played_changes.get(key)]
+        if not keys:
+            return []
+        rows = db.query(
+            base.PlayerRating.player_id,
+            base.PlayerRating.season_id,
+            base.PlayerRating.elo,
+            base.PlayerRating.matches_played,
+            base.Player.player_name
+        ).join(
+            base.Player, base.Player.id == base.PlayerRating.player_id
+        ).filter(
+            tuple_(base.PlayerRating.player_id, base.PlayerRating.season_id).in_(keys)
+        ).all()
+        changes = [
+            {
+                "player_id": row.player_id,
+                "player_name": row.player_name,
+                "season_id": row.season_id,
+                "elo_before": row.elo - elo_changes.get((row.player_id, row.season_id), 0),
+                "elo_after": row.elo,
+                "matches_played_before": row.matches_played - played_changes.get((row.player_id, row.season_id), 0),
+                "matches_played_after": row.matches_played
+            }
+            for row in rows
+        ]
+        changes.sort(key=lambda x: (x["season_id"], x["player_name"]))
+        return changes
+
+    @staticmethod
+    def _sides(match: MatchCreate) -> Tuple[List[int], List[int]]:
+        winner_ids = [match.winner1_id]
+        loser_ids = [match.loser1_id]
+        if match.is_doubles:
+            winner_ids.append(match.winner2_id)
+            loser_ids.append(match.loser2_id)
+        return winner_ids, loser_ids
 
     @staticmethod
-    def delete_match(db: Session, match_id: int):
-        # Only delete if this is the latest match
-        match = db.query(base.Match).order_by(base.Match.timestamp.desc()).first()
-        if not match or match.id != match_id:
-            return None, "Cannot undo if other matches have taken place following it"
+    def _load_players(db: Session, match: MatchCreate) -> Tuple[Optional[Dict[int, base.Player]], Optional[str]]:
+        winner_ids, loser_ids = MatchService._sides(match)
+        # Validate players exist and are not deleted
+        players = {
+            player.id: player
+            for player in db.query(base.Player).filter(
+                base.Player.id.in_(winner_ids + loser_ids),
+                base.Player.deleted == False
+            )
+        }
+        if not all(player_id in players for player_id in winner_ids + loser_ids):
+            return None, "One or more players not found or have been deleted"
+
+        # Validate no duplicate players in doubles
+        if match.is_doubles and len(players) != 4:
+            return None, "Duplicate players not allowed in doubles match"
+        if not match.is_doubles and len(players) != 2:
+            return None, "Duplicate players not allowed in a match"
+        return players, None
+
+    @staticmethod
+    def _load_event_types(db: Session, match: MatchCreate) -> Tuple[List[base.EventType], Optional[str]]:
+        event_types = {
+            "pantsed": match.is_pantsed,
+            "away_game": match.is_away_game,
+            "lost_by_foul": match.is_lost_by_foul
+        }
+        active_events = [event_name for event_name, is_active in event_types.items() if is_active]
+        if not active_events:
+            return [], None
+        events = {
+            event.name: event
+            for event in db.query(base.EventType).filter(base.EventType.name.in_(active_events))
+        }
+        for event_name in active_events:
+            if event_name not in events:
+                return [], f"DB Error: {event_name} event type not found in EventType table"
+        return [events[event_name] for event_name in active_events], None
+
+    @staticmethod
+    def _slots(match: base.Match) -> List[Tuple[Optional[int], Optional[int], Optional[int]]]:
+        """(player id, starting elo, elo change) for each entry of MATCH_SLOTS."""
+        return [
+            (getattr(match, player_attr), getattr(match, starting_elo_attr(player_attr)), getattr(match, change_attr))
+            for player_attr, change_attr in MATCH_SLOTS
+        ]
+
+    @staticmethod
+    def _match_info(match: base.Match) -> Dict[str, Any]:
         # Retrieve player names using relationships
-        match_info = {
+        return {
             'id': match.id,
             'timestamp': match.timestamp,
             'is_doubles': match.is_doubles,
@@ -145,6 +452,46 @@ class MatchService:
             'loser1_elo_change': match.loser1_elo_change,
             'loser2_elo_change': match.loser2_elo_change,
         }
-        db.delete(match)
-        db.commit()
-        return match_info, None
\ No newline at end of file
+
+    @staticmethod
+    def _describe(match_info: Dict[str, Any]) -> str:
+        """'A & B and C & D' for the audit log."""
+        return (
+            f"{match_info.get('winner1_name', '')}"
+            f"{(' & ' + match_info['winner2_name']) if match_info.get('is_doubles') and match_info.get('winner2_name') else ''} "
+            f"and {match_info.get('loser1_name', '')}"
+            f"{(' & ' + match_info['loser2_name']) if match_info.get('is_doubles') and match_info.get('loser2_name') else ''}"
+        )
+
+    @staticmethod
+    def _add_to_derived_tables(db: Session, match: base.Match, checkpoints: bool = True) -> None:
+        """Participants, ledger, head-to-head and daily counts for a flushed match. Does not commit."""
+        MatchService._add_participants(db, match)
+        RatingService.apply_match(db, match, checkpoints=checkpoints)
+        HeadToHeadService.apply_match(db, match)
+        DailyMatchService.apply_match(db, match)
+
+    @staticmethod
+    def _remove_from_derived_tables(db: Session, match: base.Match) -> None:
+        RatingService.apply_match(db, match, direction=-1)
+        db.query(base.MatchParticipant).filter(
+            base.MatchParticipant.match_id == match.id
+        ).delete()
+        HeadToHeadService.apply_match(db, match, direction=-1)
+        DailyMatchService.apply_match(db, match, direction=-1)
+
+    @staticmethod
+    def _add_participants(db: Session, match: base.Match) -> None:
+        """Write the match_participants rows for a flushed match."""
+        for (player_attr, change_attr), (side, slot) in zip(MATCH_SLOTS, PARTICIPANT_SLOTS):
+            player_id = getattr(match, player_attr)
+            if player_id is not None:
+                db.add(base.MatchParticipant(
+                    match_id=match.id,
+                    side=side,
+                    slot=slot,
+                    player_id=player_id,
+                    elo_change=getattr(match, change_attr) or 0,
+                    timestamp=match.timestamp
+                ))
+        db.flush()
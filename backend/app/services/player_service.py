@@ -1,15 +1,19 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func, or_, and_, select
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import func, and_, or_, select
 from datetime import datetime, timedelta, timezone
 from typing import List, Optional, Tuple
 from .. import base
-from ..schemas import PlayerCreate, PlayerUpdate
+from ..schemas import PlayerCreate, PlayerUpdate, PlayerListEntry
+from .rating_service import RatingService
+from .data_version_service import DataVersionService
+from .season_index import Season, get_season_index
 
 class PlayerService:
     @staticmethod
     def create_player(db: Session, player: PlayerCreate) -> dict:
         db_player = base.Player(player_name=player.player_name)
         db.add(db_player)
+        DataVersionService.bump(db, "players")
         db.commit()
         db.refresh(db_player)
         return {
@@ -38,130 +42,174 @@ class PlayerService:
         return player_dict
 
     @staticmethod
-    def get_players(db: Session,season_id) -> list[dict]:
-        # Get match counts
-        match_counts = db.query(
-            base.Player.id,
-            func.count(base.Match.id).label('total_matches')
-        ).outerjoin(
-            base.Match,
-            or_(
-                base.Match.winner1_id == base.Player.id,
-                base.Match.winner2_id == base.Player.id,
-                base.Match.loser1_id == base.Player.id,
-                base.Match.loser2_id == base.Player.id
-            )
-        ).group_by(base.Player.id).subquery()
+    def get_players(db: Session,season_id) -> list[PlayerListEntry]:
+        # Season ELO and matches come from the ratings ledger row for the
+        # selected season, lifetime match count from the lifetime row
+        current_season = PlayerService.get_current_season(season_id, db)
+        season_ledger_id = current_season.id if current_season else base.LIFETIME_SEASON_ID
+        season_rating = aliased(base.PlayerRating)
+        lifetime_rating = aliased(base.PlayerRating)
 
-        # Get pantsed event type
-        pantsed_event = db.query(base.EventType).filter(base.EventType.name == "pantsed").first()
-        
-        # Get recent pantsing events (last 90 days)
+        # Recent pantsing events (last 90 days)
         pantsed_validity_start_date = datetime.now() - timedelta(days=90)
-        recent_pantsed_players = db.query(base.PlayerEvent.player_id).filter(
-            base.PlayerEvent.event_id == pantsed_event.id,
+        recently_pantsed = select(base.PlayerEvent.id).join(
+            base.EventType,
+            base.EventType.id == base.PlayerEvent.event_id
+        ).where(
+            base.EventType.name == "pantsed",
+            base.PlayerEvent.player_id == base.Player.id,
             base.PlayerEvent.timestamp >= pantsed_validity_start_date
-        ).subquery()
+        ).exists()
 
-        # Query all players with match counts and pantsed status
+        # Query all players with ratings, match counts and pantsed status in one statement
         player_rows = db.query(
-            base.Player,
-            match_counts.c.total_matches,
-            base.Player.id.in_(select(recent_pantsed_players)).label('recently_pantsed')
+            base.Player.id,
+            base.Player.player_name,
+            func.coalesce(season_rating.elo, base.DEFAULT_ELO).label('elo'),
+            func.coalesce(lifetime_rating.matches_played, 0).label('total_matches'),
+            recently_pantsed.label('recently_pantsed'),
+            func.coalesce(season_rating.matches_played, 0).label('matches_in_season')
+        ).select_from(
+            base.Player
+        ).outerjoin(
+            season_rating,
+            and_(
+                season_rating.player_id == base.Player.id,
+                season_rating.season_id == season_ledger_id
+            )
         ).outerjoin(
-            match_counts,
-            base.Player.id == match_counts.c.id
+            lifetime_rating,
+            and_(
+                lifetime_rating.player_id == base.Player.id,
+                lifetime_rating.season_id == base.LIFETIME_SEASON_ID
+            )
         ).filter(
             base.Player.deleted == False
         ).order_by(
             base.Player.player_name.asc()
         ).all()
 
-        current_season = PlayerService.get_current_season(season_id, db)
+        return [
+            {
+                "id": row.id,
+                "player_name": row.player_name,
+                "elo": row.elo,
+                "total_matches": row.total_matches,
+                "recently_pantsed": row.recently_pantsed,
+                "matches_in_season": row.matches_in_season
+            }
+            for row in player_rows
+        ]
 
-        # For each player, calculate ELO from matches in the current season
-        result = []
-        for player, total_matches, recently_pantsed in player_rows:
-            elo, matches_in_season = PlayerService.calculate_player_season_data(player, current_season, db)
-            result.append({
-                "id": player.id,
-                "player_name": player.player_name,
-                "elo": elo,
-                "total_matches": total_matches or 0,
-                "recently_pantsed": recently_pantsed,
-                "matches_in_season": matches_in_season
-            })
-        return result
-    
     @staticmethod
-    def get_current_season(season_id, db: Session):
+    def get_current_season(season_id, db: Session) -> Optional[Season]:
         # Return lifetime data for all seasons
         if season_id == -999:
             return None
+        season_index = get_season_index(db)
         # Initial load return current season
         if season_id == -998:
-            now = datetime.now()
-            return db.query(base.GameSeason).filter(
-                base.GameSeason.start_date <= now,
-                base.GameSeason.end_date >= now
-            ).order_by(
-                (base.GameSeason.start_date).desc()
-            ).first()
+            return season_index.current_season()
 
         # Return specified season
         else:
-            return db.query(base.GameSeason).filter(
-                base.GameSeason.id == season_id
-            ).first()
+            return season_index.get(season_id)
     
     @staticmethod
     def calculate_player_season_data(player, current_season, db: Session):
-        
-        
+        # Ratings are materialised in player_ratings as matches are recorded/undone
+        return RatingService.get_rating(db, player.id, current_season)
+
+    @staticmethod
+    def get_elo_history(
+        db: Session,
+        player_id: int,
+        season_id: int = -999,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        interval: str = "match"
+    ) -> Optional[dict]:
+        """A player's season elo after each match between start and end.
+
+        The elo at start comes from the last rating checkpoint before it plus
+        the few matches since, so only the requested window is read in full.
+        interval "day" or "week" keeps the last elo of each day or week.
+        """
+        player = db.query(base.Player.id, base.Player.player_name).filter(
+            base.Player.id == player_id,
+            base.Player.deleted == False
+        ).first()
+        if not player:
+            return None
+
+        current_season = PlayerService.get_current_season(season_id, db)
+        season_ledger_id = current_season.id if current_season else base.LIFETIME_SEASON_ID
+        participant = base.MatchParticipant
+        season_filter = [RatingService.season_match_filter(db, current_season, participant.timestamp)] if current_season else []
+
         elo = base.DEFAULT_ELO
-        
-        if current_season:
-            matches = db.query(base.Match).filter(
-                ((base.Match.winner1_id == player.id) |
-                    (base.Match.winner2_id == player.id) |
-                    (base.Match.loser1_id == player.id) |
-                    (base.Match.loser2_id == player.id)) &
-                (base.Match.timestamp >= current_season.start_date) &
-                (base.Match.timestamp <= current_season.end_date)
-            ).all()
-            # Exclude matches that belong to special event seasons within the current season
-            special_seasons = db.query(base.GameSeason).filter(
-                base.GameSeason.id != current_season.id,
-                base.GameSeason.start_date >= current_season.start_date,
-                base.GameSeason.end_date <= current_season.end_date
-            ).all()
-            if special_seasons:
-                filtered_matches = []
-                for match in matches:
-                    in_special_season = any(
-                        season.start_date <= match.timestamp <= season.end_date
-                        for season in special_seasons
-                    )
-                    if not in_special_season:
-                        filtered_matches.append(match)
-                matches = filtered_matches
-        else:
-            matches = db.query(base.Match).filter(
-                (base.Match.winner1_id == player.id) |
-                (base.Match.winner2_id == player.id) |
-                (base.Match.loser1_id == player.id) |
-                (base.Match.loser2_id == player.id)
-            ).all()
+        if start:
+            checkpoint = db.query(base.PlayerRatingCheckpoint).filter(
+                base.PlayerRatingCheckpoint.player_id == player_id,
+                base.PlayerRatingCheckpoint.season_id == season_ledger_id,
+                base.PlayerRatingCheckpoint.timestamp < start
+            ).order_by(base.PlayerRatingCheckpoint.matches_played.desc()).first()
+            since_checkpoint = []
+            if checkpoint:
+                elo = checkpoint.elo
+                since_checkpoint = [or_(
+                    participant.timestamp > checkpoint.timestamp,
+                    and_(participant.timestamp == checkpoint.timestamp, participant.match_id > checkpoint.match_id)
+                )]
+            elo += db.query(func.coalesce(func.sum(participant.elo_change), 0)).filter(
+                participant.player_id == player_id,
+                participant.timestamp < start,
+                *season_filter,
+                *since_checkpoint
+            ).scalar()
+
+        window = [participant.timestamp >= start] if start else []
+        if end:
+            window.append(participant.timestamp <= end)
+        matches = db.query(
+            participant.match_id,
+            participant.side,
+            participant.elo_change,
+            participant.timestamp
+        ).filter(
+            participant.player_id == player_id,
+            *season_filter,
+            *window
+        ).order_by(participant.timestamp.asc(), participant.match_id.asc())
+
+        starting_elo = elo
+        history = []
         for match in matches:
-            if match.winner1_id == player.id:
-                elo += match.winner1_elo_change
-            if match.winner2_id == player.id and match.winner2_elo_change is not None:
-                elo += match.winner2_elo_change
-            if match.loser1_id == player.id:
-                elo += match.loser1_elo_change
-            if match.loser2_id == player.id and match.loser2_elo_change is not None:
-                elo += match.loser2_elo_change
-        return elo, len(matches)
+            elo += match.elo_change or 0
+            if interval == "match":
+                history.append({
+                    "match_id": match.match_id,
+                    "timestamp": match.timestamp,
+                    "result": "win" if match.side == "winner" else "loss",
+                    "elo_change": match.elo_change,
+                    "elo": elo
+                })
+                continue
+            day = match.timestamp.date()
+            period = day - timedelta(days=day.weekday()) if interval == "week" else day
+            if history and history[-1]["date"] == period:
+                history[-1]["elo"] = elo
+                history[-1]["matches"] += 1
+            else:
+                history.append({"date": period, "elo": elo, "matches": 1})
+
+        return {
+            "player_id": player.id,
+            "player_name": player.player_name,
+            "season_id": season_ledger_id,
+            "starting_elo": starting_elo,
+            "history": history
+        }
 
     @staticmethod
     def update_player(db: Session, player_id: int, player: PlayerUpdate) -> Optional[base.Player]:
@@ -173,6 +221,7 @@ class PlayerService:
             return None
         
         player.player_name = player.player_name
+        DataVersionService.bump(db, "players")
         db.commit()
         db.refresh(player)
         return player
@@ -188,6 +237,7 @@ class PlayerService:
         
         player.deleted = True
         player.deleted_at = datetime.now()
+        DataVersionService.bump(db, "players")
         db.commit()
         return True
 
@@ -0,0 +1,336 @@
+from datetime import datetime
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, func, tuple_
+from typing import Dict, Iterable, List, Optional, Tuple
+from .. import base
+from .data_version_service import DataVersionService
+from .season_index import Season, SeasonIndex, get_season_index, invalidate_season_index
+
+# (player id attribute, elo change attribute) for each player slot on a match
+MATCH_SLOTS = (
+    ('winner1_id', 'winner1_elo_change'),
+    ('winner2_id', 'winner2_elo_change'),
+    ('loser1_id', 'loser1_elo_change'),
+    ('loser2_id', 'loser2_elo_change'),
+)
+# match_participants (side, slot) for each entry of MATCH_SLOTS
+PARTICIPANT_SLOTS = (('winner', 1), ('winner', 2), ('loser', 1), ('loser', 2))
+# Matches of a player in a season between rating checkpoints
+CHECKPOINT_INTERVAL = 50
+
+class RatingService:
+    """Keeps the player_ratings ledger and season_match_counts in step with the matches table.
+
+    Which seasons a match counts towards is decided by the SeasonIndex.
+    """
+
+    @staticmethod
+    def season_match_filter(db: Session, season: Season, timestamp=base.Match.timestamp):
+        """SQL criterion on a match timestamp column for matches that count towards season."""
+        special_seasons = get_season_index(db).special_seasons(season)
+        return and_(
+            timestamp >= season.start_date,
+            timestamp <= season.end_date,
+            *[
+                ~timestamp.between(special.start_date, special.end_date)
+                for special in special_seasons
+            ]
+        )
+
+    @staticmethod
+    def match_deltas(match: base.Match) -> List[Tuple[int, int]]:
+        deltas = []
+        for player_attr, change_attr in MATCH_SLOTS:
+            player_id = getattr(match, player_attr)
+            if player_id is not None:
+                deltas.append((player_id, getattr(match, change_attr) or 0))
+        return deltas
+
+    @staticmethod
+    def apply_match(db: Session, match: base.Match, direction: int = 1, checkpoints: bool = True) -> None:
+        """Add (direction=1) or remove (direction=-1) a match from the ledger.
+
+        Checkpoints assume the match is the player's latest; pass checkpoints=False
+        when re-adding an older match and rebuild them afterwards. Does not
+        commit, so the ledger update shares the caller's transaction.
+        """
+        season_index = get_season_index(db)
+        season_ids = season_index.season_ids_for(match.timestamp)
+        deltas = RatingService.match_deltas(match)
+        ratings = {
+            (rating.player_id, rating.season_id): rating
+            for rating in db.query(base.PlayerRating).filter(
+                base.PlayerRating.player_id.in_([player_id for player_id, _ in deltas]),
+                base.PlayerRating.season_id.in_(season_ids)
+            )
+        }
+        missing = [
+            base.PlayerRating(
+                player_id=player_id,
+                season_id=season_id,
+                elo=base.DEFAULT_ELO,
+                matches_played=0
+            )
+            for player_id, _ in deltas
+            for season_id in season_ids
+            if (player_id, season_id) not in ratings
+        ]
+        if missing:
+            db.add_all(missing)
+            db.flush()
+            ratings.update({(rating.player_id, rating.season_id): rating for rating in missing})
+
+        RatingService._apply_match_counts(db, RatingService.count_season_ids(season_index, match.timestamp), len(deltas), direction)
+
+        checkpoint_due = []
+        for player_id, elo_change in deltas:
+            for season_id in season_ids:
+                rating = ratings[(player_id, season_id)]
+                if checkpoints and direction > 0 and (rating.matches_played + 1) % CHECKPOINT_INTERVAL == 0:
+                    checkpoint_due.append(rating)
+                rating.elo = base.PlayerRating.elo + direction * elo_change
+                rating.matches_played = base.PlayerRating.matches_played + direction
+        db.flush()
+
+        if direction < 0:
+            db.query(base.PlayerRatingCheckpoint).filter(
+                base.PlayerRatingCheckpoint.match_id == match.id
+            ).delete()
+        for rating in checkpoint_due:
+            # Read back the incremented row rather than trusting the values loaded above
+            db.refresh(rating)
+            if rating.matches_played % CHECKPOINT_INTERVAL == 0:
+                db.add(base.PlayerRatingCheckpoint(
+                    player_id=rating.player_id,
+                    season_id=rating.season_id,
+                    matches_played=rating.matches_played,
+                    match_id=match.id,
+                    timestamp=match.timestamp,
+                    elo=rating.elo
+                ))
+        db.flush()
+
+    @staticmethod
+    def count_season_ids(season_index: SeasonIndex, timestamp: datetime) -> List[int]:
+        """season_match_counts ids a match at timestamp counts towards: lifetime and every season containing it.
+
+        Unlike ratings, a season's totals include the matches of its nested special seasons.
+        """
+        return [base.LIFETIME_SEASON_ID] + [season.id for season in season_index.containing(timestamp)]
+
+    @staticmethod
+    def _apply_match_counts(db: Session, season_ids: List[int], appearances: int, direction: int) -> None:
+        counts = {
+            count.season_id: count
+            for count in db.query(base.SeasonMatchCount).filter(
+                base.SeasonMatchCount.season_id.in_(season_ids)
+            )
+        }
+        missing = [
+            base.SeasonMatchCount(season_id=season_id, match_count=0, appearance_count=0)
+            for season_id in season_ids if season_id not in counts
+        ]
+        if missing:
+            db.add_all(missing)
+            db.flush()
+            counts.update({count.season_id: count for count in missing})
+        for count in counts.values():
+            count.match_count = base.SeasonMatchCount.match_count + direction
+            count.appearance_count = base.SeasonMatchCount.appearance_count + direction * appearances
+
+    @staticmethod
+    def get_match_counts(db: Session) -> Dict[int, Tuple[int, int]]:
+        """(matches, player appearances) for each season id with matches, LIFETIME_SEASON_ID included.
+
+        A season's counts include its nested special seasons; see count_season_ids.
+        """
+        return {
+            count.season_id: (count.match_count, count.appearance_count)
+            for count in db.query(base.SeasonMatchCount)
+        }
+
+    @staticmethod
+    def get_ledger_rows(db: Session, player_ids: List[int]) -> List[Dict[str, int]]:
+        """Every ledger row of the given players, LIFETIME_SEASON_ID included."""
+        return [
+            {
+                "player_id": rating.player_id,
+                "season_id": rating.season_id,
+                "elo": rating.elo,
+                "matches_played": rating.matches_played
+            }
+            for rating in db.query(base.PlayerRating).filter(base.PlayerRating.player_id.in_(player_ids))
+        ]
+
+    @staticmethod
+    def get_ratings(db: Session, player_ids: List[int], season: Optional[Season]) -> Dict[int, Tuple[int, int]]:
+        """(elo, matches played) in season for each player, defaulting players with no ledger row."""
+        season_id = season.id if season else base.LIFETIME_SEASON_ID
+        ratings = {player_id: (base.DEFAULT_ELO, 0) for player_id in player_ids}
+        rows = db.query(
+            base.PlayerRating.player_id,
+            base.PlayerRating.elo,
+            base.PlayerRating.matches_played
+        ).filter(
+            base.PlayerRating.player_id.in_(player_ids),
+            base.PlayerRating.season_id == season_id
+        )
+        for row in rows:
+            ratings[row.player_id] = (row.elo, row.matches_played)
+        return ratings
+
+    @staticmethod
+    def get_ratings_before(
+        db: Session,
+        player_ids: List[int],
+        season: Optional[Season],
+        match: base.Match
+    ) -> Dict[int, int]:
+        """Elo in season each player had going into match, summed from the matches ordered before it."""
+        participant = base.MatchParticipant
+        season_filter = [RatingService.season_match_filter(db, season, participant.timestamp)] if season else []
+        elos = {player_id: base.DEFAULT_ELO for player_id in player_ids}
+        rows = db.query(
+            participant.player_id,
+            func.coalesce(func.sum(participant.elo_change), 0)
+        ).filter(
+            participant.player_id.in_(player_ids),
+            tuple_(participant.timestamp, participant.match_id) < tuple_(match.timestamp, match.id),
+            *season_filter
+        ).group_by(participant.player_id)
+        for player_id, elo_change in rows:
+            elos[player_id] += elo_change
+        return elos
+
+    @staticmethod
+    def adjust_elos(db: Session, elo_changes: Dict[Tuple[int, int], int]) -> None:
+        """Add {(player_id, season_id): elo change} to existing ledger rows. Does not commit."""
+        for (player_id, season_id), elo_change in elo_changes.items():
+            if elo_change:
+                db.query(base.PlayerRating).filter(
+                    base.PlayerRating.player_id == player_id,
+                    base.PlayerRating.season_id == season_id
+                ).update({base.PlayerRating.elo: base.PlayerRating.elo + elo_change}, synchronize_session=False)
+
+    @staticmethod
+    def get_rating(db: Session, player_id: int, season: Optional[Season]) -> Tuple[int, int]:
+        season_id = season.id if season else base.LIFETIME_SEASON_ID
+        rating = db.query(
+            base.PlayerRating.elo,
+            base.PlayerRating.matches_played
+        ).filter(
+            base.PlayerRating.player_id == player_id,
+            base.PlayerRating.season_id == season_id
+        ).first()
+        if not rating:
+            return base.DEFAULT_ELO, 0
+        return rating.elo, rating.matches_played
+
+    @staticmethod
+    def rebuild(db: Session) -> int:
+        """Regenerate the whole ledger from the matches table. Returns the row count."""
+        # Pick up any edits to game_seasons
+        invalidate_season_index()
+        season_index = get_season_index(db)
+        totals = {}
+        matches = db.query(base.Match).order_by(base.Match.timestamp.asc()).yield_per(1000)
+        for match in matches:
+            season_ids = season_index.season_ids_for(match.timestamp)
+            for player_id, elo_change in RatingService.match_deltas(match):
+                for season_id in season_ids:
+                    elo, matches_played = totals.get((player_id, season_id), (base.DEFAULT_ELO, 0))
+                    totals[(player_id, season_id)] = (elo + elo_change, matches_played + 1)
+
+        RatingService.replace_ledger(db, totals)
+        db.commit()
+        return len(totals)
+
+    @staticmethod
+    def replace_ledger(db: Session, totals: Dict[Tuple[int, int], Tuple[int, int]]) -> None:
+        """Swap the ledger for totals of {(player_id, season_id): (elo, matches_played)}. Does not commit."""
+        db.query(base.PlayerRating).delete()
+        db.bulk_insert_mappings(base.PlayerRating, [
+            {
+                "player_id": player_id,
+                "season_id": season_id,
+                "elo": elo,
+                "matches_played": matches_played
+            }
+            for (player_id, season_id), (elo, matches_played) in totals.items()
+        ])
+        RatingService.rebuild_checkpoints(db)
+        RatingService.rebuild_match_counts(db)
+        DataVersionService.bump(db, "seasons")
+
+    @staticmethod
+    def rebuild_checkpoints(db: Session, player_ids: Optional[Iterable[int]] = None) -> None:
+        """Regenerate player_rating_checkpoints from match_participants, for all players or just player_ids. Does not commit."""
+        season_index = get_season_index(db)
+        totals = {}
+        checkpoints = []
+        player_ids = None if player_ids is None else list(player_ids)
+        player_filter = [] if player_ids is None else [base.MatchParticipant.player_id.in_(player_ids)]
+        participants = db.query(
+            base.MatchParticipant.match_id,
+            base.MatchParticipant.player_id,
+            base.MatchParticipant.elo_change,
+            base.MatchParticipant.timestamp
+        ).filter(
+            *player_filter
+        ).order_by(
+            base.MatchParticipant.timestamp.asc(),
+            base.MatchParticipant.match_id.asc()
+        ).yield_per(1000)
+        for participant in participants:
+            for season_id in season_index.season_ids_for(participant.timestamp):
+                elo, matches_played = totals.get((participant.player_id, season_id), (base.DEFAULT_ELO, 0))
+                elo, matches_played = elo + (participant.elo_change or 0), matches_played + 1
+                totals[(participant.player_id, season_id)] = (elo, matches_played)
+                if matches_played % CHECKPOINT_INTERVAL == 0:
+                    checkpoints.append({
+                        "player_id": participant.player_id,
+                        "season_id": season_id,
+                        "matches_played": matches_played,
+                        "match_id": participant.match_id,
+                        "timestamp": participant.timestamp,
+                        "elo": elo
+                    })
+
+        checkpoint_filter = [] if player_ids is None else [base.PlayerRatingCheckpoint.player_id.in_(player_ids)]
+        db.query(base.PlayerRatingCheckpoint).filter(*checkpoint_filter).delete()
+        db.bulk_insert_mappings(base.PlayerRatingCheckpoint, checkpoints)
+
+    @staticmethod
+    def rebuild_match_counts(db: Session) -> None:
+        """Regenerate season_match_counts from the matches table. Does not commit."""
+        season_index = get_season_index(db)
+        counts = {}
+        matches = db.query(
+            base.Match.timestamp,
+            *[getattr(base.Match, player_attr) for player_attr, _ in MATCH_SLOTS]
+        ).yield_per(1000)
+        for match in matches:
+            appearances = sum(getattr(match, player_attr) is not None for player_attr, _ in MATCH_SLOTS)
+            for season_id in RatingService.count_season_ids(season_index, match.timestamp):
+                match_count, appearance_count = counts.get(season_id, (0, 0))
+                counts[season_id] = (match_count + 1, appearance_count + appearances)
+
+        db.query(base.SeasonMatchCount).delete()
+        db.bulk_insert_mappings(base.SeasonMatchCount, [
+            {"season_id": season_id, "match_count": match_count, "appearance_count": appearance_count}
+            for season_id, (match_count, appearance_count) in counts.items()
+        ])
+
+    @staticmethod
+    def ensure_populated(db: Session) -> None:
+        """Build the ledger, checkpoints and match counts on first start against an existing match history."""
+        has_ratings = db.query(base.PlayerRating.player_id).first() is not None
+        has_matches = db.query(base.Match.id).first() is not None
+        if has_matches and not has_ratings:
+            RatingService.rebuild(db)
+        else:
+            if has_matches and db.query(base.PlayerRatingCheckpoint.player_id).first() is None:
+                RatingService.rebuild_checkpoints(db)
+            if has_matches and db.query(base.SeasonMatchCount.season_id).first() is None:
+                RatingService.rebuild_match_counts(db)
+            db.commit()
@@ -0,0 +1,182 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy.orm import Session
+from sqlalchemy import update
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from .. import base
+from ..replay import MatchLog, Scenario, replay, stored_mismatches
+from .head_to_head_service import HeadToHeadService
+from .player_service import PlayerService
+from .rating_service import RatingService, MATCH_SLOTS, PARTICIPANT_SLOTS
+from .season_index import get_season_index, invalidate_season_index
+
+# Worker processes for what-if replays; they are CPU bound and admin-only
+REPLAY_WORKERS = 1
+# Mismatched matches listed in a verify report
+MAX_REPORTED_MISMATCHES = 50
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+def get_replay_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn, not fork: the API process has threads and an event loop running
+        _pool = ProcessPoolExecutor(max_workers=REPLAY_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+def shutdown_replay_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+class ReplayService:
+    """Recomputes ELO over the full match history with the engine in app/replay.py."""
+
+    @staticmethod
+    def load_match_log(db: Session) -> MatchLog:
+        invalidate_season_index()
+        season_index = get_season_index(db)
+        season_ids = [base.LIFETIME_SEASON_ID] + [season.id for season in season_index.seasons]
+        season_positions = {season_id: position for position, season_id in enumerate(season_ids)}
+
+        rows = db.query(
+            base.Match.id,
+            base.Match.timestamp,
+            *[getattr(base.Match, attr) for slot in MATCH_SLOTS for attr in slot]
+        ).order_by(base.Match.timestamp.asc(), base.Match.id.asc()).all()
+
+        player_ids = sorted({
+            getattr(row, player_attr)
+            for row in rows for player_attr, _ in MATCH_SLOTS
+            if getattr(row, player_attr) is not None
+        })
+        player_positions = {player_id: position for position, player_id in enumerate(player_ids)}
+
+        players = np.full((len(rows), 4), -1, dtype=np.int64)
+        stored_changes = np.full((len(rows), 4), np.nan)
+        rating_season = np.zeros(len(rows), dtype=np.int64)
+        counts_towards = np.zeros((len(rows), len(season_ids)), dtype=bool)
+        for i, row in enumerate(rows):
+            for slot, (player_attr, change_attr) in enumerate(MATCH_SLOTS):
+                player_id = getattr(row, player_attr)
+                if player_id is not None:
+                    players[i, slot] = player_positions[player_id]
+                    stored_changes[i, slot] = getattr(row, change_attr) or 0
+            containing = season_index.containing(row.timestamp)
+            if containing:
+                rating_season[i] = season_positions[containing[0].id]
+            counts_towards[i, [season_positions[season_id] for season_id in season_index.season_ids_for(row.timestamp)]] = True
+
+        return MatchLog(
+            match_ids=np.array([row.id for row in rows], dtype=np.int64),
+            player_ids=np.array(player_ids, dtype=np.int64),
+            season_ids=np.array(season_ids, dtype=np.int64),
+            players=players,
+            stored_changes=stored_changes,
+            rating_season=rating_season,
+            counts_towards=counts_towards
+        )
+
+    @staticmethod
+    def verify(db: Session) -> Dict[str, Any]:
+        """Check every stored elo change against what the current rules give for the ratings at the time."""
+        log = ReplayService.load_match_log(db)
+        result = replay(log, [Scenario()], use_stored_changes=True)
+        mismatches = stored_mismatches(log, result)
+        return {
+            "matches": len(log.match_ids),
+            "mismatch_count": len(mismatches),
+            "mismatches": [
+                {
+                    "match_id": int(log.match_ids[i]),
+                    "stored": [float(log.stored_changes[i, 0]), float(log.stored_changes[i, 2])],
+                    "expected": [float(result.changes[0, i, 0]), float(result.changes[0, i, 1])]
+                }
+                for i in mismatches[:MAX_REPORTED_MISMATCHES]
+            ]
+        }
+
+    @staticmethod
+    def rebuild(db: Session) -> int:
+        """Recompute and store every match's starting elos and changes, then the ledger.
+
+        Returns the number of matches whose stored changes were wrong.
+        """
+        log = ReplayService.load_match_log(db)
+        result = replay(log, [Scenario()])
+        changed = stored_mismatches(log, result)
+
+        match_rows = []
+        participant_rows = []
+        for i, match_id in enumerate(log.match_ids.tolist()):
+            match_row = {"id": match_id}
+            for slot, (player_attr, change_attr) in enumerate(MATCH_SLOTS):
+                side, side_slot = PARTICIPANT_SLOTS[slot]
+                present = log.players[i, slot] >= 0
+                change = int(result.changes[0, i, 0 if side == "winner" else 1]) if present else None
+                match_row[change_attr] = change
+                match_row[player_attr.replace("_id", "_starting_elo")] = int(result.starting_elos[0, i, slot]) if present else None
+                if present:
+                    participant_rows.append({"match_id": match_id, "side": side, "slot": side_slot, "elo_change": change})
+            match_rows.append(match_row)
+
+        # ORM bulk UPDATE by primary key, sent as executemany
+        db.execute(update(base.Match), match_rows)
+        db.execute(update(base.MatchParticipant), participant_rows)
+        HeadToHeadService.rebuild(db)
+        # Commits the match updates together with the regenerated ledger and head_to_head
+        RatingService.rebuild(db)
+        return len(changed)
+
+    @staticmethod
+    def what_if_inputs(db: Session, season_id: int = -999) -> Tuple[MatchLog, List[Dict[str, Any]], int]:
+        """Match log, active players with their actual elo, and the ledger season id for a what-if run.
+
+        season_id follows the /players convention (-999 lifetime, -998 current).
+        """
+        log = ReplayService.load_match_log(db)
+        players = PlayerService.get_players(db, season_id)
+        season = PlayerService.get_current_season(season_id, db)
+        return log, players, season.id if season else base.LIFETIME_SEASON_ID
+
+    @staticmethod
+    def leaderboards(
+        log: MatchLog,
+        ratings: np.ndarray,
+        matches_played: np.ndarray,
+        scenarios: List[Dict[str, Any]],
+        players: List[Dict[str, Any]],
+        ledger_season_id: int,
+        limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """Top players under each scenario next to the elo they actually have.
+
+        ratings and matches_played are what app.replay.replay_scenarios returns.
+        """
+        player_positions = {int(player_id): position for position, player_id in enumerate(log.player_ids)}
+        season_positions = {int(season_id): position for position, season_id in enumerate(log.season_ids)}
+        season_position = season_positions.get(ledger_season_id)
+
+        leaderboards = []
+        for scenario_position, scenario in enumerate(scenarios):
+            leaderboard = []
+            for player in players:
+                player_position = player_positions.get(player["id"])
+                if player_position is None or season_position is None:
+                    elo = scenario.get("initial_elo", Scenario.initial_elo)
+                    player_matches = 0
+                else:
+                    elo = float(ratings[scenario_position, player_position, season_position])
+                    player_matches = int(matches_played[player_position, season_position])
+                leaderboard.append({
+                    "player_id": player["id"],
+                    "player_name": player["player_name"],
+                    "elo": elo,
+                    "actual_elo": player["elo"],
+                    "matches_played": player_matches
+                })
+            leaderboard.sort(key=lambda x: (-x["elo"], x["player_name"]))
+            leaderboards.append({"scenario": scenario, "leaderboard": leaderboard[:limit]})
+        return leaderboards
@@ -0,0 +1,149 @@
+from sqlalchemy.orm import Session
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import time
+from .. import base
+
+# How long a loaded index is trusted before game_seasons is read again. Seasons
+# only change through numbered migrations, after which init_db invalidates the index.
+SEASON_INDEX_TTL_SECONDS = 300
+
+def as_utc(dt: datetime) -> datetime:
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+@dataclass(frozen=True)
+class Season:
+    """Detached copy of a game_seasons row, safe to share between sessions."""
+    id: int
+    start_date: datetime
+    end_date: datetime
+    season_name: str
+
+class SeasonIndex:
+    """Sorted interval index over game_seasons.
+
+    Season boundaries split the timeline into segments; for each segment the
+    containing seasons (innermost first) and the seasons its matches count
+    towards are precomputed, so a timestamp is resolved with one bisect.
+    A match counts towards the lifetime rating and each season containing it,
+    except a season whose nested special season also contains it.
+    """
+
+    def __init__(self, seasons: List[Season]):
+        self.seasons = sorted(seasons, key=lambda s: (s.start_date, s.id))
+        self._by_id = {season.id: season for season in self.seasons}
+
+        # (date, 0) = season starts at date, (date, 1) = season ends after date
+        self._boundaries = sorted(
+            {(s.start_date, 0) for s in self.seasons} | {(s.end_date, 1) for s in self.seasons}
+        )
+        self._segments: List[Tuple[List[Season], List[int]]] = [([], [base.LIFETIME_SEASON_ID])]
+        for boundary in self._boundaries:
+            containing = sorted(
+                (s for s in self.seasons if (s.start_date, 0) <= boundary < (s.end_date, 1)),
+                key=lambda s: s.start_date,
+                reverse=True
+            )
+            season_ids = [base.LIFETIME_SEASON_ID]
+            for season in containing:
+                in_special_season = any(
+                    other.id != season.id
+                    and other.start_date >= season.start_date
+                    and other.end_date <= season.end_date
+                    for other in containing
+                )
+                if not in_special_season:
+                    season_ids.append(season.id)
+            self._segments.append((containing, season_ids))
+
+        self._special_seasons: Dict[int, List[Season]] = {
+            season.id: [
+                other for other in self.seasons
+                if other.id != season.id
+                and other.start_date >= season.start_date
+                and other.end_date <= season.end_date
+            ]
+            for season in self.seasons
+        }
+
+        self._current_segment: Optional[int] = None
+
+    @classmethod
+    def load(cls, db: Session) -> "SeasonIndex":
+        return cls([
+            Season(
+                id=row.id,
+                start_date=as_utc(row.start_date),
+                end_date=as_utc(row.end_date),
+                season_name=row.season_name
+            )
+            for row in db.query(base.GameSeason).all()
+        ])
+
+    def _segment(self, timestamp: datetime) -> int:
+        return bisect_right(self._boundaries, (as_utc(timestamp), 0))
+
+    def get(self, season_id: int) -> Optional[Season]:
+        return self._by_id.get(season_id)
+
+    def containing(self, timestamp: datetime) -> List[Season]:
+        """Seasons containing timestamp, innermost first."""
+        return self._segments[self._segment(timestamp)][0]
+
+    def season_ids_for(self, timestamp: datetime) -> List[int]:
+        """player_ratings season ids (lifetime included) a match at timestamp counts towards."""
+        return self._segments[self._segment(timestamp)][1]
+
+    def special_seasons(self, season: Season) -> List[Season]:
+        """Seasons nested inside season, whose matches don't count towards it."""
+        return self._special_seasons.get(season.id, [])
+
+    def current_season(self, now: Optional[datetime] = None) -> Optional[Season]:
+        """Innermost season containing now.
+
+        The segment is remembered and only looked up again once the clock
+        crosses the next season boundary.
+        """
+        now_key = (as_utc(now or datetime.now(timezone.utc)), 0)
+        segment = self._current_segment
+        if segment is None or not self._in_segment(now_key, segment):
+            segment = self._current_segment = bisect_right(self._boundaries, now_key)
+        containing = self._segments[segment][0]
+        return containing[0] if containing else None
+
+    def fingerprint(self) -> str:
+        """Digest of every season's id and dates, which decide the seasons a match counts towards."""
+        rows = "\n".join(f"{s.id},{s.start_date.isoformat()},{s.end_date.isoformat()}" for s in self.seasons)
+        return hashlib.sha256(rows.encode()).hexdigest()
+
+    def _in_segment(self, key: Tuple[datetime, int], segment: int) -> bool:
+        after_start = segment == 0 or self._boundaries[segment - 1] <= key
+        before_end = segment == len(self._boundaries) or key < self._boundaries[segment]
+        return after_start and before_end
+
+_index: Optional[SeasonIndex] = None
+_index_loaded_at = 0.0
+
+def get_season_index(db: Session) -> SeasonIndex:
+    """Return the cached season index, loading it with db when missing or stale.
+
+    No lock is held while loading: db may be an async session driven through
+    run_sync, which yields to the event loop mid-query. Concurrent reloads
+    just build identical indexes.
+    """
+    global _index, _index_loaded_at
+    index = _index
+    if index is None or time.monotonic() - _index_loaded_at >= SEASON_INDEX_TTL_SECONDS:
+        index = SeasonIndex.load(db)
+        _index, _index_loaded_at = index, time.monotonic()
+    return index
+
+def invalidate_season_index() -> None:
+    """Drop the cached index; call after game_seasons is modified."""
+    global _index
+    _index = None
@@ -1,20 +1,14 @@
+import threading
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from typing import Dict, Optional, Tuple
+from .. import base
+
+DEFAULT_TABLE_ID = 1
+# Snapshot the projected state every this many actions deep into a frame,
+# so rebuilding a frame never replays more than this many actions
+SNAPSHOT_INTERVAL = 20
 
-# Simple in-memory state; replace with DB if needed
-_state = {
-    'top': 0,
-    'bottom': 0,
-    'colours_enabled': {
-        'yellow': False,
-        'green': False,
-        'brown': False,
-        'blue': False,
-        'pink': False,
-        'black': False
-    },
-    'red_enabled': True,
-    'red_count': 15,
-}
 # Map colour names to their snooker point values
 colour_values = {
     'yellow': 2,
@@ -25,85 +19,247 @@ colour_values = {
     'black': 7
 }
 
+# Live projection per table: (frame_id, seq, depth, state). The state at a given
+# frame seq never changes, so a cached entry is valid while the frame's head_seq matches.
+_projections: Dict[int, Tuple[int, int, int, dict]] = {}
+# Serialises writers per table within this process; the frame row lock does it across workers
+_table_locks: Dict[int, threading.Lock] = {}
+_table_locks_guard = threading.Lock()
+
+def initial_state() -> dict:
+    return {
+        'top': 0,
+        'bottom': 0,
+        'colours_enabled': {colour: False for colour in colour_values},
+        'red_enabled': True,
+        'red_count': 15,
+    }
+
+def copy_state(state: dict) -> dict:
+    return {**state, 'colours_enabled': dict(state['colours_enabled'])}
+
+def project(state: dict, action: dict) -> None:
+    """Apply one scoring action to a frame state in place."""
+    action_type = action.get('type')
+    slot = action.get('slot')
+    colour = action.get('colour')
+
+    if action_type == 'red':
+        if state['red_count'] <= 0:
+            state['red_enabled'] = False
+            return
+        if slot in ('top', 'bottom') and state['red_count'] > 0:
+            state[slot] += 1
+            state['colours_enabled'] = {k: True for k in state['colours_enabled']}
+            state['red_count'] -= 1
+        return
+
+    if action_type == 'colour':
+        value = colour_values.get(colour)
+        if state['colours_enabled'].get(colour, False) and slot in ('top', 'bottom') and isinstance(value, int):
+            state[slot] += value
+            if state['red_enabled']:
+                state['colours_enabled'] = {k: False for k in state['colours_enabled']}
+                if state['red_count'] <= 0:
+                    state['red_enabled'] = False
+                    state['colours_enabled'] = {k: True for k in state['colours_enabled']}
+            else: #no reds, only allow unsunk balls
+                state['colours_enabled'][colour] = False
+        return
+
+    if action_type == 'miss':
+        state['colours_enabled'] = {k: False for k in state['colours_enabled']}
+        return
+
+    if action_type == 'foul':
+        if slot in ('top', 'bottom'):
+            state[slot] -= 4
+        state['colours_enabled'] = {k: False for k in state['colours_enabled']}
+        return
+
+    if action_type == 'foul_red':
+        if slot in ('top', 'bottom') and state['red_count'] > 0:
+            state[slot] -= 4
+            state['red_count'] -= 1
+        state['colours_enabled'] = {k: False for k in state['colours_enabled']}
+        if state['red_count'] <= 0:
+            state['red_enabled'] = False
+            state['colours_enabled'] = {k: True for k in state['colours_enabled']}
+        return
+
+    if action_type == 'foul_colour':
+        value = colour_values.get(colour)
+        if slot in ('top', 'bottom') and isinstance(value, int):
+            state[slot] -= value
+            if state['red_enabled']:
+                state['colours_enabled'] = {k: False for k in state['colours_enabled']}
+            else: #no reds, only allow unsunk balls
+                state['colours_enabled'][colour] = False
+
 class SnookerService:
     @staticmethod
-    def get_state(db: Session) -> dict:
-        return dict(_state)
+    def get_state(db: Session, table_id: int = DEFAULT_TABLE_ID) -> dict:
+        frame = SnookerService._live_frame(db, table_id)
+        if not frame:
+            return SnookerService._response(table_id, None, 0, initial_state())
+        _, seq, depth, state = SnookerService._projection(db, frame)
+        return SnookerService._response(table_id, frame.id, depth, state)
 
     @staticmethod
-    def apply_action(db: Session, action: dict) -> dict:
-        action_type = action.get('type')
-        slot = action.get('slot')
-        colour = action.get('colour')
-
-        if action_type == 'reset':
-            _state['top'] = 0
-            _state['bottom'] = 0
-            _state['red_count'] = 15
-            _state['colours_enabled'] = {
-                'yellow': False,
-                'green': False,
-                'brown': False,
-                'blue': False,
-                'pink': False,
-                'black': False
-            }
-            _state['red_enabled'] = True
-            return dict(_state)
-
-        if action_type == 'red':
-            if _state['red_count'] <= 0:
-                _state['red_enabled'] = False
-                return dict(_state)
-            if slot in ('top', 'bottom') and _state['red_count'] > 0:
-                _state[slot] += 1
-                _state['colours_enabled'] = {k: True for k in _state['colours_enabled']}
-                _state['red_count'] -= 1
-            return dict(_state)
-
-        if action_type == 'colour':
-            value = colour_values.get(colour)
-            if _state['colours_enabled'].get(colour, False) and slot in ('top', 'bottom') and isinstance(value, int):
-                _state[slot] += value
-                if _state['red_enabled']:
-                    _state['colours_enabled'] = {k: False for k in _state['colours_enabled']}
-                    if _state['red_count'] <= 0:
-                        _state['red_enabled'] = False
-                        _state['colours_enabled'] = {k: True for k in _state['colours_enabled']}
-                else: #no reds, only allow unsunk balls
-                    _state['colours_enabled'][colour] = False
-            return dict(_state)
-
-        if action_type == 'miss':
-            _state['colours_enabled'] = {k: False for k in _state['colours_enabled']}
-            return dict(_state)
-
-        if action_type == 'foul':
-            if slot in ('top', 'bottom'):
-                _state[slot] -= 4
-            _state['colours_enabled'] = {k: False for k in _state['colours_enabled']}
-            return dict(_state)
-
-        if action_type == 'foul_red':
-            if slot in ('top', 'bottom') and _state['red_count'] > 0:
-                _state[slot] -= 4
-                _state['red_count'] -= 1
-            _state['colours_enabled'] = {k: False for k in _state['colours_enabled']}
-            if _state['red_count'] <= 0:
-                _state['red_enabled'] = False
-                _state['colours_enabled'] = {k: True for k in _state['colours_enabled']}
-            return dict(_state)
-
-        if action_type == 'foul_colour':
-            value = colour_values.get(colour)
-            if slot in ('top', 'bottom') and isinstance(value, int):
-                _state[slot] -= value
-                if _state['red_enabled']:
-                    _state['colours_enabled'] = {k: False for k in _state['colours_enabled']}
-                else: #no reds, only allow unsunk balls
-                    _state['colours_enabled'][colour] = False
-            return dict(_state)
-
-        return dict(_state)
+    def apply_action(db: Session, action: dict, table_id: int = DEFAULT_TABLE_ID) -> dict:
+        """Record an action against the table's live frame and return the new state.
+
+        'reset' starts a new frame, 'undo' steps the frame back one action. Writers
+        to the same table are serialised, so concurrent scorers can't interleave.
+        """
+        with SnookerService._table_lock(table_id):
+            action_type = action.get('type')
+            if action_type == 'reset':
+                frame = SnookerService._open_frame(db, table_id, SnookerService._live_frame(db, table_id, for_update=True))
+                if not frame:
+                    # Another worker reset the table at the same moment; its fresh frame will do
+                    frame = SnookerService._live_frame(db, table_id)
+                    _, seq, depth, state = SnookerService._projection(db, frame)
+                    return SnookerService._response(table_id, frame.id, depth, state)
+                db.commit()
+                state = initial_state()
+                _projections[table_id] = (frame.id, 0, 0, state)
+                return SnookerService._response(table_id, frame.id, 0, state)
+
+            frame = SnookerService._live_frame(db, table_id, for_update=True)
+            if not frame:
+                # There is no row to lock yet, so the unique index settles a race for the first frame
+                frame = SnookerService._open_frame(db, table_id, None) or SnookerService._live_frame(db, table_id, for_update=True)
+            _, seq, depth, state = SnookerService._projection(db, frame)
+
+            if action_type == 'undo':
+                if seq == 0:
+                    db.rollback()
+                    return SnookerService._response(table_id, frame.id, depth, state)
+                head = db.get(base.SnookerAction, (frame.id, seq))
+                frame.head_seq = head.parent_seq
+                db.commit()
+                _, seq, depth, state = SnookerService._projection(db, frame)
+                return SnookerService._response(table_id, frame.id, depth, state)
+
+            new_state = copy_state(state)
+            project(new_state, action)
+            if new_state == state:
+                # Nothing scored, so there is nothing to log or undo
+                db.rollback()
+                return SnookerService._response(table_id, frame.id, depth, state)
 
+            new_seq = frame.last_seq + 1
+            new_depth = depth + 1
+            db.add(base.SnookerAction(
+                frame_id=frame.id,
+                seq=new_seq,
+                parent_seq=seq,
+                depth=new_depth,
+                action={k: v for k, v in action.items() if v is not None}
+            ))
+            if new_depth % SNAPSHOT_INTERVAL == 0:
+                db.add(base.SnookerSnapshot(frame_id=frame.id, seq=new_seq, state=new_state))
+            frame.head_seq = new_seq
+            frame.last_seq = new_seq
+            db.commit()
 
+            _projections[table_id] = (frame.id, new_seq, new_depth, new_state)
+            return SnookerService._response(table_id, frame.id, new_depth, new_state)
+
+    @staticmethod
+    def _live_frame(db: Session, table_id: int, for_update: bool = False) -> Optional[base.SnookerFrame]:
+        query = db.query(base.SnookerFrame).filter(
+            base.SnookerFrame.table_id == table_id
+        ).order_by(base.SnookerFrame.id.desc())
+        if for_update:
+            query = query.with_for_update()
+        return query.first()
+
+    @staticmethod
+    def _open_frame(db: Session, table_id: int, previous: Optional[base.SnookerFrame]) -> Optional[base.SnookerFrame]:
+        """Add a fresh frame after previous (None for the table's first), or None if another worker just did."""
+        frame = base.SnookerFrame(
+            table_id=table_id,
+            previous_frame_id=previous.id if previous else 0,
+            head_seq=0,
+            last_seq=0
+        )
+        db.add(frame)
+        try:
+            db.flush()
+        except IntegrityError:
+            db.rollback()
+            return None
+        return frame
+
+    @staticmethod
+    def _table_lock(table_id: int) -> threading.Lock:
+        with _table_locks_guard:
+            return _table_locks.setdefault(table_id, threading.Lock())
+
+    @staticmethod
+    def _projection(db: Session, frame: base.SnookerFrame) -> Tuple[int, int, int, dict]:
+        cached = _projections.get(frame.table_id)
+        if cached and cached[0] == frame.id and cached[1] == frame.head_seq:
+            return cached
+        projection = SnookerService._rebuild(db, frame.id, frame.head_seq)
+        _projections[frame.table_id] = projection
+        return projection
+
+    @staticmethod
+    def _rebuild(db: Session, frame_id: int, head_seq: int) -> Tuple[int, int, int, dict]:
+        """Replay the frame's action chain ending at head_seq from its nearest snapshot.
+
+        Only actions after the newest snapshot below the head are loaded. If undo
+        left that snapshot on an abandoned branch, the chain walks past it and the
+        next window back, down to the snapshot before, is loaded.
+        """
+        if head_seq == 0:
+            return (frame_id, 0, 0, initial_state())
+
+        snapshot_seqs = [
+            seq for seq, in db.query(base.SnookerSnapshot.seq).filter(
+                base.SnookerSnapshot.frame_id == frame_id,
+                base.SnookerSnapshot.seq <= head_seq
+            ).order_by(base.SnookerSnapshot.seq.desc())
+        ]
+        actions = {}
+        chain = []
+        seq = head_seq
+        while True:
+            if seq not in actions:
+                window_start = next((snapshot_seq for snapshot_seq in snapshot_seqs if snapshot_seq < seq), 0)
+                actions.update({
+                    row.seq: row for row in db.query(
+                        base.SnookerAction.seq,
+                        base.SnookerAction.parent_seq,
+                        base.SnookerAction.depth,
+                        base.SnookerAction.action
+                    ).filter(
+                        base.SnookerAction.frame_id == frame_id,
+                        base.SnookerAction.seq > window_start,
+                        base.SnookerAction.seq <= seq
+                    )
+                })
+            chain.append(seq)
+            seq = actions[seq].parent_seq
+            if seq == 0 or seq in snapshot_seqs:
+                break
+
+        if seq:
+            state = copy_state(db.get(base.SnookerSnapshot, (frame_id, seq)).state)
+        else:
+            state = initial_state()
+        for seq in reversed(chain):
+            project(state, actions[seq].action)
+        return (frame_id, head_seq, actions[head_seq].depth, state)
+
+    @staticmethod
+    def _response(table_id: int, frame_id: Optional[int], depth: int, state: dict) -> dict:
+        return {
+            **copy_state(state),
+            'table_id': table_id,
+            'frame_id': frame_id,
+            'can_undo': depth > 0
+        }
@@ -1,180 +1,224 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, or_, and_, cast, Date
-from typing import List, Dict, Any
+from sqlalchemy import func, and_, cast, case, Numeric
+from typing import List, Dict, Any, Optional
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
 from .. import base
+from ..schemas import LongestStreak, PlayerKD, PlayerStreak
 from .player_service import PlayerService
+from .rating_service import RatingService
+from .season_index import get_season_index
+from .head_to_head_service import HeadToHeadService
+from .daily_match_service import DailyMatchService
 
 class StatsService:
     @staticmethod
-    def get_player_streaks(db: Session) -> List[Dict[str, Any]]:
-        players = db.query(base.Player).filter(base.Player.deleted == False).all()
-        
+    def compute_streaks(db: Session) -> Dict[int, Dict[str, Any]]:
+        """Walk match_participants once, oldest first, tracking every player's streaks.
+
+        Returns per player the current streak (type, length, elo change), the
+        longest win and loss streaks, using the player's own elo change, and
+        lifetime wins and matches for get_player_kds.
+        """
+        participants = db.query(
+            base.MatchParticipant.player_id,
+            base.MatchParticipant.side,
+            base.MatchParticipant.elo_change
+        ).order_by(
+            base.MatchParticipant.timestamp.asc(),
+            base.MatchParticipant.match_id.asc()
+        )
+
+        streaks = {}
+        for player_id, side, elo_change in participants:
+            result = "win" if side == "winner" else "loss"
+            streak = streaks.setdefault(player_id, {
+                "current_type": None,
+                "current_streak": 0,
+                "current_elo_change": 0,
+                "win": (0, 0),
+                "loss": (0, 0),
+                "wins": 0,
+                "matches": 0,
+            })
+            streak["matches"] += 1
+            if result == "win":
+                streak["wins"] += 1
+            if streak["current_type"] == result:
+                streak["current_streak"] += 1
+                streak["current_elo_change"] += elo_change or 0
+            else:
+                StatsService._close_streak(streak)
+                streak["current_type"] = result
+                streak["current_streak"] = 1
+                streak["current_elo_change"] = elo_change or 0
+
+        for streak in streaks.values():
+            StatsService._close_streak(streak)
+        return streaks
+
+    @staticmethod
+    def _close_streak(streak: Dict[str, Any]) -> None:
+        # Keep the earliest streak when two are equally long
+        streak_type = streak["current_type"]
+        if streak_type and streak["current_streak"] > streak[streak_type][0]:
+            streak[streak_type] = (streak["current_streak"], streak["current_elo_change"])
+
+    @staticmethod
+    def get_player_streaks(db: Session, streaks: Optional[Dict[int, Dict[str, Any]]] = None) -> List[PlayerStreak]:
+        if streaks is None:
+            streaks = StatsService.compute_streaks(db)
+        on_streak = {
+            player_id: streak for player_id, streak in streaks.items()
+            if streak["current_type"] == "win" and streak["current_streak"] > 1
+        }
+        if not on_streak:
+            return []
+
+        players = db.query(
+            base.Player.id,
+            base.Player.player_name,
+            func.coalesce(base.PlayerRating.elo, base.DEFAULT_ELO).label('elo')
+        ).outerjoin(
+            base.PlayerRating,
+            and_(
+                base.PlayerRating.player_id == base.Player.id,
+                base.PlayerRating.season_id == base.LIFETIME_SEASON_ID
+            )
+        ).filter(
+            base.Player.deleted == False,
+            base.Player.id.in_(on_streak.keys())
+        ).all()
+
         player_streaks = []
         for player in players:
-            matches = db.query(base.Match).filter(
-                (base.Match.winner1_id == player.id) | 
-                (base.Match.winner2_id == player.id) |
-                (base.Match.loser1_id == player.id) |
-                (base.Match.loser2_id == player.id)
-            ).order_by(base.Match.timestamp.desc()).all()
-            
-            current_streak = 0
-            streak_elo_change = 0
-            for match in matches:
-                if match.winner1_id == player.id or match.winner2_id == player.id:
-                    current_streak += 1
-                    streak_elo_change += match.winner1_elo_change
-                else:
-                    break
-            
-            if current_streak > 1:
-                player_elo, _ = PlayerService.calculate_player_season_data(player, None, db)
-                player_streaks.append({
-                    "player_id": player.id,
-                    "player_name": player.player_name,
-                    "current_streak": current_streak,
-                    "elo": player_elo,
-                    "elo_change": streak_elo_change
-                })
-        
+            streak = on_streak[player.id]
+            player_streaks.append({
+                "player_id": player.id,
+                "player_name": player.player_name,
+                "current_streak": streak["current_streak"],
+                "elo": player.elo,
+                "elo_change": streak["current_elo_change"]
+            })
+
         player_streaks.sort(key=lambda x: (-x["current_streak"], -x["elo_change"]))
         return player_streaks[:5]
 
     @staticmethod
-    def get_longest_streaks(db: Session) -> List[Dict[str, Any]]:
-        players = db.query(base.Player).filter(base.Player.deleted == False).all()
-        
+    def get_longest_streaks(db: Session, streaks: Optional[Dict[int, Dict[str, Any]]] = None) -> List[LongestStreak]:
+        if streaks is None:
+            streaks = StatsService.compute_streaks(db)
+        players = db.query(base.Player.id, base.Player.player_name).filter(
+            base.Player.deleted == False
+        ).order_by(base.Player.id.asc()).all()
+
         players_longest_streaks = []
         for player in players:
-            matches = db.query(base.Match).filter(
-                (base.Match.winner1_id == player.id) | 
-                (base.Match.winner2_id == player.id) |
-                (base.Match.loser1_id == player.id) |
-                (base.Match.loser2_id == player.id)
-            ).order_by(base.Match.timestamp.asc()).all()
-            
-            # Winning streak
-            current_streak = 0
-            streak_elo_change = 0
-            longest_streak = 0
-            longest_streak_elo_change = 0
-            
-            for match in matches:
-                if match.winner1_id == player.id or match.winner2_id == player.id:
-                    current_streak += 1
-                    streak_elo_change += match.winner1_elo_change
-                else:
-                    if current_streak > longest_streak:
-                        longest_streak = current_streak
-                        longest_streak_elo_change = streak_elo_change
-                    current_streak = 0
-                    streak_elo_change = 0
+            streak = streaks.get(player.id)
+            if not streak:
+                continue
+            for streak_type in ("win", "loss"):
+                longest_streak, longest_streak_elo_change = streak[streak_type]
+                if longest_streak > 0:
+                    players_longest_streaks.append({
+                        "player_id": player.id,
+                        "player_name": player.player_name,
+                        "longest_streak": longest_streak,
+                        "longest_streak_elo_change": longest_streak_elo_change,
+                        "streak_type": streak_type
+                    })
 
-            if current_streak > longest_streak:
-                longest_streak = current_streak
-                longest_streak_elo_change = streak_elo_change
-            
+        #players_longest_streaks.sort(key=lambda x: (-x["longest_streak"], -x["longest_streak_elo_change"])) # do sorting and filtering in frontend
+        return players_longest_streaks
 
-            if longest_streak > 0:
-                players_longest_streaks.append({
-                    "player_id": player.id,
-                    "player_name": player.player_name,
-                    "longest_streak": longest_streak,
-                    "longest_streak_elo_change": longest_streak_elo_change,
-                    "streak_type": "win"
-                })
-            
-            # losing streaks
-            current_streak = 0
-            streak_elo_change = 0
-            longest_streak = 0
-            longest_streak_elo_change = 0
-            
-            for match in matches:
-                if match.loser1_id == player.id or match.loser2_id == player.id:
-                    current_streak += 1
-                    streak_elo_change += match.loser1_elo_change
-                else:
-                    if current_streak > longest_streak:
-                        longest_streak = current_streak
-                        longest_streak_elo_change = streak_elo_change
-                    current_streak = 0
-                    streak_elo_change = 0
+    @staticmethod
+    def get_player_kds(
+        db: Session,
+        season_id: int = -999,
+        limit: int = 20,
+        streaks: Optional[Dict[int, Dict[str, Any]]] = None
+    ) -> List[PlayerKD]:
+        """Players by K/D, then wins, then fewest losses.
 
-            if current_streak > longest_streak:
-                longest_streak = current_streak
-                longest_streak_elo_change = streak_elo_change
+        Lifetime K/Ds are taken from streaks when the caller already walked
+        match_participants for them, rather than grouping it again.
+        """
+        if streaks is not None and season_id == -999:
+            return StatsService._player_kds_from_streaks(db, streaks, limit)
+        current_season = PlayerService.get_current_season(season_id, db)
+        season_filter = [RatingService.season_match_filter(db, current_season, base.MatchParticipant.timestamp)] if current_season else []
 
-            if longest_streak > 0:
-                players_longest_streaks.append({
-                    "player_id": player.id,
-                    "player_name": player.player_name,
-                    "longest_streak": longest_streak,
-                    "longest_streak_elo_change": longest_streak_elo_change,
-                    "streak_type": "loss"
-                })
-        
-        #players_longest_streaks.sort(key=lambda x: (-x["longest_streak"], -x["longest_streak_elo_change"])) # do sorting and filtering in frontend
-        return players_longest_streaks
+        results = db.query(
+            base.MatchParticipant.player_id,
+            func.sum(case((base.MatchParticipant.side == 'winner', 1), else_=0)).label('wins'),
+            func.count().label('matches')
+        ).filter(
+            *season_filter
+        ).group_by(base.MatchParticipant.player_id).subquery()
+
+        wins = func.coalesce(results.c.wins, 0)
+        losses = func.coalesce(results.c.matches - results.c.wins, 0)
+        kd = case(
+            (losses > 0, func.round(cast(wins, Numeric) / losses, 2)),
+            else_=1
+        )
+
+        player_kds = db.query(
+            base.Player.id,
+            base.Player.player_name,
+            wins.label('wins'),
+            losses.label('losses'),
+            kd.label('kd')
+        ).outerjoin(
+            results,
+            results.c.player_id == base.Player.id
+        ).filter(
+            base.Player.deleted == False
+        ).order_by(
+            kd.desc(),
+            wins.desc(),
+            losses.asc()
+        ).limit(limit).all()
+
+        return [
+            {
+                "player_id": row.id,
+                "player_name": row.player_name,
+                "wins": row.wins,
+                "losses": row.losses,
+                "kd": float(row.kd)
+            }
+            for row in player_kds
+        ]
 
     @staticmethod
-    def get_player_kds(db: Session) -> List[Dict[str, Any]]:
-        players = db.query(base.Player).filter(base.Player.deleted == False).all()
-        
+    def _player_kds_from_streaks(db: Session, streaks: Dict[int, Dict[str, Any]], limit: int) -> List[PlayerKD]:
         player_kds = []
-        for player in players:
-            wins = db.query(base.Match).filter(
-                (base.Match.winner1_id == player.id) | 
-                (base.Match.winner2_id == player.id)
-            ).all()
-            losses = db.query(base.Match).filter(
-                (base.Match.loser1_id == player.id) | 
-                (base.Match.loser2_id == player.id)
-            ).all()
-
-            kdratio = round(len(wins) / len(losses) if len(losses) > 0 else 1, 2)
-            
+        for player_id, player_name in db.query(base.Player.id, base.Player.player_name).filter(base.Player.deleted == False):
+            streak = streaks.get(player_id)
+            wins = streak["wins"] if streak else 0
+            losses = streak["matches"] - wins if streak else 0
+            # Rounded half away from zero, as the SQL round() above does
+            kd = float((Decimal(wins) / losses).quantize(Decimal("0.01"), ROUND_HALF_UP)) if losses > 0 else 1.0
             player_kds.append({
-                "player_id": player.id,
-                "player_name": player.player_name,
-                "wins": len(wins),
-                "losses": len(losses),
-                "kd": kdratio
+                "player_id": player_id,
+                "player_name": player_name,
+                "wins": wins,
+                "losses": losses,
+                "kd": kd
             })
-        
-        player_kds.sort(key=lambda x: (-x["kd"], -x["wins"], +x["losses"]))
-        return player_kds[:20]
+        player_kds.sort(key=lambda x: (-x["kd"], -x["wins"], x["losses"]))
+        return player_kds[:limit]
 
     @staticmethod
-    def get_most_matches_in_day(db: Session) -> Dict[str, Any]:
-        player_appearances = db.query(
-            base.Player.id,
-            base.Player.player_name,
-            cast(base.Match.timestamp, Date).label('match_date'),
-            func.count(base.Match.id).label('matches_played')
-        ).join(
-            base.Match,
-            or_(
-                base.Match.winner1_id == base.Player.id,
-                base.Match.winner2_id == base.Player.id,
-                base.Match.loser1_id == base.Player.id,
-                base.Match.loser2_id == base.Player.id
-            )
-        ).group_by(
-            base.Player.id,
-            base.Player.player_name,
-            cast(base.Match.timestamp, Date)
-        ).subquery()
-
-        max_matches = db.query(
-            player_appearances.c.id,
-            player_appearances.c.player_name,
-            player_appearances.c.match_date,
-            player_appearances.c.matches_played
-        ).order_by(
-            player_appearances.c.matches_played.desc(),
-            player_appearances.c.player_name.asc()
-        ).first()
+    def get_most_matches_in_day(
+        db: Session,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        season_id: int = -999
+    ) -> Dict[str, Any]:
+        # Per-day counts are maintained in daily_match_counts as matches are recorded/undone
+        max_matches = DailyMatchService.get_busiest_player_day(db, start, end, season_id)
 
         if not max_matches:
             return {
@@ -188,164 +232,63 @@ class StatsService:
             "player_id": max_matches.id,
             "player_name": max_matches.player_name,
             "date": max_matches.match_date.isoformat(),
-            "matches_played": max_matches.matches_played
+            "matches_played": max_matches.match_count
         }
     
     @staticmethod
-    def get_total_matches(db: Session) -> Dict[str, Any]:
+    def get_total_matches(db: Session, season_id: int = -999) -> Dict[str, Any]:
         price_per_match = 3
         time_per_game = 15
 
-        total_matches = db.query(
-            func.count(base.Match.id).label('match_count')
-        ).first()
+        # Match and appearance counters are maintained in season_match_counts as matches are recorded/undone
+        counts = RatingService.get_match_counts(db)
 
-        w1_matches = db.query(
-            func.count(base.Match.winner1_id).label('match_count')
-        ).filter((base.Match.winner1_id != None )).first()
-        w2_matches = db.query(
-            func.count(base.Match.winner2_id).label('match_count')
-        ).filter((base.Match.winner2_id != None )).first()
-        l1_matches = db.query(
-            func.count(base.Match.loser1_id).label('match_count')
-        ).filter((base.Match.loser1_id != None )).first()
-        l2_matches = db.query(
-            func.count(base.Match.loser2_id).label('match_count')
-        ).filter((base.Match.loser2_id != None )).first()
+        def totals(match_count: int, appearance_count: int) -> Dict[str, Any]:
+            return {
+                "total_matches": match_count,
+                "money_saved": (match_count * price_per_match),
+                "time_wasted": (match_count * time_per_game),
+                "per_person_time_wasted": (appearance_count * time_per_game)
+            }
 
+        # -999 is lifetime; an unknown season, or no current season, counts nothing
+        current_season = PlayerService.get_current_season(season_id, db)
+        counts_id = current_season.id if current_season else (base.LIFETIME_SEASON_ID if season_id == -999 else None)
         return {
-            "total_matches": total_matches.match_count,
-            "money_saved": (total_matches.match_count * price_per_match),
-            "time_wasted": (total_matches.match_count * time_per_game),
-            "per_person_time_wasted": ((w1_matches.match_count + w2_matches.match_count + l1_matches.match_count + l2_matches.match_count) * time_per_game)
+            **totals(*counts.get(counts_id, (0, 0))),
+            "seasons": [
+                {
+                    "season_id": season.id,
+                    "season_name": season.season_name,
+                    **totals(*counts.get(season.id, (0, 0)))
+                }
+                for season in get_season_index(db).seasons
+            ]
         }
     
     @staticmethod
-    def get_matches_per_day(db: Session, player_id = None) -> list[dict]:
-        if player_id:
-            # get match results for this player only
-            results = db.query(
-                cast(base.Match.timestamp, Date).label('date'),
-                func.count(base.Match.id).label('count')
-            ).filter(
-                (base.Match.winner1_id == player_id) |
-                (base.Match.winner2_id == player_id) |
-                (base.Match.loser1_id == player_id) |
-                (base.Match.loser2_id == player_id)
-            ).group_by(cast(base.Match.timestamp, Date))\
-            .order_by(cast(base.Match.timestamp, Date).asc())
-        else:
-            results = db.query(
-                cast(base.Match.timestamp, Date).label('date'),
-                func.count(base.Match.id).label('count')
-            ).group_by(cast(base.Match.timestamp, Date))\
-            .order_by(cast(base.Match.timestamp, Date).asc())
-        
+    def get_matches_per_day(
+        db: Session,
+        player_id = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        season_id: int = -999
+    ) -> list[dict]:
+        results = DailyMatchService.get_matches_per_day(db, player_id, start, end, season_id)
+
         # Format results as list of dicts with date as dd/mm/yy
         matches_per_day = []
         for row in results:
-            date_str = row.date.strftime('%d/%m/%y')
+            date_str = row.match_date.strftime('%d/%m/%y')
             matches_per_day.append({
                 'date': date_str,
-                'count': row.count
+                'count': row.match_count
             })
         return matches_per_day
 
     @staticmethod
     def get_head_to_head_stats(db: Session, player1_id: int, player2_id: int) -> dict:
         """Get head-to-head statistics between two players"""
-        
-        # Get all matches where both players participated
-        matches = db.query(base.Match).filter(
-            or_(
-                # Player 1 and Player 2 on opposite teams
-                and_(
-                    or_(base.Match.winner1_id == player1_id, base.Match.winner2_id == player1_id),
-                    or_(base.Match.loser1_id == player2_id, base.Match.loser2_id == player2_id)
-                ),
-                and_(
-                    or_(base.Match.winner1_id == player2_id, base.Match.winner2_id == player2_id),
-                    or_(base.Match.loser1_id == player1_id, base.Match.loser2_id == player1_id)
-                )
-            )
-        ).order_by(base.Match.timestamp.asc()).all()
-        
-        # Get player names
-        player1 = db.query(base.Player).filter(base.Player.id == player1_id).first()
-        player2 = db.query(base.Player).filter(base.Player.id == player2_id).first()
-        
-        if not player1 or not player2:
-            return {
-                "error": "One or both players not found"
-            }
-        
-        # Calculate statistics
-        player1_wins = 0
-        player2_wins = 0
-        player1_elo_gained = 0
-        player2_elo_gained = 0
-        total_matches = len(matches)
-        
-        # Track days of the week for most frequent play day
-        day_counts = {}
-        
-        for match in matches:
-            # Determine who won
-            player1_was_winner = (match.winner1_id == player1_id or match.winner2_id == player1_id)
-            player2_was_winner = (match.winner1_id == player2_id or match.winner2_id == player2_id)
-            
-            if player1_was_winner:
-                player1_wins += 1
-                # Calculate ELO gained by player1
-                if match.winner1_id == player1_id:
-                    player1_elo_gained += match.winner1_elo_change
-                else:
-                    player1_elo_gained += match.winner2_elo_change
-            elif player2_was_winner:
-                player2_wins += 1
-                # Calculate ELO gained by player2
-                if match.winner1_id == player2_id:
-                    player2_elo_gained += match.winner1_elo_change
-                else:
-                    player2_elo_gained += match.winner2_elo_change
-            
-            # Track day of week
-            day_of_week = match.timestamp.strftime('%A')
-            day_counts[day_of_week] = day_counts.get(day_of_week, 0) + 1
-        
-        # Get current elo for players
-        player1_elo, _ = PlayerService.calculate_player_season_data(player1, None, db)
-        player2_elo, _ = PlayerService.calculate_player_season_data(player2, None, db)
-
-        # Find most frequent play day
-        most_frequent_day = max(day_counts.items(), key=lambda x: x[1]) if day_counts else None
-        
-        # Calculate win percentages
-        player1_win_percentage = round((player1_wins / total_matches) * 100, 1) if total_matches > 0 else 0
-        player2_win_percentage = round((player2_wins / total_matches) * 100, 1) if total_matches > 0 else 0
-
-        return {
-            "player1": {
-                "id": player1_id,
-                "name": player1.player_name,
-                "wins": player1_wins,
-                "losses": player2_wins,
-                "win_percentage": player1_win_percentage,
-                "elo_gained": player1_elo_gained,
-                "current_elo": player1_elo
-            },
-            "player2": {
-                "id": player2_id,
-                "name": player2.player_name,
-                "wins": player2_wins,
-                "losses": player1_wins,
-                "win_percentage": player2_win_percentage,
-                "elo_gained": player2_elo_gained,
-                "current_elo": player2_elo
-            },
-            "total_matches": total_matches,
-            "most_frequent_day": most_frequent_day[0] if most_frequent_day else None,
-            "most_frequent_day_count": most_frequent_day[1] if most_frequent_day else 0,
-            "day_breakdown": day_counts
-        }
+        # Pairwise totals are maintained in head_to_head as matches are recorded/undone
+        return HeadToHeadService.get_head_to_head(db, player1_id, player2_id)
     
\ No newline at end of file
@@ -0,0 +1,77 @@
+"""Concurrent-request throughput against a running API. Needs requirements-bench.txt:
+
+    pip install -r requirements-bench.txt
+    python bench/concurrency.py --url http://localhost:4322/shedapi --password <APP_PASSWORD>
+
+Fires --requests GETs per path with --concurrency requests in flight and
+reports requests/second and latency percentiles. One slow endpoint in the
+mix shows whether it holds up the others on the same worker.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+DEFAULT_PATHS = [
+    "/players?season_id=-998",
+    "/stats/streaks",
+    "/stats/streaks/longest",
+    "/stats/player-kds",
+    "/stats/total-matches",
+    "/auditlog",
+]
+
+async def run(url, password, paths, concurrency, requests_per_path):
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        login = await client.post("/login", json={"password": password})
+        login.raise_for_status()
+        client.headers["Authorization"] = f"Bearer {login.json()['access_token']}"
+
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = {path: [] for path in paths}
+
+        async def fetch(path):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(path)
+                response.raise_for_status()
+                latencies[path].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            fetch(path) for _ in range(requests_per_path) for path in paths
+        ])
+        elapsed = time.perf_counter() - started
+
+    total = requests_per_path * len(paths)
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(total / elapsed, 1),
+        "paths": {
+            path: {
+                "p50_ms": round(statistics.median(times) * 1000, 1),
+                "p95_ms": round(sorted(times)[int(len(times) * 0.95) - 1] * 1000, 1),
+            }
+            for path, times in latencies.items()
+        },
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000/shedapi")
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=50, help="requests per path")
+    parser.add_argument("--path", action="append", dest="paths", help="path to request (repeatable)")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.url, args.password, args.paths or DEFAULT_PATHS, args.concurrency, args.requests))
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""Fill an empty database with a synthetic match history, run from the backend directory:
+
+    python -m bench.generate --scale medium
+    python -m bench.generate --matches 20000 --players 30 --seed 7
+
+Players get a hidden skill that decides who tends to win and an activity
+level that decides how often they play. Matches fall on weekdays around
+lunchtime, about a quarter are doubles, and losers pick up pantsed, away
+game and foul events. Regular seasons are added where the date range has
+none, with nested special seasons inside them. Matches go in through
+MatchImportService, so ratings, participants and every derived table come
+out as the API would build them.
+"""
+import argparse
+import json
+import logging
+import random
+import time
+from datetime import date, datetime, time as day_time, timedelta, timezone
+
+from app import base
+from app.database import SessionLocal, init_db
+from app.services import MatchImportService
+from app.services.season_index import invalidate_season_index
+
+# Matches per scale; players default to a number that suits it
+SCALES = {"small": (50, 8), "medium": (5_000, 20), "large": (500_000, 60)}
+# Matches per import call; each call replays the history imported before it
+IMPORT_CHUNK_SIZE = 50_000
+DOUBLES_SHARE = 0.25
+EVENT_RATES = {"is_pantsed": 0.05, "is_away_game": 0.03, "is_lost_by_foul": 0.04}
+# Share of players soft-deleted once their matches are in
+DELETED_SHARE = 0.05
+# (name, month, day, length in days) of the special seasons added each year
+SPECIAL_SEASONS = (
+    ("Winter Retreat Regional Championship", 7, 12, 4),
+    ("Christmas Cup", 11, 24, 3),
+)
+FIRST_NAMES = (
+    "Alex", "Sam", "Jordan", "Taylor", "Morgan", "Casey", "Riley", "Jamie", "Robin", "Charlie",
+    "Drew", "Quinn", "Avery", "Hayden", "Kai", "Rowan", "Sage", "Reese", "Emerson", "Finley",
+)
+
+def weekdays(start: date, end: date):
+    day = start
+    while day <= end:
+        if day.weekday() < 5:
+            yield day
+        day += timedelta(days=1)
+
+def seasons_for(start: date, end: date, existing):
+    """Half-year seasons over start..end where no season runs yet, plus special seasons nested inside them.
+
+    existing is (start_date, end_date) of the seasons already defined; a special
+    season is skipped if one of those starts the same day or it would cross a
+    season boundary.
+    """
+    def overlaps(season_start, season_end, seasons):
+        return any(season_start <= other_end and other_start <= season_end for other_start, other_end in seasons)
+
+    regular = []
+    for year in range(start.year - 1, end.year + 1):
+        for season_start, season_end, name in (
+            (datetime(year, 12, 1), datetime(year + 1, 5, 31, 23, 59, 59), f"{year + 1} Summer"),
+            (datetime(year + 1, 6, 1), datetime(year + 1, 11, 30, 23, 59, 59), f"{year + 1} Winter"),
+        ):
+            season_start = season_start.replace(tzinfo=timezone.utc)
+            season_end = season_end.replace(tzinfo=timezone.utc)
+            if season_end.date() >= start and season_start.date() <= end and not overlaps(season_start, season_end, existing):
+                regular.append((season_start, season_end, name))
+
+    parents = existing + [(season_start, season_end) for season_start, season_end, _ in regular]
+    taken = {season_start for season_start, _ in existing}
+    special = []
+    for year in range(start.year, end.year + 1):
+        for special_name, month, day, days in SPECIAL_SEASONS:
+            special_start = datetime(year, month, day, tzinfo=timezone.utc)
+            special_end = special_start + timedelta(days=days) - timedelta(seconds=1)
+            inside = any(parent_start <= special_start and special_end <= parent_end for parent_start, parent_end in parents)
+            crosses = any(
+                special_start <= parent_end < special_end or special_start < parent_start <= special_end
+                for parent_start, parent_end in parents
+            )
+            if special_start.date() <= end and inside and not crosses and special_start not in taken:
+                special.append((special_start, special_end, f"{year} {special_name}"))
+    return regular + special
+
+def generate(matches: int, players: int, start: date, end: date, seed: int) -> dict:
+    rng = random.Random(seed)
+    init_db()
+    db = SessionLocal()
+    try:
+        if db.query(base.Match.id).first() is not None or db.query(base.Player.id).first() is not None:
+            raise SystemExit("The database already has players or matches; generate into an empty one")
+
+        existing = [(season.start_date, season.end_date) for season in db.query(base.GameSeason)]
+        existing = [(as_aware(season_start), as_aware(season_end)) for season_start, season_end in existing]
+        new_seasons = seasons_for(start, end, existing)
+        db.add_all([
+            base.GameSeason(start_date=season_start, end_date=season_end, season_name=name)
+            for season_start, season_end, name in new_seasons
+        ])
+
+        player_rows = [base.Player(player_name=f"{FIRST_NAMES[i % len(FIRST_NAMES)]} {i // len(FIRST_NAMES) + 1}") for i in range(players)]
+        db.add_all(player_rows)
+        db.commit()
+        invalidate_season_index()
+        player_ids = [player.id for player in player_rows]
+        skills = {player_id: rng.gauss(1000, 150) for player_id in player_ids}
+        activity = [rng.lognormvariate(0, 0.6) for _ in player_ids]
+
+        days = list(weekdays(start, end))
+        timestamps = []
+        for _ in range(matches):
+            minutes = min(max(rng.gauss(12.5 * 60, 90), 8 * 60), 20 * 60)
+            timestamps.append(datetime.combine(rng.choice(days), day_time(), tzinfo=timezone.utc) + timedelta(minutes=minutes, seconds=rng.randrange(60)))
+        timestamps.sort()
+
+        def match_row(timestamp: datetime) -> dict:
+            doubles = rng.random() < DOUBLES_SHARE and players >= 4
+            picked = []
+            while len(picked) < (4 if doubles else 2):
+                player_id = rng.choices(player_ids, weights=activity)[0]
+                if player_id not in picked:
+                    picked.append(player_id)
+            team_a, team_b = (picked[:2], picked[2:]) if doubles else (picked[:1], picked[1:])
+            skill_a = sum(skills[player_id] for player_id in team_a) / len(team_a)
+            skill_b = sum(skills[player_id] for player_id in team_b) / len(team_b)
+            a_wins = rng.random() < 1 / (1 + 10 ** ((skill_b - skill_a) / 400))
+            winners, losers = (team_a, team_b) if a_wins else (team_b, team_a)
+            row = {"timestamp": timestamp.isoformat(), "winner1": winners[0], "loser1": losers[0]}
+            if doubles:
+                row.update(winner2=winners[1], loser2=losers[1])
+            row.update({flag: rng.random() < rate for flag, rate in EVENT_RATES.items()})
+            return row
+
+        started = time.perf_counter()
+        for chunk_start in range(0, matches, IMPORT_CHUNK_SIZE):
+            lines = [json.dumps(match_row(timestamp)) for timestamp in timestamps[chunk_start:chunk_start + IMPORT_CHUNK_SIZE]]
+            result = MatchImportService.import_matches(db, lines, "ndjson")
+            if result["error_count"]:
+                raise SystemExit(f"Import failed: {result['errors']}")
+            logging.info(f"Imported {chunk_start + len(lines)}/{matches} matches ({time.perf_counter() - started:.1f}s)")
+
+        deleted = rng.sample(player_rows, int(players * DELETED_SHARE))
+        for player in deleted:
+            player.deleted = True
+            player.deleted_at = datetime.now(timezone.utc)
+        db.commit()
+        return {
+            "players": players,
+            "deleted_players": len(deleted),
+            "matches": matches,
+            "seasons_added": len(new_seasons),
+            "player_events": db.query(base.PlayerEvent).count()
+        }
+    finally:
+        db.close()
+
+def as_aware(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--matches", type=int, help="overrides the scale's match count")
+    parser.add_argument("--players", type=int, help="overrides the scale's player count")
+    parser.add_argument("--start", type=date.fromisoformat, default=date(2025, 1, 1))
+    parser.add_argument("--end", type=date.fromisoformat, default=date.today())
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    matches, players = SCALES[args.scale]
+    summary = generate(args.matches or matches, args.players or players, args.start, args.end, args.seed)
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
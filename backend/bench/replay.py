@@ -0,0 +1,82 @@
+"""ELO replay engine speed on a synthetic match log, run from the backend directory:
+
+    python -m bench.replay --matches 20000 100000 --scenarios 1 4 8 16
+
+Times one replay_single (Python lists) call per scenario against a single
+replay_many (NumPy, broadcasting across scenarios) call for each scenario
+count, and checks both give the same changes and ratings. The crossover
+sets BROADCAST_MIN_SCENARIOS in app/replay.py. No database is needed.
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+import numpy as np
+
+from app.replay import MatchLog, Scenario, replay_many, replay_single
+
+DOUBLES_SHARE = 0.25
+
+def match_log(matches: int, players: int, seasons: int, rng: random.Random) -> MatchLog:
+    """Random singles and doubles in order, split evenly over back-to-back seasons."""
+    player_slots = np.full((matches, 4), -1, dtype=np.int64)
+    for i in range(matches):
+        picked = rng.sample(range(players), 4)
+        if rng.random() < DOUBLES_SHARE:
+            player_slots[i] = picked
+        else:
+            player_slots[i, 0], player_slots[i, 2] = picked[:2]
+    rating_season = np.arange(matches) * seasons // matches + 1
+    counts_towards = np.zeros((matches, seasons + 1), dtype=bool)
+    counts_towards[:, 0] = True
+    counts_towards[np.arange(matches), rating_season] = True
+    return MatchLog(
+        match_ids=np.arange(1, matches + 1),
+        player_ids=np.arange(1, players + 1),
+        season_ids=np.arange(seasons + 1),
+        players=player_slots,
+        stored_changes=np.where(player_slots >= 0, 0.0, np.nan),
+        rating_season=rating_season,
+        counts_towards=counts_towards
+    )
+
+def time_call(call, repeat: int):
+    result = call()
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - started)
+    return result, {"median_s": round(statistics.median(times), 3), "min_s": round(min(times), 3)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--matches", type=int, nargs="+", default=[20_000, 100_000])
+    parser.add_argument("--scenarios", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--players", type=int, default=30)
+    parser.add_argument("--seasons", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    results = {}
+    for matches in args.matches:
+        log = match_log(matches, args.players, args.seasons, random.Random(args.seed))
+        for scenario_count in args.scenarios:
+            scenarios = [Scenario(k_factor=16 + 8 * n) for n in range(scenario_count)]
+            single, single_times = time_call(lambda: [replay_single(log, scenario) for scenario in scenarios], args.repeat)
+            many, many_times = time_call(lambda: replay_many(log, scenarios), args.repeat)
+            results[f"{matches} matches, {scenario_count} scenario(s)"] = {
+                "replay_single": single_times,
+                "replay_many": many_times,
+                "same_results": all(
+                    np.array_equal(result.changes[0], many.changes[n]) and np.array_equal(result.ratings[0], many.ratings[n])
+                    for n, result in enumerate(single)
+                )
+            }
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
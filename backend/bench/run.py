@@ -0,0 +1,278 @@
+"""Time service methods and HTTP routes against the configured database, run from the backend directory:
+
+    pip install -r requirements-bench.txt
+    python -m bench.run --repeat 5 --output bench/results/$(date +%Y%m%d-%H%M%S).json
+    python -m bench.run --baseline bench/results/<earlier run>.json
+
+Each case runs once to warm caches and then --repeat times with a fresh
+session. Results record median/min/p95 milliseconds and the SQL statements
+issued per call, so runs on the same dataset (see bench/generate.py) can be
+compared over time. Record/edit/undo cases leave the match history as they
+found it, but do add audit log entries.
+"""
+import argparse
+import json
+import math
+import os
+import statistics
+import subprocess
+import time
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, func
+
+from app import base, database
+from app.config import get_settings
+from app.main import app
+from app.schemas import MatchCreate
+from app.services import MatchService, PlayerService, StatsService
+
+API_PREFIX = "/shedapi"
+
+class QueryCounter:
+    """Counts statements sent through the sync and async engines."""
+
+    def __init__(self):
+        self.count = 0
+        for engine in (database.engine, database.async_engine.sync_engine):
+            event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+queries = QueryCounter()
+
+def measure(call):
+    """(milliseconds, statements, result) for one call."""
+    before = queries.count
+    started = time.perf_counter()
+    result = call()
+    return (time.perf_counter() - started) * 1000, queries.count - before, result
+
+def summarise(samples, **extra):
+    times = sorted(elapsed for elapsed, _ in samples)
+    return {
+        "median_ms": round(statistics.median(times), 2),
+        "min_ms": round(times[0], 2),
+        "p95_ms": round(times[max(0, math.ceil(len(times) * 0.95) - 1)], 2),
+        "queries": max(statement_count for _, statement_count in samples),
+        "runs": len(times),
+        **extra
+    }
+
+def with_session(call):
+    def run():
+        db = database.SessionLocal()
+        try:
+            return call(db)
+        finally:
+            db.close()
+    return run
+
+def dataset(db):
+    """Row counts plus the ids the cases below run against."""
+    busiest = db.query(base.MatchParticipant.player_id, func.count().label("matches"))\
+        .group_by(base.MatchParticipant.player_id)\
+        .order_by(func.count().desc())\
+        .limit(2).all()
+    match_ids = [match_id for match_id, in db.query(base.Match.id).order_by(base.Match.timestamp, base.Match.id)]
+    if len(busiest) < 2 or not match_ids:
+        raise SystemExit("No matches to benchmark; fill the database with python -m bench.generate first")
+    return {
+        "players": db.query(base.Player).count(),
+        "matches": len(match_ids),
+        "player_events": db.query(base.PlayerEvent).count(),
+        "seasons": db.query(base.GameSeason).count(),
+        "player_id": busiest[0].player_id,
+        "opponent_id": busiest[1].player_id,
+        "middle_match_id": match_ids[len(match_ids) // 2]
+    }
+
+def read_cases(ids):
+    player_id = ids["player_id"]
+    opponent_id = ids["opponent_id"]
+    year_ago = datetime.now(timezone.utc) - timedelta(days=365)
+    return {
+        "PlayerService.get_players(current season)": lambda db: PlayerService.get_players(db, -998),
+        "PlayerService.get_players(lifetime)": lambda db: PlayerService.get_players(db, -999),
+        "PlayerService.get_player": lambda db: PlayerService.get_player(db, player_id, -998),
+        "PlayerService.get_elo_history(lifetime)": lambda db: PlayerService.get_elo_history(db, player_id),
+        "PlayerService.get_elo_history(last year, daily)": lambda db: PlayerService.get_elo_history(db, player_id, -999, year_ago, None, "day"),
+        "PlayerService.get_seasons": lambda db: PlayerService.get_seasons(db),
+        "StatsService.compute_streaks": lambda db: StatsService.compute_streaks(db),
+        "StatsService.get_player_streaks": lambda db: StatsService.get_player_streaks(db),
+        "StatsService.get_longest_streaks": lambda db: StatsService.get_longest_streaks(db),
+        "StatsService.get_player_kds(lifetime)": lambda db: StatsService.get_player_kds(db, -999),
+        "StatsService.get_player_kds(current season)": lambda db: StatsService.get_player_kds(db, -998),
+        "StatsService.get_most_matches_in_day": lambda db: StatsService.get_most_matches_in_day(db),
+        "StatsService.get_total_matches": lambda db: StatsService.get_total_matches(db),
+        "StatsService.get_matches_per_day": lambda db: StatsService.get_matches_per_day(db),
+        "StatsService.get_matches_per_day(player)": lambda db: StatsService.get_matches_per_day(db, player_id),
+        "StatsService.get_head_to_head_stats": lambda db: StatsService.get_head_to_head_stats(db, player_id, opponent_id),
+    }
+
+def read_routes(ids):
+    player_id = ids["player_id"]
+    opponent_id = ids["opponent_id"]
+    return [
+        "/players?season_id=-998",
+        "/players?season_id=-999",
+        f"/players/{player_id}?season_id=-998",
+        f"/players/{player_id}/elo-history",
+        f"/players/{player_id}/rivals",
+        "/dashboard",
+        "/seasons",
+        "/stats/streaks",
+        "/stats/streaks/longest",
+        "/stats/player-kds",
+        "/stats/most-matches",
+        "/stats/total-matches",
+        "/stats/matches-per-day",
+        f"/stats/head-to-head?player1_id={player_id}&player2_id={opponent_id}",
+        "/stats/head-to-head/matrix",
+        "/auditlog",
+    ]
+
+def bench_services(ids, repeat):
+    results = {}
+    for name, case in read_cases(ids).items():
+        call = with_session(case)
+        call()
+        samples = [measure(call)[:2] for _ in range(repeat)]
+        results[name] = summarise(samples)
+
+    # Record a match between the two busiest players and undo it again
+    match = MatchCreate(winner1_id=ids["player_id"], loser1_id=ids["opponent_id"])
+    created, deleted = [], []
+    for run in range(repeat + 1):
+        elapsed, statement_count, (result, error) = measure(with_session(lambda db: MatchService.create_match(db, match)))
+        if error:
+            raise SystemExit(f"create_match failed: {error}")
+        match_id = result["id"]
+        delete_sample = measure(with_session(lambda db: MatchService.delete_match(db, match_id)))
+        if run:
+            created.append((elapsed, statement_count))
+            deleted.append(delete_sample[:2])
+    results["MatchService.create_match"] = summarise(created)
+    results["MatchService.delete_match(latest)"] = summarise(deleted)
+
+    # Swap the winner and loser of a match halfway through the history, then swap back
+    middle_id = ids["middle_match_id"]
+    def original_fields(db):
+        original = db.get(base.Match, middle_id)
+        fields = {field: getattr(original, field) for field in ("is_doubles", "winner1_id", "winner2_id", "loser1_id", "loser2_id")}
+        # Flags live on the losers' events at the match time
+        events = db.query(base.EventType.name).join(
+            base.PlayerEvent, base.PlayerEvent.event_id == base.EventType.id
+        ).filter(
+            base.PlayerEvent.player_id == original.loser1_id,
+            base.PlayerEvent.timestamp == original.timestamp
+        )
+        fields.update({f"is_{event_name}": True for event_name, in events})
+        return fields
+
+    fields = with_session(original_fields)()
+    swapped = dict(fields, winner1_id=fields["loser1_id"], winner2_id=fields["loser2_id"], loser1_id=fields["winner1_id"], loser2_id=fields["winner2_id"])
+    updated = []
+    for run in range(repeat + 1):
+        for version in (swapped, fields):
+            elapsed, statement_count, (_, error) = measure(with_session(lambda db: MatchService.update_match(db, middle_id, MatchCreate(**version))))
+            if error:
+                raise SystemExit(f"update_match failed: {error}")
+            if run:
+                updated.append((elapsed, statement_count))
+    results["MatchService.update_match(middle)"] = summarise(updated)
+    return results
+
+def bench_routes(ids, repeat):
+    settings = get_settings()
+    results = {}
+    with TestClient(app) as client:
+        login = client.post(f"{API_PREFIX}/login", json={"password": settings.APP_PASSWORD})
+        login.raise_for_status()
+        client.headers["Authorization"] = f"Bearer {login.json()['access_token']}"
+
+        for path in read_routes(ids):
+            client.get(API_PREFIX + path)
+            samples = []
+            for _ in range(repeat):
+                elapsed, statement_count, response = measure(lambda: client.get(API_PREFIX + path))
+                samples.append((elapsed, statement_count))
+            results[f"GET {path}"] = summarise(samples, status=response.status_code, bytes=len(response.content))
+
+        recorded, undone = [], []
+        match = {"winner1_id": ids["player_id"], "loser1_id": ids["opponent_id"]}
+        for run in range(repeat + 1):
+            elapsed, statement_count, response = measure(lambda: client.post(f"{API_PREFIX}/record-match", json=match))
+            response.raise_for_status()
+            body = response.json()
+            match_id = body["id"]
+            undo = measure(lambda: client.delete(f"{API_PREFIX}/matches/{match_id}"))
+            undo[2].raise_for_status()
+            if run:
+                recorded.append((elapsed, statement_count))
+                undone.append(undo[:2])
+        results["POST /record-match"] = summarise(recorded, status=response.status_code)
+        results["DELETE /matches/{id}(latest)"] = summarise(undone, status=undo[2].status_code)
+    return results
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline):
+    """Median and query count changes against an earlier run, slowest regressions first."""
+    rows = []
+    for name, result in results.items():
+        before = baseline["results"].get(name)
+        if not before:
+            continue
+        change = (result["median_ms"] - before["median_ms"]) / before["median_ms"] * 100 if before["median_ms"] else 0
+        rows.append((change, name, before, result))
+    print(f"{'case':<60} {'before ms':>10} {'after ms':>10} {'change':>8} {'queries':>9}")
+    for change, name, before, result in sorted(rows, reverse=True):
+        print(f"{name:<60} {before['median_ms']:>10.2f} {result['median_ms']:>10.2f} {change:>+7.1f}% {before['queries']:>4}->{result['queries']:<4}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case")
+    parser.add_argument("--output", help="write the results to this file as well as stdout")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--skip-http", action="store_true", help="only time service methods")
+    args = parser.parse_args()
+
+    db = database.SessionLocal()
+    try:
+        ids = dataset(db)
+    finally:
+        db.close()
+
+    started_at = datetime.now(timezone.utc)
+    results = bench_services(ids, args.repeat)
+    if not args.skip_http:
+        results.update(bench_routes(ids, args.repeat))
+    report = {
+        "started_at": started_at.isoformat(),
+        "seconds": round((datetime.now(timezone.utc) - started_at).total_seconds(), 1),
+        "commit": git_commit(),
+        "dialect": database.engine.dialect.name,
+        "dataset": ids,
+        "repeat": args.repeat,
+        "results": results
+    }
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            compare(results, json.load(baseline))
+    else:
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Response serialization cost of the list endpoints, run from the backend directory:
+
+    python -m bench.serialization --players 20 200 2000
+
+Times FastAPI's response path alone (response_model validation and
+serialization, then rendering the body) for synthetic payloads shaped like
+/players, /stats/streaks, /stats/streaks/longest and /stats/player-kds. "before"
+is the old list[dict] model with the standard JSONResponse, "after" the typed
+rows with ORJSONResponse.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.schemas import LongestStreak, PlayerKD, PlayerListEntry, PlayerStreak
+
+def payloads(players: int, rng: random.Random) -> dict:
+    """Lists shaped like the service results for a roster of the given size."""
+    names = [f"Player {player_id}" for player_id in range(1, players + 1)]
+    return {
+        "/players": (PlayerListEntry, [
+            {
+                "id": player_id,
+                "player_name": name,
+                "elo": rng.randint(700, 1400),
+                "total_matches": rng.randint(0, 3000),
+                "recently_pantsed": rng.random() < 0.1,
+                "matches_in_season": rng.randint(0, 300)
+            }
+            for player_id, name in enumerate(names, 1)
+        ]),
+        "/stats/streaks": (PlayerStreak, [
+            {
+                "player_id": player_id,
+                "player_name": name,
+                "current_streak": rng.randint(2, 12),
+                "elo": rng.randint(700, 1400),
+                "elo_change": rng.randint(10, 200)
+            }
+            for player_id, name in list(enumerate(names, 1))[:5]
+        ]),
+        # Two entries per player, as get_longest_streaks returns them
+        "/stats/streaks/longest": (LongestStreak, [
+            {
+                "player_id": player_id,
+                "player_name": name,
+                "longest_streak": rng.randint(1, 20),
+                "longest_streak_elo_change": rng.randint(-300, 300),
+                "streak_type": streak_type
+            }
+            for player_id, name in enumerate(names, 1)
+            for streak_type in ("win", "loss")
+        ]),
+        "/stats/player-kds": (PlayerKD, [
+            {
+                "player_id": player_id,
+                "player_name": name,
+                "wins": rng.randint(0, 1500),
+                "losses": rng.randint(0, 1500),
+                "kd": round(rng.uniform(0.2, 3), 2)
+            }
+            for player_id, name in list(enumerate(names, 1))[:20]
+        ]),
+    }
+
+def time_response(field, response_class, content, repeat: int) -> dict:
+    async def render():
+        serialized = await serialize_response(field=field, response_content=content, is_coroutine=True)
+        return response_class(serialized).body
+
+    loop = asyncio.new_event_loop()
+    try:
+        body = loop.run_until_complete(render())
+        times = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            loop.run_until_complete(render())
+            times.append((time.perf_counter() - started) * 1000)
+    finally:
+        loop.close()
+    return {"median_ms": round(statistics.median(times), 3), "min_ms": round(min(times), 3), "bytes": len(body)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, nargs="+", default=[20, 200, 2000], help="roster sizes to try")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    untyped_field = create_response_field(name="Response", type_=list[dict])
+    results = {}
+    for players in args.players:
+        for path, (model, content) in payloads(players, random.Random(args.seed)).items():
+            before = time_response(untyped_field, JSONResponse, content, args.repeat)
+            after = time_response(create_response_field(name="Response", type_=list[model]), ORJSONResponse, content, args.repeat)
+            results[f"{path} ({players} players)"] = {
+                "items": len(content),
+                "before": before,
+                "after": after,
+                "speedup": round(before["median_ms"] / after["median_ms"], 2) if after["median_ms"] else None
+            }
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import os
+import tempfile
+
+# The app reads its settings and database URL at import
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{tempfile.mkdtemp()}/import.db",
+    AUTH_SECRET_KEY="x" * 32,
+    APP_PASSWORD="app",
+    ADMIN_PASSWORD="admin",
+    CUSTOM_HOSTNAME="localhost"
+)
+
+import pytest
+
+from app import base, database
+from app.services import MatchImportService, RatingService
+from app.services.replay_service import ReplayService
+
+PLAYERS = ("Ann", "Bob", "Cat", "Dan")
+
+@pytest.fixture
+def db():
+    database.init_db()
+    session = database.SessionLocal()
+    session.add_all(base.Player(player_name=name) for name in PLAYERS)
+    session.commit()
+    yield session
+    session.close()
+    base.Base.metadata.drop_all(database.engine)
+    with database.engine.begin() as connection:
+        connection.exec_driver_sql("DROP TABLE IF EXISTS schema_migrations")
+
+def csv_lines(matches):
+    return ["timestamp,winner1,winner2,loser1,loser2\n"] + [
+        f"{timestamp},{winners[0]},{winners[1] if len(winners) > 1 else ''},{losers[0]},{losers[1] if len(losers) > 1 else ''}\n"
+        for timestamp, winners, losers in matches
+    ]
+
+def ledger(db):
+    return sorted((rating.player_id, rating.season_id, rating.elo, rating.matches_played) for rating in db.query(base.PlayerRating))
+
+def test_import_into_existing_history_rerates_later_matches(db):
+    existing = MatchImportService.import_matches(db, csv_lines([
+        ("2025-03-01T10:00:00", ["Ann"], ["Bob"]),
+        ("2025-03-03T10:00:00", ["Ann"], ["Cat"]),
+        ("2025-03-05T10:00:00", ["Bob", "Cat"], ["Ann", "Dan"]),
+        ("2025-03-07T10:00:00", ["Dan"], ["Bob"]),
+    ]))
+    assert existing["imported"] == 4
+
+    result = MatchImportService.import_matches(db, csv_lines([
+        ("2025-02-28T10:00:00", ["Bob"], ["Ann"]),
+        ("2025-03-04T10:00:00", ["Cat"], ["Ann"]),
+        ("2025-03-06T10:00:00", ["Ann", "Bob"], ["Cat", "Dan"]),
+    ]))
+    assert result["imported"] == 3
+    assert result["rerated"] > 0
+
+    verify = ReplayService.verify(db)
+    assert verify["matches"] == 7
+    assert verify["mismatch_count"] == 0
+
+    imported_ledger = ledger(db)
+    RatingService.rebuild(db)
+    assert ledger(db) == imported_ledger
+
+def test_dry_run_leaves_existing_matches_alone(db):
+    MatchImportService.import_matches(db, csv_lines([
+        ("2025-03-01T10:00:00", ["Ann"], ["Bob"]),
+        ("2025-03-03T10:00:00", ["Ann"], ["Bob"]),
+    ]))
+    stored = [(match.id, match.winner1_elo_change) for match in db.query(base.Match).order_by(base.Match.id)]
+
+    result = MatchImportService.import_matches(db, csv_lines([("2025-03-02T10:00:00", ["Bob"], ["Ann"])]), dry_run=True)
+    assert result["rerated"] == 1
+    db.expire_all()
+    assert [(match.id, match.winner1_elo_change) for match in db.query(base.Match).order_by(base.Match.id)] == stored
@@ -10,6 +10,7 @@ import PlayerPodium from './components/PlayerPodium.tsx';
 import PlayerStreaks from './components/PlayerStreaks.tsx';
 import Stats from './components/Stats.tsx';
 import PlayerKD from './components/PlayerKD.tsx';
+import PlayerEloTrend from './components/PlayerEloTrend.tsx';
 import PlayerAdmin from './components/PlayerAdmin.tsx';
 import AuditLog from './components/AuditLog.tsx';
 import MatchDialog from './components/MatchDialog.tsx';
@@ -89,6 +90,12 @@ interface AuditLogEntry {
   timestamp: string;
 }
 
+interface EloHistoryPoint {
+  date: string;
+  elo: number;
+  matches: number;
+}
+
 interface MatchesPerDay {
   date: string;
   count: number;
@@ -162,6 +169,8 @@ function App() {
   const [snackbar, setSnackbar] = useState<{open: boolean, message: string, severity: 'success' | 'error'}>({open: false, message: '', severity: 'success'});
   const [showPlayerNumbers, setShowPlayerNumbers] = useState(false);
   const [matchesPerDay, setMatchesPerDay] = useState<MatchesPerDay[]>([]);
+  const [eloHistory, setEloHistory] = useState<EloHistoryPoint[]>([]);
+  const [eloHistoryPlayerId, setEloHistoryPlayerId] = useState<number | null>(null);
   const [snookerModeOpen, setSnookerModeOpen] = useState(false);
   const [confettiEmojis, setConfettiEmojis] = useState<string[] | undefined>(undefined);
 
@@ -231,6 +240,54 @@ function App() {
     }
   }, [selectedSeasonId]);
 
+  // Apply changes made by other clients as they arrive; imports and missed events reload everything
+  useEffect(() => {
+    if (!token) return;
+    const events = new EventSource(`${API_BASE_URL}/events?token=${encodeURIComponent(token)}`);
+    // Ledger rows for All Time are kept under season 0
+    const ledgerSeasonId = selectedSeasonId === -999 ? 0 : selectedSeasonId;
+    const listen = (type: string, apply: (data: any) => void) => {
+      events.addEventListener(type, (event: MessageEvent) => {
+        const data = JSON.parse(event.data);
+        if (data.auditlog) {
+          setAuditLog(auditlog => auditlog.some(entry => entry.id === data.auditlog.id) ? auditlog : [data.auditlog, ...auditlog]);
+        }
+        apply(data);
+      });
+    };
+    const applyRatings = (data: any) => {
+      const ratings: {player_id: number, season_id: number, elo: number, matches_played: number}[] = data.ratings;
+      setPlayers(players => players.map(player => {
+        const season = ratings.find(rating => rating.player_id === player.id && rating.season_id === ledgerSeasonId);
+        const lifetime = ratings.find(rating => rating.player_id === player.id && rating.season_id === 0);
+        return season || lifetime ? {
+          ...player,
+          ...(season && {elo: season.elo, matches_in_season: season.matches_played}),
+          ...(lifetime && {total_matches: lifetime.matches_played})
+        } : player;
+      }));
+    };
+
+    listen('player_added', data => setPlayers(players => [
+      ...players.filter(player => player.id !== data.id),
+      {id: data.id, player_name: data.player_name, elo: data.elo, total_matches: 0, recently_pantsed: false, matches_in_season: 0}
+    ].sort((a, b) => a.player_name.localeCompare(b.player_name))));
+    listen('player_updated', data => setPlayers(players => players
+      .map(player => player.id === data.id ? {...player, player_name: data.player_name} : player)
+      .sort((a, b) => a.player_name.localeCompare(b.player_name))));
+    listen('player_deleted', data => setPlayers(players => players.filter(player => player.id !== data.id)));
+    ['match_recorded', 'match_undone', 'match_updated'].forEach(type => listen(type, applyRatings));
+    ['matches_imported', 'resync'].forEach(type => events.addEventListener(type, () => { updatePageData(); }));
+    return () => events.close();
+  }, [token, selectedSeasonId]);
+
+  // Load the selected player's ELO history, again for the new season when it changes
+  useEffect(() => {
+    if (token && eloHistoryPlayerId !== null) {
+      fetchEloHistory(eloHistoryPlayerId);
+    }
+  }, [eloHistoryPlayerId, selectedSeasonId]);
+
   // Keep localStorage in sync
   useEffect(() => {
     saveRecentMatchIds(recentMatchIds);
@@ -246,101 +303,33 @@ function App() {
   };
 
   {/* Data view functions */}
-  const listPlayers = async () => {
+  const loadDashboard = async () => {
+    // Players, audit log and stats come back together from one request
     try {
-      const response = await fetch(`${API_BASE_URL}/players?season_id=${selectedSeasonId}`, {
+      const fields = [
+        'players', 'auditlog', 'streaks', 'longest_streaks', 'player_kds',
+        'most_matches', 'total_matches', 'matches_per_day'
+      ].join(',');
+      const response = await fetch(`${API_BASE_URL}/dashboard?season_id=${selectedSeasonId}&fields=${fields}`, {
         headers: getAuthHeaders()
       });
       const data = await response.json();
-      setPlayers(data);
+      setPlayers(data.players);
+      setAuditLog(data.auditlog);
+      setPlayerStreaks(data.streaks);
+      setPlayerStreakLongest(data.longest_streaks);
+      setPlayerKD(data.player_kds);
+      setMostMatchesInDay(data.most_matches);
+      setTotalMatchStats(data.total_matches);
+      setMatchesPerDay(data.matches_per_day);
     } catch (error) {
-      setSnackbar({open: true, message: `Error fetching players: ${error}`, severity: 'error'});
-    }
-  };
-
-  const listAuditLog = async () => {
-    try {
-      const response = await fetch(`${API_BASE_URL}/auditlog`, {
-        headers: getAuthHeaders()
-      });
-      const data = await response.json();
-      setAuditLog(data);
-    } catch (error) {
-      setSnackbar({open: true, message: `Error fetching audit log: ${error}`, severity: 'error'});
-    }
-  };
-
-  const getStats = async () => {
-    // Player Streaks
-    try {
-      const response = await fetch(`${API_BASE_URL}/stats/streaks`, {
-        headers: getAuthHeaders()
-      });
-      const data = await response.json();
-      setPlayerStreaks(data);
-    } catch (error) {
-      setSnackbar({open: true, message: `Error fetching player streaks: ${error}`, severity: 'error'});
-    }
-    
-    // Longest player streaks
-    try {
-      const response = await fetch(`${API_BASE_URL}/stats/streaks/longest`, {
-        headers: getAuthHeaders()
-      });
-      const data = await response.json();
-      setPlayerStreakLongest(data);
-    } catch (error) {
-      setSnackbar({open: true, message: `Error fetching longest player streak: ${error}`, severity: 'error'});
-    }
-
-    // Player KD Ratios
-    try {
-      const response = await fetch(`${API_BASE_URL}/stats/player-kds`, {
-        headers: getAuthHeaders()
-      });
-      const data = await response.json();
-      setPlayerKD(data);
-    } catch (error) {
-      setSnackbar({open: true, message: `Error fetching player KD: ${error}`, severity: 'error'});
-    }
-
-    // Most matches in a day
-    try {
-      const response = await fetch(`${API_BASE_URL}/stats/most-matches`, {
-        headers: getAuthHeaders()
-      });
-      const data = await response.json();
-      setMostMatchesInDay(data);
-    } catch (error) {
-      setSnackbar({open: true, message: `Error fetching most matches in day: ${error}`, severity: 'error'});
-    }
-    // total matches
-    try {
-      const response = await fetch(`${API_BASE_URL}/stats/total-matches`, {
-        headers: getAuthHeaders()
-      });
-      const data = await response.json();
-      setTotalMatchStats(data);
-    } catch (error) {
-      setSnackbar({open: true, message: `Error fetching total matches stats: ${error}`, severity: 'error'});
-    }
-    // matches per day
-    try {
-      const response = await fetch(`${API_BASE_URL}/stats/matches-per-day`, {
-        headers: getAuthHeaders()
-      });
-      const data = await response.json();
-      setMatchesPerDay(data);
-    } catch (error) {
-      setSnackbar({open: true, message: `Error fetching matches per day: ${error}`, severity: 'error'});
+      setSnackbar({open: true, message: `Error fetching dashboard: ${error}`, severity: 'error'});
     }
   };
   
   {/* Called to refresh the page data after data modifications occur */}
   const updatePageData = async () => { 
-    await listPlayers();
-    await listAuditLog();
-    await getStats();
+    await loadDashboard();
   };
 
 
@@ -633,6 +622,22 @@ function App() {
     }
   }
 
+  const handleEloHistoryPlayer = (playerId: number) => {
+    setEloHistoryPlayerId(playerId);
+  }
+
+  const fetchEloHistory = async (playerId: number) => {
+    try {
+      const response = await fetch(`${API_BASE_URL}/players/${playerId}/elo-history?season_id=${selectedSeasonId}&interval=day`, {
+        headers: getAuthHeaders()
+      });
+      const data = await response.json();
+      setEloHistory(data.history);
+    } catch (error) {
+      setSnackbar({open: true, message: `Error fetching ELO history: ${error}`, severity: 'error'});
+    }
+  }
+
   if (loading) {
     return null;
   }
@@ -785,6 +790,11 @@ function App() {
                       <PlayerPodium players={players} showPlayerNumbers={showPlayerNumbers} />
                       <PlayerStreaks playerStreaks={playerStreaks} />
                       <PlayerKD playerKd={playerKd} />
+                      <PlayerEloTrend
+                        players={players}
+                        eloHistory={eloHistory}
+                        onPlayerSelect={handleEloHistoryPlayer}
+                      />
                     </Box>
 
                     {isWednesday && <ScrabbleGame />}
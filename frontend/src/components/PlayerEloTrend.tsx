@@ -0,0 +1,70 @@
+import React, { useState } from 'react';
+import { Box, Paper, Select, MenuItem, Typography } from '@mui/material';
+import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer } from 'recharts';
+
+interface Player {
+  id: number;
+  player_name: string;
+}
+
+interface EloHistoryPoint {
+  date: string;
+  elo: number;
+  matches: number;
+}
+
+interface PlayerEloTrendProps {
+  players: Player[];
+  eloHistory: EloHistoryPoint[];
+  onPlayerSelect: (playerId: number) => void;
+}
+
+const PlayerEloTrend: React.FC<PlayerEloTrendProps> = ({ players, eloHistory, onPlayerSelect }) => {
+  const [playerId, setPlayerId] = useState<number>(-1);
+
+  const handleChange = (id: number) => {
+    setPlayerId(id);
+    if (id !== -1) {
+      onPlayerSelect(id);
+    }
+  };
+
+  const elos = eloHistory.map(point => point.elo);
+  const yMin = elos.length ? Math.floor((Math.min(...elos) - 10) / 10) * 10 : 'auto';
+  const yMax = elos.length ? Math.ceil((Math.max(...elos) + 10) / 10) * 10 : 'auto';
+
+  return (
+    <Box sx={{ flex: 1 }}>
+      <h2>ELO Trend</h2>
+      <Paper elevation={3} sx={{ p: 2, maxWidth: 400, mx: 'auto' }}>
+        <Select
+          value={playerId}
+          onChange={e => handleChange(Number(e.target.value))}
+          displayEmpty
+          size="small"
+          sx={{ minWidth: 180, mb: 2 }}
+        >
+          <MenuItem value={-1}>Select a player</MenuItem>
+          {players.map((player) => (
+            <MenuItem key={player.id} value={player.id}>{player.player_name}</MenuItem>
+          ))}
+        </Select>
+        {playerId !== -1 && eloHistory.length === 0 ? (
+          <Typography variant="body2" sx={{ color: 'text.secondary' }}>No matches this season</Typography>
+        ) : playerId !== -1 && (
+          <ResponsiveContainer width="100%" height={200}>
+            <LineChart data={eloHistory} margin={{ top: 10, right: 10, left: 0, bottom: 0 }}>
+              <CartesianGrid strokeDasharray="3 3" />
+              <XAxis dataKey="date" tick={{ fontSize: 12 }} />
+              <YAxis allowDecimals={false} domain={[yMin, yMax]} tick={{ fontSize: 12 }} />
+              <Tooltip />
+              <Line type="monotone" dataKey="elo" stroke="#1976d2" strokeWidth={2} dot={{ r: 2 }} />
+            </LineChart>
+          </ResponsiveContainer>
+        )}
+      </Paper>
+    </Box>
+  );
+};
+
+export default PlayerEloTrend;
@@ -9,6 +9,8 @@ interface SnookerModeProps {
 
 type ScoreSlot = 'top' | 'bottom';
 
+// Table this screen scores; the API keeps a separate frame per table
+const TABLE_ID = 1;
 const RED_VALUE = 1;
 const COLOURS = [
   { key: 'yellow', label: 'Yellow', value: 2, color: '#FFD700' },
@@ -57,27 +59,32 @@ const SnookerMode: React.FC<SnookerModeProps> = ({ open, onClose }) => {
   });
   const [redCount, setRedCount] = useState<number>(15);
   const [redEnabled, setRedEnabled] = useState<boolean>(true);
+  const [canUndo, setCanUndo] = useState<boolean>(false);
+
+  function applyState(data: any) {
+    setScores({ top: data.top, bottom: data.bottom });
+    setColoursEnabled(data.colours_enabled);
+    setRedEnabled(data.red_enabled);
+    setRedCount(data.red_count);
+    setCanUndo(data.can_undo);
+  }
 
   async function fetchState() {
     try {
       const token = localStorage.getItem('shed-tournament-token');
-      const res = await fetch(`/shedapi/snooker/state`, {
+      const res = await fetch(`/shedapi/snooker/state?table_id=${TABLE_ID}`, {
         headers: {
           'Authorization': `Bearer ${token}`
         }
       });
-      const data = await res.json();
-      setScores({ top: data.top, bottom: data.bottom });
-      setColoursEnabled(data.colours_enabled);
-      setRedEnabled(data.red_enabled);
-      setRedCount(data.red_count);
+      applyState(await res.json());
     } catch {}
   }
 
   async function sendAction(action: any) {
     try {
       const token = localStorage.getItem('shed-tournament-token');
-      const res = await fetch(`/shedapi/snooker/action`, {
+      const res = await fetch(`/shedapi/snooker/action?table_id=${TABLE_ID}`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -85,18 +92,21 @@ const SnookerMode: React.FC<SnookerModeProps> = ({ open, onClose }) => {
         },
         body: JSON.stringify(action)
       });
-      const data = await res.json();
-      setScores({ top: data.top, bottom: data.bottom });
-      setColoursEnabled(data.colours_enabled);
-      setRedCount(data.red_count);
-      setRedEnabled(data.red_enabled);
+      applyState(await res.json());
     } catch {}
   }
 
   useEffect(() => {
     fetchState();
-    const id = setInterval(fetchState, 2000);
-    return () => clearInterval(id);
+    // Other scorers' actions are pushed instead of polled
+    const token = localStorage.getItem('shed-tournament-token');
+    const events = new EventSource(`/shedapi/events?token=${encodeURIComponent(token || '')}`);
+    events.addEventListener('snooker_state', (event) => {
+      const data = JSON.parse((event as MessageEvent).data);
+      if (data.table_id === TABLE_ID) applyState(data);
+    });
+    events.addEventListener('resync', () => fetchState());
+    return () => events.close();
   }, []);
 
   const currentTop = scores.top;
@@ -141,6 +151,11 @@ const SnookerMode: React.FC<SnookerModeProps> = ({ open, onClose }) => {
     sendAction({ type: 'reset' });
   }
 
+  function handleUndo() {
+    if (!canUndo) return;
+    sendAction({ type: 'undo' });
+  }
+
   if (!open) return null;
 
   return (
@@ -265,13 +280,22 @@ const SnookerMode: React.FC<SnookerModeProps> = ({ open, onClose }) => {
 
           <Box>
             <Typography variant="subtitle1" sx={{ mb: 1 }}>Reset</Typography>
-            <Button
-              variant="contained"
-              color="warning"
-              onClick={handleReset}
-            >
-              Reset Scores
-            </Button>
+            <Box sx={{ display: 'flex', gap: 1 }}>
+              <Button
+                variant="outlined"
+                onClick={handleUndo}
+                disabled={!canUndo}
+              >
+                Undo
+              </Button>
+              <Button
+                variant="contained"
+                color="warning"
+                onClick={handleReset}
+              >
+                Reset Scores
+              </Button>
+            </Box>
           </Box>
           
         </Box>